@@ -0,0 +1,109 @@
+"""
+并发读写压测：对比 SQLite 默认设置（回滚日志）与工具连接的 PRAGMA 配置（WAL 等）。
+
+每种配置先只运行读线程，再同时运行写线程（预订/取消酒店），输出读吞吐量和写入时遇到的锁错误数。
+压测会修改 hotels 表的 booked 字段，请使用数据库副本。
+
+用法:
+    python benchmarks/bench_concurrent_access.py --db /tmp/travel_copy.sqlite --readers 4 --writers 2 --seconds 5
+"""
+import argparse
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tools  # noqa: E402
+from tools.booking import booking_stats  # noqa: E402
+from tools.hotels_tools import book_hotel, cancel_hotel  # noqa: E402
+
+# 读操作：不经过结果缓存，直接在池化连接上执行与 fetch_user_flight_information 类似的连接查询
+READ_QUERY = (
+    "SELECT count(*) FROM tickets t JOIN ticket_flights tf ON t.ticket_no = tf.ticket_no "
+    "JOIN flights f ON tf.flight_id = f.flight_id WHERE t.passenger_id = ?"
+)
+
+
+def run(readers: int, writers: int, seconds: float) -> tuple[float, int, int]:
+    """返回 (每秒读次数, 写次数, 锁错误数)。"""
+    stop = threading.Event()
+    reads = [0] * readers
+    writes = [0] * max(writers, 1)
+    locked = [0]
+    lock = threading.Lock()
+
+    def reader(slot: int) -> None:
+        while not stop.is_set():
+            try:
+                with tools.get_connection() as conn:
+                    conn.execute(READ_QUERY, ("3442 587242",)).fetchone()
+                reads[slot] += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    locked[0] += 1
+
+    def writer(slot: int) -> None:
+        hotel_id = slot + 1
+        while not stop.is_set():
+            try:
+                book_hotel.invoke({"hotel_id": hotel_id})
+                cancel_hotel.invoke({"hotel_id": hotel_id})
+                writes[slot] += 2
+            except sqlite3.OperationalError:
+                with lock:
+                    locked[0] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return sum(reads) / elapsed, sum(writes), locked[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--db", default=tools.db, help="旅行数据库路径（会被写入，请使用副本）")
+    parser.add_argument("--readers", type=int, default=4, help="读线程数")
+    parser.add_argument("--writers", type=int, default=2, help="写线程数")
+    parser.add_argument("--seconds", type=float, default=5, help="每轮压测的秒数")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        parser.error(f"数据库文件不存在: {args.db}")
+
+    profiles = {
+        "sqlite 默认": {"journal_mode": "delete", "synchronous": "full"},
+        "工具 PRAGMA 配置": tools.DEFAULT_PRAGMAS,
+    }
+    print(f"db={args.db} readers={args.readers} writers={args.writers} seconds={args.seconds}")
+    for label, pragmas in profiles.items():
+        tools.configure_database(args.db, pragmas=pragmas)
+        alone, _, _ = run(args.readers, 0, args.seconds)
+        booking_stats.reset()
+        mixed, writes, locked = run(args.readers, args.writers, args.seconds)
+        print(
+            f"{label:<12} 只读: {alone:10.1f} reads/s  读写并发: {mixed:10.1f} reads/s "
+            f"({mixed / alone:.0%})  写入: {writes:6d}  锁错误: {locked}"
+        )
+        # 预订服务记录的等锁/持锁时间
+        for operation, entry in sorted(booking_stats.stats().items()):
+            print(
+                f"    {operation:<14} 平均等锁: {entry['wait_seconds'] / entry['count'] * 1000:7.3f} ms  "
+                f"平均持锁: {entry['hold_seconds'] / entry['count'] * 1000:7.3f} ms  "
+                f"最长持锁: {entry['max_hold_seconds'] * 1000:7.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+数据库重置耗时基准：update_dates（复制备份文件 + 原地平移日期） vs reset_database（内存快照 + backup API）。
+
+把备份数据库中的订票相关表按倍数复制放大，比较不同数据库大小下两种重置方式的耗时。
+
+用法:
+    python benchmarks/bench_database_reset.py --db travel2.sqlite --scales 1 2 4 --repeats 5
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import closing
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tools  # noqa: E402
+import tools.init_db as init_db  # noqa: E402
+
+# 放大数据库时复制的表（行数随倍数线性增长）
+SCALED_TABLES = ["bookings", "tickets", "ticket_flights", "boarding_passes", "flights"]
+
+
+def build_scaled_copy(source: str, target: str, scale: int) -> None:
+    """复制 source 并把 SCALED_TABLES 中每张表的行数放大为 scale 倍。"""
+    shutil.copy(source, target)
+    with closing(sqlite3.connect(target)) as conn:
+        for table in SCALED_TABLES:
+            count = conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+            for _ in range(scale - 1):
+                conn.execute(f"INSERT INTO {table} SELECT * FROM {table} LIMIT ?", (count,))
+        conn.commit()
+        conn.execute("VACUUM")
+
+
+def time_update_dates(source: str, target: str, repeats: int) -> float:
+    init_db.backup_file, init_db.local_file = source, target
+    durations = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        init_db.update_dates()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+
+def time_reset(source: str, target: str, repeats: int) -> tuple[float, float]:
+    """返回 (首次重置耗时, 复用快照后重置耗时的中位数)。"""
+    started = time.perf_counter()
+    init_db.reset_database(target, source=source)
+    cold = time.perf_counter() - started
+    durations = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        init_db.reset_database(target, source=source)
+        durations.append(time.perf_counter() - started)
+    return cold, statistics.median(durations)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--db", default=tools.backup_file, help="备份数据库路径")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 2, 4], help="数据库放大倍数")
+    parser.add_argument("--repeats", type=int, default=5, help="每种方式重复的次数")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        parser.error(f"数据库文件不存在: {args.db}")
+
+    print(f"{'scale':>5} {'size MB':>9} {'update_dates s':>15} {'reset cold s':>13} {'reset ms':>9}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in args.scales:
+            source = os.path.join(workdir, f"backup_x{scale}.sqlite")
+            target = os.path.join(workdir, f"local_x{scale}.sqlite")
+            build_scaled_copy(args.db, source, scale)
+            size = os.path.getsize(source) / 1024 / 1024
+
+            update = time_update_dates(source, target, args.repeats)
+            cold, warm = time_reset(source, target, args.repeats)
+            print(f"{scale:>5} {size:>9.1f} {update:>15.3f} {cold:>13.3f} {warm * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
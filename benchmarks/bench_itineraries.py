@@ -0,0 +1,107 @@
+"""
+物化乘客行程表与四表连接的对比压测。
+
+在临时目录中用 tools.synthetic 生成一个合成数据库（--passengers 个乘客，每人 1~2 张机票，每张机票 1~3 个航段），
+执行 provision_travel_db（建索引、回填 passenger_itineraries），然后对随机乘客分别执行
+fetch_user_flight_information 原先的四表连接和物化表的索引查找，输出每次查询的平均耗时；
+随后执行一批改签并检查物化表与连接结果一致，最后测量触发器给改签写入带来的额外耗时。
+
+用法:
+    python benchmarks/bench_itineraries.py --passengers 200000 --lookups 5000
+"""
+import argparse
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.itineraries import (  # noqa: E402
+    ITINERARY_COLUMNS,
+    ITINERARY_JOIN,
+    ITINERARY_QUERY,
+    check_itineraries,
+)
+from tools.provision import provision_travel_db  # noqa: E402
+from tools.synthetic import DatasetSpec, generate_travel_db, passenger_id  # noqa: E402
+
+JOIN_QUERY = (
+    f"SELECT {', '.join(ITINERARY_COLUMNS[1:])} FROM ({ITINERARY_JOIN}) WHERE passenger_id = ?"
+)
+
+
+def build(path: Path, passengers: int, seed: int) -> int:
+    """生成合成数据库（不执行准备步骤），返回航班数。"""
+    spec = DatasetSpec(flights=max(passengers // 20, 10), passengers=passengers)
+    generate_travel_db(path, spec, seed, provision=False)
+    return spec.flights
+
+
+def time_lookups(conn: sqlite3.Connection, query: str, ids: list[str]) -> float:
+    """返回每次查询的平均耗时（毫秒）。"""
+    started = time.perf_counter()
+    for pid in ids:
+        conn.execute(query, (pid,)).fetchall()
+    return (time.perf_counter() - started) / len(ids) * 1000
+
+
+def time_rebooks(conn: sqlite3.Connection, count: int, flight_count: int, seed: int) -> float:
+    """把随机机票的航段改到另一个航班，返回每次改签（含提交）的平均耗时（毫秒）。"""
+    rng = random.Random(seed)
+    tickets = [row[0] for row in conn.execute("SELECT ticket_no FROM tickets LIMIT 100000")]
+    started = time.perf_counter()
+    for _ in range(count):
+        with conn:
+            conn.execute(
+                "UPDATE ticket_flights SET flight_id = ? WHERE ticket_no = ?",
+                (rng.randint(1, flight_count), rng.choice(tickets)),
+            )
+    return (time.perf_counter() - started) / count * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--passengers", type=int, default=200000, help="合成数据库中的乘客数")
+    parser.add_argument("--lookups", type=int, default=5000, help="每种查询执行的次数")
+    parser.add_argument("--rebooks", type=int, default=500, help="改签写入的次数")
+    parser.add_argument("--seed", type=int, default=7, help="随机种子")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "itineraries.sqlite"
+        started = time.perf_counter()
+        flight_count = build(path, args.passengers, args.seed)
+        print(f"生成 {args.passengers} 个乘客、{flight_count} 个航班: {time.perf_counter() - started:.1f}s")
+
+        conn = sqlite3.connect(path)
+        started = time.perf_counter()
+        provision_travel_db(conn)
+        print(f"provision_travel_db（建索引并回填物化表）: {time.perf_counter() - started:.1f}s")
+
+        rng = random.Random(args.seed)
+        ids = [passenger_id(rng.randrange(args.passengers)) for _ in range(args.lookups)]
+        join_ms = time_lookups(conn, JOIN_QUERY, ids)
+        materialized_ms = time_lookups(conn, ITINERARY_QUERY, ids)
+        print(f"四表连接:   {join_ms:8.4f} ms/次")
+        print(f"物化表查找: {materialized_ms:8.4f} ms/次  ({join_ms / materialized_ms:.1f}x)")
+
+        rebook_ms = time_rebooks(conn, args.rebooks, flight_count, args.seed)
+        print("一致性检查:", check_itineraries(conn))
+        # 去掉触发器，对比没有物化表时同样的改签写入
+        triggers = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%itinerary%'"
+        ).fetchall()
+        for (name,) in triggers:
+            conn.execute(f"DROP TRIGGER {name}")
+        plain_ms = time_rebooks(conn, args.rebooks, flight_count, args.seed + 1)
+        print(f"改签写入:   {rebook_ms:8.4f} ms/次（有触发器）  {plain_ms:8.4f} ms/次（无触发器）")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
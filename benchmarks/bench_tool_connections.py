@@ -0,0 +1,76 @@
+"""
+工具调用吞吐量基准：每次调用都重新连接（改造前的行为） vs 共享连接池。
+
+用法:
+    python benchmarks/bench_tool_connections.py --db travel_new.sqlite --calls 2000 --threads 4
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tools  # noqa: E402
+from tools.car_tools import search_car_rentals  # noqa: E402
+from tools.flights_tools import fetch_user_flight_information, search_flights  # noqa: E402
+from tools.hotels_tools import search_hotels  # noqa: E402
+from tools.trip_tools import search_trip_recommendations  # noqa: E402
+
+PASSENGER_CONFIG = {"configurable": {"passenger_id": "3442 587242"}}
+
+# 模拟一次对话中最常见的几类工具调用
+WORKLOAD = [
+    lambda: fetch_user_flight_information.invoke({}, config=PASSENGER_CONFIG),
+    lambda: search_flights.invoke({"departure_airport": "BSL", "arrival_airport": "CDG"}),
+    lambda: search_hotels.invoke({"location": "Basel"}),
+    lambda: search_car_rentals.invoke({"location": "Basel"}),
+    lambda: search_trip_recommendations.invoke({"location": "Basel", "keywords": "art,history"}),
+]
+
+
+def run(calls: int, threads: int) -> float:
+    """执行 calls 次工具调用，返回每秒调用次数。"""
+
+    def call(i: int) -> None:
+        WORKLOAD[i % len(WORKLOAD)]()
+
+    started = time.perf_counter()
+    if threads <= 1:
+        for i in range(calls):
+            call(i)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(call, range(calls)))
+    return calls / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--db", default=tools.db, help="旅行数据库路径")
+    parser.add_argument("--calls", type=int, default=2000, help="每种模式的工具调用次数")
+    parser.add_argument("--threads", type=int, default=1, help="并发线程数")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        parser.error(f"数据库文件不存在: {args.db}")
+
+    # 先预热一次，避免把操作系统文件缓存的冷启动算进第一种模式
+    tools.configure_database(args.db)
+    run(len(WORKLOAD), 1)
+
+    tools.configure_database(args.db, max_size=0)
+    before = run(args.calls, args.threads)
+    tools.configure_database(args.db)
+    after = run(args.calls, args.threads)
+
+    print(f"calls={args.calls} threads={args.threads} db={args.db}")
+    print(f"每次调用重新连接: {before:10.1f} calls/s")
+    print(f"共享连接池:       {after:10.1f} calls/s  ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
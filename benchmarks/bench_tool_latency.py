@@ -0,0 +1,105 @@
+"""
+不同数据规模下的工具延迟基准。
+
+对每个 --scales 倍数，用 tools.synthetic 在临时目录中生成 DatasetSpec().scaled(倍数) 规模的数据库
+（时间平移到当前时间附近并执行 provision_travel_db），然后逐个执行常见的只读工具，每次调用前清空
+结果缓存，输出各工具的中位数和 p95 延迟。倍数 1 的规模见 tools.synthetic.DatasetSpec。
+
+用法:
+    python benchmarks/bench_tool_latency.py --scales 1 10 100 --repeats 50
+"""
+import argparse
+import io
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import closing, redirect_stdout
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tools  # noqa: E402
+from tools.cache import itinerary_cache, result_cache  # noqa: E402
+from tools.car_tools import search_car_rentals  # noqa: E402
+from tools.flights_tools import (  # noqa: E402
+    check_flight_availability,
+    fetch_user_flight_information,
+    search_flights,
+)
+from tools.hotels_tools import search_hotels  # noqa: E402
+from tools.synthetic import DatasetSpec, generate_travel_db, passenger_id, rebase  # noqa: E402
+from tools.trip_tools import search_trip_recommendations  # noqa: E402
+
+
+def workload(database: Path) -> dict[str, Callable[[], object]]:
+    """以第一个航班的航线和酒店最多的城市为参数，返回工具名 -> 调用。"""
+    with closing(sqlite3.connect(database)) as conn:
+        departure, arrival = conn.execute(
+            "SELECT departure_airport, arrival_airport FROM flights WHERE flight_id = 1"
+        ).fetchone()
+        (city,) = conn.execute(
+            "SELECT location FROM hotels GROUP BY location ORDER BY count(*) DESC, location LIMIT 1"
+        ).fetchone()
+    config = {"configurable": {"passenger_id": passenger_id(0)}}
+    return {
+        "fetch_user_flight_information": lambda: fetch_user_flight_information.invoke({}, config),
+        "search_flights": lambda: search_flights.invoke(
+            {"departure_airport": departure, "arrival_airport": arrival}
+        ),
+        "search_flights(origin)": lambda: search_flights.invoke({"departure_airport": departure}),
+        "check_flight_availability": lambda: check_flight_availability.invoke({"flight_id": 1}),
+        "search_hotels": lambda: search_hotels.invoke({"location": city}),
+        "search_car_rentals": lambda: search_car_rentals.invoke({"location": city}),
+        "search_trip_recommendations": lambda: search_trip_recommendations.invoke(
+            {"location": city, "keywords": "history, art"}
+        ),
+    }
+
+
+def time_call(call: Callable[[], object], repeats: int) -> tuple[float, float]:
+    """返回不命中缓存时的中位数和 p95 延迟（毫秒）。"""
+    samples = []
+    for _ in range(repeats):
+        result_cache.clear()
+        itinerary_cache.clear()
+        # 工具会打印查询语句和结果，不计入输出
+        with redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            call()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10], help="数据规模倍数")
+    parser.add_argument("--repeats", type=int, default=50, help="每个工具调用的次数")
+    parser.add_argument("--seed", type=int, default=7, help="随机种子")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scales:
+            spec = DatasetSpec().scaled(scale)
+            path = Path(directory) / f"travel_x{scale:g}.sqlite"
+            started = time.perf_counter()
+            counts = generate_travel_db(path, spec, args.seed)
+            rebase(path)
+            print(
+                f"\nx{scale:g}: {counts['flights']} 个航班、{counts['tickets']} 张机票、"
+                f"{counts['hotels']} 家酒店，生成耗时 {time.perf_counter() - started:.1f}s"
+            )
+            tools.configure_database(str(path))
+            for name, call in workload(path).items():
+                median, p95 = time_call(call, args.repeats)
+                print(f"  {name:32s} 中位数 {median:8.3f} ms   p95 {p95:8.3f} ms")
+            tools.configure_database(tools.db)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,14 @@ from langchain_core.prompts import ChatPromptTemplate
 
 from graph_chat.base_data_model import CompleteOrEscalate
 from graph_chat.llm_tavily import llm
-from tools.car_tools import search_car_rentals, book_car_rental, update_car_rental, cancel_car_rental
-from tools.flights_tools import search_flights, update_ticket_to_new_flight, cancel_ticket
-from tools.hotels_tools import search_hotels, book_hotel, update_hotel, cancel_hotel
-from tools.trip_tools import search_trip_recommendations, book_excursion, update_excursion, cancel_excursion
+from tools.car_tools import search_car_rentals, book_car_rental, update_car_rental, cancel_car_rental, \
+    book_car_rentals, cancel_car_rentals
+from tools.flights_tools import search_flights, search_flight_routes, check_flight_availability, \
+    update_ticket_to_new_flight, cancel_ticket
+from tools.hotels_tools import search_hotels, book_hotel, update_hotel, cancel_hotel, book_hotels, cancel_hotels
+from tools.package_tools import book_trip_package
+from tools.trip_tools import search_trip_recommendations, book_excursion, update_excursion, cancel_excursion, \
+    book_excursions, cancel_excursions
 
 # 航班预订助手
 flight_booking_prompt = ChatPromptTemplate.from_messages(
@@ -18,6 +22,8 @@ flight_booking_prompt = ChatPromptTemplate.from_messages(
             "当用户需要帮助更新他们的预订时，主助理会将工作委托给您。"
             "请与客户确认更新后的航班详情，并告知他们任何额外费用。"
             "在搜索时，请坚持不懈。如果第一次搜索没有结果，请扩大查询范围。"
+            "航班搜索结果是分页的：如果返回了 next_cursor，请用它获取下一页，而不是重新放宽查询条件。"
+            "不要为客户选择 seats_available 为 0 的航班；改签前请用 check_flight_availability 确认机票所在的舱位还有空座。"
             "如果您需要更多信息或客户改变主意，请将任务升级回主助理。"
             "请记住，在相关工具成功使用后，预订才算完成。"
             "\n\n当前用户的航班信息:\n<Flights>\n{user_info}\n</Flights>"
@@ -30,7 +36,7 @@ flight_booking_prompt = ChatPromptTemplate.from_messages(
 ).partial(time=datetime.now())
 
 # 定义安全工具（只读操作）和敏感工具（涉及更改的操作）
-update_flight_safe_tools = [search_flights]
+update_flight_safe_tools = [search_flights, search_flight_routes, check_flight_availability]
 update_flight_sensitive_tools = [update_ticket_to_new_flight, cancel_ticket]
 
 # 合并所有工具
@@ -49,6 +55,9 @@ book_hotel_prompt = ChatPromptTemplate.from_messages(
             "您是专门处理酒店预订的助理。"
             "当用户需要帮助预订酒店时，主助理会将工作委托给您。"
             "根据用户的偏好搜索可用酒店，并与客户确认预订详情。"
+            "客户一次确认多家酒店时，请调用一次 book_hotels 或 cancel_hotels，而不是逐个预订。"
+            "客户一次确认酒店、租车和旅行项目的组合时，请调用一次 book_trip_package 完成全部预订或取消，而不是分别确认。"
+            "客户想住在航班落地的城市时，直接用 arrival_flight_id 或到达机场代码搜索，无需先换算城市。"
             "在搜索时，请坚持不懈。如果第一次搜索没有结果，请扩大查询范围。"
             "如果您需要更多信息或客户改变主意，请将任务升级回主助理。"
             "请记住，在相关工具成功使用后，预订才算完成。"
@@ -68,7 +77,7 @@ book_hotel_prompt = ChatPromptTemplate.from_messages(
 
 # 定义安全工具（只读操作）和敏感工具（涉及更改的操作）
 book_hotel_safe_tools = [search_hotels]
-book_hotel_sensitive_tools = [book_hotel, update_hotel, cancel_hotel]
+book_hotel_sensitive_tools = [book_hotel, update_hotel, cancel_hotel, book_hotels, cancel_hotels, book_trip_package]
 
 # 合并所有工具
 book_hotel_tools = book_hotel_safe_tools + book_hotel_sensitive_tools
@@ -86,6 +95,9 @@ book_car_rental_prompt = ChatPromptTemplate.from_messages(
             "您是专门处理租车预订的助理。"
             "当用户需要帮助预订租车时，主助理会将工作委托给您。"
             "根据用户的偏好搜索可用租车，并与客户确认预订详情。"
+            "客户一次确认多项租车时，请调用一次 book_car_rentals 或 cancel_car_rentals，而不是逐个预订。"
+            "客户一次确认酒店、租车和旅行项目的组合时，请调用一次 book_trip_package 完成全部预订或取消，而不是分别确认。"
+            "客户想在航班落地的城市租车时，直接用 arrival_flight_id 或到达机场代码搜索，无需先换算城市。"
             "在搜索时，请坚持不懈。如果第一次搜索没有结果，请扩大查询范围。"
             "如果您需要更多信息或客户改变主意，请将任务升级回主助理。"
             "请记住，在相关工具成功使用后，预订才算完成。"
@@ -109,6 +121,9 @@ book_car_rental_sensitive_tools = [
     book_car_rental,
     update_car_rental,
     cancel_car_rental,
+    book_car_rentals,
+    cancel_car_rentals,
+    book_trip_package,
 ]
 
 # 合并所有工具
@@ -127,6 +142,8 @@ book_excursion_prompt = ChatPromptTemplate.from_messages(
             "您是专门处理旅行推荐的助理。"
             "当用户需要帮助预订推荐的旅行时，主助理会将工作委托给您。"
             "根据用户的偏好搜索可用的旅行推荐，并与客户确认预订详情。"
+            "客户一次确认多个旅行项目时，请调用一次 book_excursions 或 cancel_excursions，而不是逐个预订。"
+            "客户一次确认酒店、租车和旅行项目的组合时，请调用一次 book_trip_package 完成全部预订或取消，而不是分别确认。"
             "如果您需要更多信息或客户改变主意，请将任务升级回主助理。"
             "在搜索时，请坚持不懈。如果第一次搜索没有结果，请扩大查询范围。"
             "请记住，在相关工具成功使用后，预订才算完成。"
@@ -145,7 +162,14 @@ book_excursion_prompt = ChatPromptTemplate.from_messages(
 
 # 定义安全工具（只读操作）和敏感工具（涉及更改的操作）
 book_excursion_safe_tools = [search_trip_recommendations]
-book_excursion_sensitive_tools = [book_excursion, update_excursion, cancel_excursion]
+book_excursion_sensitive_tools = [
+    book_excursion,
+    update_excursion,
+    cancel_excursion,
+    book_excursions,
+    cancel_excursions,
+    book_trip_package,
+]
 
 # 合并所有工具
 book_excursion_tools = book_excursion_safe_tools + book_excursion_sensitive_tools
@@ -11,8 +11,9 @@ from graph_chat.base_data_model import ToFlightBookingAssistant, ToBookCarRental
 from graph_chat.llm_tavily import tavily_tool, llm
 from graph_chat.state import State
 from tools.car_tools import search_car_rentals, book_car_rental, update_car_rental, cancel_car_rental
+from tools.destination_tools import search_destination_bundle
 from tools.flights_tools import fetch_user_flight_information, search_flights, update_ticket_to_new_flight, \
-    cancel_ticket
+    cancel_ticket, search_flight_routes, check_flight_availability
 from tools.hotels_tools import search_hotels, book_hotel, update_hotel, cancel_hotel
 from tools.retriever_vector import lookup_policy
 from tools.trip_tools import search_trip_recommendations, book_excursion, update_excursion, cancel_excursion
@@ -69,6 +70,8 @@ primary_assistant_prompt = ChatPromptTemplate.from_messages(
             "用户并不知道有不同的专门助理存在，因此请不要提及他们；只需通过函数调用来安静地委派任务。"
             "向客户提供详细的信息，并且在确定信息不可用之前总是复查数据库。"
             "在搜索时，请坚持不懈。如果第一次搜索没有结果，请扩大查询范围。"
+            "航班搜索结果是分页的：如果返回了 next_cursor，请用它获取下一页，而不是重新放宽查询条件。"
+            "客户询问某个目的地在某段时间有哪些航班、酒店、租车或游览项目时，先调用一次 search_destination_bundle 获取汇总。"
             "如果搜索无果，请扩大搜索范围后再放弃。"
             "\n\n当前用户的航班信息:\n<Flights>\n{user_info}\n</Fllights>"
             "\n当前时间: {time}.",
@@ -81,6 +84,9 @@ primary_assistant_prompt = ChatPromptTemplate.from_messages(
 primary_assistant_tools = [
     tavily_tool,  # 假设TavilySearchResults是一个有效的搜索工具
     search_flights,  # 搜索航班的工具
+    search_flight_routes,  # 搜索中转航线的工具
+    check_flight_availability,  # 查询航班各舱位余座的工具
+    search_destination_bundle,  # 一次查询目的地的航班、酒店、租车和旅行推荐
     lookup_policy,  # 查找公司政策的工具
 ]
 
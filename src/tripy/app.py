@@ -13,6 +13,7 @@ from tripy.core.logging import setup_logging
 from tripy.core.observability import setup_observability
 from tripy.db.init_db import init_db
 from tripy.middleware.request_context import RequestContextMiddleware
+from tripy.services.graph_service import provision_travel_database
 
 
 @asynccontextmanager
@@ -20,6 +21,7 @@ async def lifespan(_: FastAPI) -> AsyncIterator[None]:
     settings = get_settings()
     setup_logging(settings)
     init_db()
+    provision_travel_database()
     yield
 
 
@@ -10,6 +10,19 @@ from tripy.core.config import get_settings
 logger = logging.getLogger(__name__)
 
 
+def provision_travel_database() -> None:
+    """Create the indexes the travel tools rely on before the first graph request."""
+    settings = get_settings()
+    if not settings.graph_enabled:
+        return
+
+    try:
+        module = import_module("tools.provision")
+        module.provision_travel_db()
+    except Exception:
+        logger.exception("travel database provisioning failed")
+
+
 class GraphService:
     def __init__(self) -> None:
         self._graph: Any | None = None
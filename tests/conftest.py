@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import sqlite3
+from collections.abc import Iterator
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+import tools
+
+PASSENGER_ID = "3442 587242"
+
+TRAVEL_SCHEMA = """
+CREATE TABLE aircrafts_data (aircraft_code TEXT, model TEXT, range INTEGER);
+CREATE TABLE airports_data (
+    airport_code TEXT, airport_name TEXT, city TEXT, coordinates TEXT, timezone TEXT
+);
+CREATE TABLE boarding_passes (ticket_no TEXT, flight_id INTEGER, boarding_no INTEGER, seat_no TEXT);
+CREATE TABLE bookings (book_ref TEXT, book_date TIMESTAMP, total_amount INTEGER);
+CREATE TABLE flights (
+    flight_id INTEGER, flight_no TEXT, scheduled_departure TIMESTAMP,
+    scheduled_arrival TIMESTAMP, departure_airport TEXT, arrival_airport TEXT,
+    status TEXT, aircraft_code TEXT, actual_departure TIMESTAMP, actual_arrival TIMESTAMP
+);
+CREATE TABLE seats (aircraft_code TEXT, seat_no TEXT, fare_conditions TEXT);
+CREATE TABLE ticket_flights (ticket_no TEXT, flight_id INTEGER, fare_conditions TEXT, amount REAL);
+CREATE TABLE tickets (ticket_no TEXT, book_ref TEXT, passenger_id TEXT);
+CREATE TABLE car_rentals (
+    id INTEGER, name TEXT, location TEXT, price_tier TEXT,
+    start_date TEXT, end_date TEXT, booked INTEGER
+);
+CREATE TABLE hotels (
+    id INTEGER, name TEXT, location TEXT, price_tier TEXT,
+    checkin_date TEXT, checkout_date TEXT, booked INTEGER
+);
+CREATE TABLE trip_recommendations (
+    id INTEGER, name TEXT, location TEXT, keywords TEXT, details TEXT, booked INTEGER
+);
+"""
+
+
+def _ts(value: datetime) -> str:
+    return value.isoformat(sep=" ", timespec="microseconds")
+
+
+def build_travel_db(path: Path) -> Path:
+    """Create a small database with the same schema as the bundled travel2.sqlite."""
+    now = datetime.now(UTC).replace(minute=0, second=0, microsecond=0)
+    conn = sqlite3.connect(path)
+    conn.executescript(TRAVEL_SCHEMA)
+    conn.executemany(
+        "INSERT INTO airports_data VALUES (?, ?, ?, ?, ?)",
+        [
+            ("BSL", "EuroAirport Basel-Mulhouse", "Basel", "(7.52,47.59)", "Europe/Zurich"),
+            ("ZRH", "Zurich Airport", "Zurich", "(8.55,47.46)", "Europe/Zurich"),
+            ("CDG", "Charles de Gaulle Airport", "Paris", "(2.55,49.01)", "Europe/Paris"),
+        ],
+    )
+    conn.execute("INSERT INTO aircrafts_data VALUES ('320', 'Airbus A320-200', 5700)")
+    conn.executemany(
+        "INSERT INTO seats VALUES ('320', ?, ?)",
+        [("1A", "Business"), ("1B", "Business"), ("2A", "Economy"), ("2B", "Economy")],
+    )
+    flights = []
+    for flight_id, (dep, arr, hours) in enumerate(
+        [
+            ("BSL", "CDG", -48),
+            ("BSL", "CDG", 24),
+            ("BSL", "CDG", 48),
+            ("CDG", "BSL", 72),
+            ("ZRH", "CDG", 30),
+            ("CDG", "ZRH", 36),
+            ("BSL", "ZRH", 2),
+        ],
+        start=1,
+    ):
+        departure = now + timedelta(hours=hours)
+        arrival = departure + timedelta(hours=1, minutes=20)
+        actual_departure = _ts(departure) if hours < 0 else "\\N"
+        actual_arrival = _ts(arrival) if hours < 0 else "\\N"
+        flights.append(
+            (
+                flight_id,
+                f"LX{100 + flight_id}",
+                _ts(departure),
+                _ts(arrival),
+                dep,
+                arr,
+                "Arrived" if hours < 0 else "Scheduled",
+                "320",
+                actual_departure,
+                actual_arrival,
+            )
+        )
+    conn.executemany("INSERT INTO flights VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", flights)
+    conn.executemany(
+        "INSERT INTO bookings VALUES (?, ?, ?)",
+        [("B00001", _ts(now - timedelta(days=10)), 32000), ("B00002", _ts(now), 18000)],
+    )
+    conn.executemany(
+        "INSERT INTO tickets VALUES (?, ?, ?)",
+        [
+            ("7240005432906569", "B00001", PASSENGER_ID),
+            ("7240005432906570", "B00001", PASSENGER_ID),
+            ("7240005432906571", "B00002", "8149 604011"),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO ticket_flights VALUES (?, ?, ?, ?)",
+        [
+            ("7240005432906569", 2, "Economy", 12000.0),
+            ("7240005432906570", 4, "Business", 42000.0),
+            ("7240005432906571", 2, "Economy", 12000.0),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO boarding_passes VALUES (?, ?, ?, ?)",
+        [
+            ("7240005432906569", 2, 1, "2A"),
+            ("7240005432906570", 4, 1, "1A"),
+            ("7240005432906571", 2, 2, "2B"),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO hotels VALUES (?, ?, ?, ?, ?, ?, 0)",
+        [
+            (1, "Hilton Basel", "Basel", "Luxury", "2024-04-22", "2024-04-20"),
+            (2, "Marriott Zurich", "Zurich", "Upscale", "2024-04-14", "2024-04-21"),
+            (3, "Hyatt Regency Basel", "Basel", "Upper Upscale", "2024-04-02", "2024-04-20"),
+            (4, "Radisson Blu Lucerne", "Lucerne", "Midscale", "2024-04-24", "2024-04-05"),
+            (5, "Best Western Bern", "Bern", "Upper Midscale", "2024-04-23", "2024-04-01"),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO car_rentals VALUES (?, ?, ?, ?, ?, ?, 0)",
+        [
+            (1, "Europcar", "Basel", "Economy", "2024-04-14", "2024-04-11"),
+            (2, "Avis", "Basel", "Luxury", "2024-04-10", "2024-04-20"),
+            (3, "Hertz", "Zurich", "Midsize", "2024-04-10", "2024-04-07"),
+            (4, "Sixt", "Bern", "Midsize", "2024-04-20", "2024-04-26"),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO trip_recommendations VALUES (?, ?, ?, ?, ?, 0)",
+        [
+            (1, "Basel Minster", "Basel", "landmark, history", "Visit the historic cathedral."),
+            (2, "Kunstmuseum Basel", "Basel", "art, museum", "Explore the museum."),
+            (3, "Zurich Old Town", "Zurich", "history, architecture", "Walk the old town."),
+            (4, "Lucerne Chapel Bridge", "Lucerne", "bridge, history", "Historic bridge."),
+        ],
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def travel_db(tmp_path: Path) -> Iterator[Path]:
+    """Point the travel tools at a fresh copy of the sample database."""
+    path = build_travel_db(tmp_path / "travel.sqlite")
+    tools.configure_database(str(path))
+    yield path
+    tools.configure_database(tools.db)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+import tools
+from tools.airports import airport_city, city_airports, resolve_location
+from tools.car_tools import search_car_rentals
+from tools.hotels_tools import search_hotels
+from tools.provision import provision_travel_db
+
+
+def _ids(page: dict) -> list[int]:
+    return sorted(row["id"] for row in page["results"])
+
+
+def test_index_merges_database_and_reference_file(travel_db: Path) -> None:
+    with closing(sqlite3.connect(travel_db)) as conn:
+        conn.execute("UPDATE airports_data SET city = 'Zürich' WHERE airport_code = 'ZRH'")
+        conn.execute("INSERT INTO airports_data VALUES ('XAA', 'Atlantis', 'Atlantis', '', '')")
+        conn.commit()
+    tools.notify_database_reset()
+    provision_travel_db()
+
+    with closing(sqlite3.connect(travel_db)) as conn:
+        rows = dict(conn.execute("SELECT airport_code, city FROM airport_cities"))
+    # City names from airports_data are folded onto the gazetteer's names
+    assert rows["ZRH"] == "Zurich"
+    assert rows["XAA"] == "Atlantis"
+    # Airports missing from airports_data come from tools/gazetteer.json
+    assert rows["ORY"] == "Paris"
+
+    assert airport_city("xaa") == "Atlantis"
+    assert city_airports("巴黎") == ["CDG", "ORY"]
+    assert city_airports("CDG") == ["CDG", "ORY"]
+    assert resolve_location("zrh") == "Zurich"
+    assert resolve_location("Bern") == "Bern"
+
+
+@pytest.mark.parametrize("provisioned", [False, True])
+def test_searches_accept_airport_codes(travel_db: Path, provisioned: bool) -> None:
+    if provisioned:
+        provision_travel_db()
+    assert _ids(search_hotels.invoke({"location": "BSL"})) == [1, 3]
+    assert _ids(search_car_rentals.invoke({"location": "zrh"})) == [3]
+
+
+@pytest.mark.parametrize("provisioned", [False, True])
+def test_searches_join_on_the_arrival_city(travel_db: Path, provisioned: bool) -> None:
+    if provisioned:
+        provision_travel_db()
+    # Flight 4 lands in Basel, flight 7 in Zurich
+    assert _ids(search_hotels.invoke({"arrival_flight_id": 4})) == [1, 3]
+    assert _ids(search_car_rentals.invoke({"arrival_flight_id": 7})) == [3]
+    assert _ids(search_hotels.invoke({"arrival_flight_id": 4, "name": "Hyatt"})) == [3]
+    assert _ids(search_hotels.invoke({"arrival_flight_id": 99})) == []
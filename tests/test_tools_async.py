@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from pathlib import Path
+
+import tools
+from tools.car_tools import search_car_rentals
+from tools.flights_tools import fetch_user_flight_information, search_flights
+from tools.hotels_tools import book_hotel, search_hotels
+from tools.trip_tools import search_trip_recommendations
+
+PASSENGER_CONFIG = {"configurable": {"passenger_id": "3442 587242"}}
+
+
+def test_async_results_match_sync_results(travel_db: Path) -> None:
+    async def run() -> list:
+        return list(
+            await asyncio.gather(
+                search_hotels.ainvoke({"location": "Basel"}),
+                search_car_rentals.ainvoke({"location": "Basel"}),
+                search_trip_recommendations.ainvoke({"keywords": "art"}),
+                search_flights.ainvoke({"departure_airport": "BSL"}),
+                fetch_user_flight_information.ainvoke({}, PASSENGER_CONFIG),
+            )
+        )
+
+    results = asyncio.run(run())
+    assert results == [
+        search_hotels.invoke({"location": "Basel"}),
+        search_car_rentals.invoke({"location": "Basel"}),
+        search_trip_recommendations.invoke({"keywords": "art"}),
+        search_flights.invoke({"departure_airport": "BSL"}),
+        fetch_user_flight_information.invoke({}, PASSENGER_CONFIG),
+    ]
+
+
+def test_async_tools_run_on_database_executor(travel_db: Path) -> None:
+    threads: set[str] = set()
+    with tools.get_connection() as conn:
+        conn.set_trace_callback(lambda _: threads.add(threading.current_thread().name))
+
+    async def run() -> str:
+        return await book_hotel.ainvoke({"hotel_id": 2})
+
+    try:
+        assert asyncio.run(run()) == "Hotel 2 成功预定。"
+    finally:
+        with tools.get_connection() as conn:
+            conn.set_trace_callback(None)
+    assert threads and all(name.startswith("travel-db") for name in threads)
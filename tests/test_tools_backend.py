@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import shutil
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import tools
+from tools import backend
+from tools.backend import ITINERARY_STATEMENT, catalog_statement, configure_backend, get_backend
+from tools.car_tools import search_car_rentals
+from tools.flights_tools import fetch_user_flight_information, search_flights
+from tools.hotels_tools import book_hotel, search_hotels
+from tools.provision import provision_travel_db
+from tools.trip_tools import search_trip_recommendations
+
+PASSENGER_CONFIG = {"configurable": {"passenger_id": "3442 587242"}}
+OTHER_CONFIG = {"configurable": {"passenger_id": "8149 604011"}}
+
+
+@pytest.fixture(autouse=True)
+def _default_backend() -> Iterator[None]:
+    yield
+    configure_backend(None)
+
+
+def _use_portable_queries(path: Path) -> None:
+    """Run the server-database code path against the SQLite stand-in."""
+    configure_backend(f"sqlite:///{path}", portable=True)
+
+
+def _ids(page: dict) -> list[int]:
+    return [row["id"] for row in page["results"]]
+
+
+def test_default_backend_follows_the_tool_database(travel_db: Path) -> None:
+    assert get_backend().url == f"sqlite:///{travel_db}"
+    assert get_backend().portable is False
+    assert get_backend().dialect == "sqlite"
+
+
+@pytest.mark.parametrize(
+    ("tool", "arguments"),
+    [
+        (search_hotels, {"location": "巴塞尔"}),
+        (search_hotels, {"location": "basel", "sort_by": "-price_tier", "limit": 1}),
+        (search_car_rentals, {"arrival_flight_id": 7}),
+        (search_trip_recommendations, {"keywords": "museum, lake", "sort_by": "name"}),
+    ],
+)
+def test_portable_searches_match_sqlite(travel_db: Path, tool, arguments: dict) -> None:
+    native = tool.invoke(arguments)
+    assert native["results"]
+    _use_portable_queries(travel_db)
+    portable = tool.invoke(arguments)
+    if "sort_by" in arguments:
+        assert _ids(portable) == _ids(native)
+    else:
+        assert sorted(_ids(portable)) == sorted(_ids(native))
+    assert portable["truncated"] == native["truncated"]
+    assert portable.get("summary") == native.get("summary")
+
+
+def test_portable_dates_fall_back_to_the_booked_flag(travel_db: Path) -> None:
+    assert book_hotel.invoke({"hotel_id": 1}) == "Hotel 1 成功预定。"
+    _use_portable_queries(travel_db)
+    page = search_hotels.invoke({"location": "Basel", "checkin_date": "2030-01-01"})
+    assert _ids(page) == [3]
+
+
+def test_server_database_is_a_read_replica(
+    travel_db: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # A replica that never receives the primary's later writes
+    replica = tmp_path / "replica.sqlite"
+    shutil.copy(travel_db, replica)
+    configure_backend(f"sqlite:///{replica}", portable=True)
+
+    def booked(config: dict) -> bool:
+        return bool(search_hotels.invoke({"name": "Hilton"}, config)["results"][0]["booked"])
+
+    assert "成功预定" in book_hotel.invoke({"hotel_id": 1}, PASSENGER_CONFIG)
+    # The write went to the primary; the writer reads it back from there
+    assert booked(PASSENGER_CONFIG)
+    assert not booked(OTHER_CONFIG)
+    assert tools.replica_may_lag()
+
+    monkeypatch.setattr(tools, "READ_YOUR_WRITES_SECONDS", 0)
+    assert backend.replica_backend() is not None
+    assert not booked(PASSENGER_CONFIG)
+
+
+def test_portable_itinerary_matches_sqlite(travel_db: Path) -> None:
+    native = fetch_user_flight_information.invoke({}, PASSENGER_CONFIG)
+    _use_portable_queries(travel_db)
+    portable = fetch_user_flight_information.invoke({}, PASSENGER_CONFIG)
+    assert sorted(portable, key=lambda row: row["ticket_no"]) == sorted(
+        native, key=lambda row: row["ticket_no"]
+    )
+
+
+@pytest.mark.parametrize("provisioned", [True, False])
+def test_portable_flight_search_matches_sqlite(travel_db: Path, provisioned: bool) -> None:
+    if provisioned:
+        provision_travel_db()
+
+    def pages(arguments: dict) -> list[dict]:
+        page = search_flights.invoke(arguments)
+        results = [page]
+        while page["next_cursor"]:
+            page = search_flights.invoke({**arguments, "cursor": page["next_cursor"]})
+            results.append(page)
+        return results
+
+    arguments = {"departure_airport": "BSL", "start_time": "2000-01-01", "limit": 2}
+    native = pages(arguments)
+    assert [len(page["flights"]) for page in native] == [2, 2]
+    _use_portable_queries(travel_db)
+    assert pages(arguments) == native
+
+
+def test_no_server_database_means_no_engine(travel_db: Path) -> None:
+    configure_backend(None)
+    backend._backend = None
+    search_flights.invoke({"departure_airport": "BSL"})
+    search_hotels.invoke({"location": "Basel"})
+    assert backend._backend is None
+
+
+def test_statements_compile_for_other_dialects() -> None:
+    dialect = postgresql.dialect()
+    assert "JOIN boarding_passes" in str(ITINERARY_STATEMENT.compile(dialect=dialect))
+    statement = catalog_statement(backend.hotels, location="Basel", arrival_flight_id=4)
+    sql = str(statement.compile(dialect=dialect))
+    assert "ILIKE" in sql
+    assert "flights.arrival_airport = airports_data.airport_code" in sql
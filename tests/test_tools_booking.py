@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+from tools import booking
+from tools.booking import booking_stats
+from tools.car_tools import book_car_rental
+from tools.flights_tools import (
+    cancel_ticket,
+    fetch_user_flight_information,
+    update_ticket_to_new_flight,
+)
+from tools.hotels_tools import book_hotel, book_hotels, cancel_hotel, cancel_hotels, update_hotel
+from tools.package_tools import book_trip_package
+from tools.provision import provision_travel_db
+from tools.trip_tools import book_excursion, book_excursions
+
+PASSENGER_CONFIG = {"configurable": {"passenger_id": "3442 587242"}}
+OTHER_CONFIG = {"configurable": {"passenger_id": "8149 604011"}}
+
+
+@pytest.fixture(autouse=True)
+def _reset_stats() -> None:
+    booking_stats.reset()
+
+
+def test_double_booking_is_a_conflict(travel_db: Path) -> None:
+    assert book_hotel.invoke({"hotel_id": 1}) == "Hotel 1 成功预定。"
+    assert book_hotel.invoke({"hotel_id": 1}) == "Hotel 1 已被预订，不能重复预订。"
+    assert book_hotel.invoke({"hotel_id": 99}) == "未找到ID为 99 的酒店。"
+    assert cancel_hotel.invoke({"hotel_id": 1}) == "Hotel 1 成功取消。"
+    assert book_hotel.invoke({"hotel_id": 1}) == "Hotel 1 成功预定。"
+    assert book_car_rental.invoke({"rental_id": 2}) == "汽车租赁 2 成功预订。"
+    assert book_excursion.invoke({"recommendation_id": 3}).startswith("旅行推荐  3 成功预定")
+
+    assert booking_stats.stats()["book:hotels"]["statuses"] == {
+        "ok": 2,
+        "conflict": 1,
+        "not_found": 1,
+    }
+
+
+def test_concurrent_bookings_succeed_once(travel_db: Path) -> None:
+    barrier = threading.Barrier(8)
+    results: list[str] = []
+
+    def worker() -> None:
+        barrier.wait()
+        results.append(booking.book_item("hotels", 2).status)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == ["conflict"] * 7 + ["ok"]
+
+
+def test_update_changes_only_given_columns(travel_db: Path) -> None:
+    assert update_hotel.invoke({"hotel_id": 2, "checkout_date": "2024-05-01"}) == (
+        "Hotel 2 成功更新。"
+    )
+    assert update_hotel.invoke({"hotel_id": 2}) == "Hotel 2 成功更新。"
+    assert update_hotel.invoke({"hotel_id": 99}) == "未找到ID为 99 的酒店。"
+    with closing(sqlite3.connect(travel_db)) as conn:
+        row = conn.execute("SELECT checkin_date, checkout_date FROM hotels WHERE id = 2").fetchone()
+    assert row == ("2024-04-14", "2024-05-01 00:00:00")
+    with pytest.raises(ValueError):
+        booking.update_item("hotels", 2, booked=1)
+
+
+def test_cancel_ticket_checks_ownership(travel_db: Path) -> None:
+    arguments = {"ticket_no": "7240005432906569"}
+    assert cancel_ticket.invoke(arguments, OTHER_CONFIG) == (
+        "当前登录的乘客 ID 为 8149 604011，不是机票 7240005432906569 的拥有者。"
+    )
+    fetch_user_flight_information.invoke({}, PASSENGER_CONFIG)
+
+    assert cancel_ticket.invoke(arguments, PASSENGER_CONFIG) == "机票已成功取消。"
+    assert cancel_ticket.invoke(arguments, PASSENGER_CONFIG) == "未找到给定机票号码的现有机票。"
+    itinerary = fetch_user_flight_information.invoke({}, PASSENGER_CONFIG)
+    assert {row["flight_id"] for row in itinerary} == {4}
+
+
+def test_rebooking_onto_a_held_flight_is_a_conflict(travel_db: Path) -> None:
+    # The passenger already holds ticket ...6570 on flight 4
+    result = update_ticket_to_new_flight.invoke(
+        {"ticket_no": "7240005432906569", "new_flight_id": 4}, PASSENGER_CONFIG
+    )
+    assert result == "乘客 3442 587242 已持有航班 4 的机票，不能重复预订。"
+    assert update_ticket_to_new_flight.invoke(
+        {"ticket_no": "7240005432906569", "new_flight_id": 99}, PASSENGER_CONFIG
+    ) == ("提供的新的航班 ID 无效。")
+    assert update_ticket_to_new_flight.invoke(
+        {"ticket_no": "7240005432906569", "new_flight_id": 3}, OTHER_CONFIG
+    ).startswith("当前登录的乘客 ID 为 8149 604011")
+
+    stats = booking_stats.stats()["rebook:ticket"]
+    assert stats["count"] == 3
+    assert stats["statuses"] == {"conflict": 1, "not_found": 1, "forbidden": 1}
+    assert stats["max_hold_seconds"] >= 0
+
+
+def test_failed_operations_roll_back(travel_db: Path) -> None:
+    with pytest.raises(RuntimeError):
+        with booking.write_transaction("test") as transaction:
+            transaction.conn.execute("UPDATE hotels SET booked = 1 WHERE id = 3")
+            raise RuntimeError("boom")
+
+    with closing(sqlite3.connect(travel_db)) as conn:
+        assert conn.execute("SELECT booked FROM hotels WHERE id = 3").fetchone() == (0,)
+    assert booking_stats.stats()["test"]["statuses"] == {"error": 1}
+
+
+def test_batch_tools_apply_every_item_in_one_transaction(travel_db: Path) -> None:
+    results = book_hotels.invoke({"hotel_ids": [1, 2, 99, 1]})
+    assert [(result["id"], result["status"]) for result in results] == [
+        (1, "ok"),
+        (2, "ok"),
+        (99, "not_found"),
+        (1, "conflict"),
+    ]
+    assert results[0]["message"] == "Hotel 1 成功预定。"
+    stats = booking_stats.stats()
+    assert stats["batch"]["count"] == 1
+    assert stats["batch"]["statuses"] == {"partial": 1}
+    assert "book:hotels" not in stats
+
+    cancelled = cancel_hotels.invoke({"hotel_ids": [1, 2]})
+    assert [result["status"] for result in cancelled] == ["ok", "ok"]
+    assert [
+        result["status"] for result in book_excursions.invoke({"recommendation_ids": [1, 2]})
+    ] == [
+        "ok",
+        "ok",
+    ]
+
+
+def test_all_or_nothing_batches_roll_back(travel_db: Path) -> None:
+    assert book_hotel.invoke({"hotel_id": 1}) == "Hotel 1 成功预定。"
+
+    results = book_hotels.invoke({"hotel_ids": [3, 1], "all_or_nothing": True})
+    assert [result["status"] for result in results] == ["rolled_back", "conflict"]
+    with closing(sqlite3.connect(travel_db)) as conn:
+        assert conn.execute("SELECT booked FROM hotels WHERE id = 3").fetchone() == (0,)
+
+
+def test_mixed_batches_span_tables(travel_db: Path) -> None:
+    provision_travel_db()
+    june = {"start": "2025-06-01", "end": "2025-06-03"}
+    results = booking.apply_batch(
+        [
+            booking.BatchItem("book", "hotels", 1, **june),
+            booking.BatchItem("book", "hotels", 1, **june),
+            booking.BatchItem("book", "car_rentals", 2, **june),
+            booking.BatchItem("book", "trip_recommendations", 2),
+        ]
+    )
+    assert [result.status for result in results] == ["ok", "conflict", "ok", "ok"]
+    assert results[1].message == "Hotel 1 在所选日期没有空房。"
+    with closing(sqlite3.connect(travel_db)) as conn:
+        assert conn.execute("SELECT count(*) FROM reservations").fetchone() == (2,)
+
+    with pytest.raises(ValueError):
+        booking.apply_batch([booking.BatchItem("book", "trip_recommendations", 1, **june)])
+
+
+def test_trip_package_is_confirmed_once_across_tables(travel_db: Path) -> None:
+    provision_travel_db()
+    june = {"start_date": "2025-06-01", "end_date": "2025-06-03"}
+    package = [
+        {"table": "hotels", "item_id": 1, **june},
+        {"table": "car_rentals", "item_id": 2, **june},
+        {"table": "trip_recommendations", "item_id": 2},
+    ]
+    assert book_excursion.invoke({"recommendation_id": 2}) == "旅行推荐  2 成功预定."
+
+    # The excursion is taken, so the hotel and car are not booked either
+    results = book_trip_package.invoke({"items": package})
+    assert [(result["table"], result["status"]) for result in results] == [
+        ("hotels", "rolled_back"),
+        ("car_rentals", "rolled_back"),
+        ("trip_recommendations", "conflict"),
+    ]
+    with closing(sqlite3.connect(travel_db)) as conn:
+        assert conn.execute("SELECT count(*) FROM reservations").fetchone() == (0,)
+
+    package[2]["item_id"] = 1
+    results = book_trip_package.invoke({"items": package})
+    assert [result["status"] for result in results] == ["ok", "ok", "ok"]
+    assert results[0]["message"] == "Hotel 1 成功预定。"
+    assert booking_stats.stats()["batch"]["count"] == 2
+
+    cancelled = book_trip_package.invoke(
+        {"items": [{**item, "action": "cancel"} for item in package]}
+    )
+    assert [result["status"] for result in cancelled] == ["ok", "ok", "ok"]
+    with closing(sqlite3.connect(travel_db)) as conn:
+        assert conn.execute("SELECT count(*) FROM reservations").fetchone() == (0,)
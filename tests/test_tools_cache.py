@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+from tools.cache import ToolResultCache, normalize_arguments, result_cache
+from tools.car_tools import search_car_rentals
+from tools.hotels_tools import book_hotel, search_hotels
+
+
+def _search(location: str | None = None, name: str | None = None) -> None:
+    return None
+
+
+def test_arguments_are_normalized() -> None:
+    assert normalize_arguments(_search, ("Basel",), {}) == normalize_arguments(
+        _search, (), {"location": "Basel", "name": None}
+    )
+    assert normalize_arguments(_search, ("BASEL",), {}, fold_case=True) == normalize_arguments(
+        _search, ("basel",), {}, fold_case=True
+    )
+    assert normalize_arguments(_search, ("BASEL",), {}) != normalize_arguments(
+        _search, ("basel",), {}
+    )
+
+
+def test_lru_eviction_and_table_invalidation() -> None:
+    cache = ToolResultCache(max_entries=2)
+    cache.put("a", ("hotels",), 1, cache.versions(("hotels",)))
+    cache.put("b", ("car_rentals",), 2, cache.versions(("car_rentals",)))
+    assert cache.get("a") == (True, 1)
+    cache.put("c", ("hotels",), 3, cache.versions(("hotels",)))
+
+    assert cache.get("b") == (False, None)
+    cache.invalidate_tables("hotels")
+    assert cache.get("a") == (False, None)
+    assert cache.get("c") == (False, None)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 3, 1)
+    assert stats["invalidations"] == 2
+
+
+def test_results_computed_before_a_write_are_not_cached() -> None:
+    cache = ToolResultCache()
+    versions = cache.versions(("hotels",))
+    cache.invalidate_tables("hotels")
+    cache.put("stale", ("hotels",), [], versions)
+    assert cache.get("stale") == (False, None)
+
+
+def test_search_results_are_cached_until_booking(travel_db: Path) -> None:
+    before = result_cache.stats()
+    first = search_hotels.invoke({"location": "Basel"})
+    second = search_hotels.invoke({"location": "basel", "name": None})
+    assert first == second
+    assert result_cache.stats()["hits"] == before["hits"] + 1
+
+    book_hotel.invoke({"hotel_id": 1})
+    booked = {
+        hotel["id"]: hotel["booked"]
+        for hotel in search_hotels.invoke({"location": "Basel"})["results"]
+    }
+    assert booked[1] == 1
+
+
+def test_arrival_city_searches_follow_flight_changes(travel_db: Path) -> None:
+    def locations(tool) -> set[str]:
+        return {row["location"] for row in tool.invoke({"arrival_flight_id": 7})["results"]}
+
+    assert locations(search_hotels) == locations(search_car_rentals) == {"Zurich"}
+    # Flight 7 is diverted to Basel outside the booking tools
+    with closing(sqlite3.connect(travel_db)) as conn:
+        conn.execute("UPDATE flights SET arrival_airport = 'BSL' WHERE flight_id = 7")
+        conn.commit()
+    assert locations(search_hotels) == locations(search_car_rentals) == {"Basel"}
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from tools.car_tools import search_car_rentals
+from tools.hotels_tools import search_hotels
+from tools.provision import provision_travel_db
+from tools.trip_tools import search_trip_recommendations
+
+
+def test_small_result_is_not_truncated(travel_db: Path) -> None:
+    page = search_hotels.invoke({"location": "Basel"})
+    assert len(page["results"]) == 2
+    assert page["truncated"] is False
+    assert "summary" not in page
+
+
+@pytest.mark.parametrize("provisioned", [False, True])
+def test_truncated_result_carries_summary(travel_db: Path, provisioned: bool) -> None:
+    if provisioned:
+        provision_travel_db()
+    page = search_hotels.invoke({"limit": 2, "sort_by": "-price_tier"})
+
+    assert [hotel["name"] for hotel in page["results"]] == ["Hilton Basel", "Hyatt Regency Basel"]
+    assert page["truncated"] is True
+    assert page["summary"] == {
+        "total": 5,
+        "by_price_tier": {
+            "Luxury": 1,
+            "Upscale": 1,
+            "Upper Upscale": 1,
+            "Midscale": 1,
+            "Upper Midscale": 1,
+        },
+    }
+
+
+def test_sorting_and_location_summary(travel_db: Path) -> None:
+    cars = search_car_rentals.invoke({"sort_by": "name"})["results"]
+    assert [car["name"] for car in cars] == ["Avis", "Europcar", "Hertz", "Sixt"]
+
+    page = search_trip_recommendations.invoke({"keywords": "history", "limit": 1})
+    assert page["summary"] == {"total": 3, "by_location": {"Basel": 1, "Lucerne": 1, "Zurich": 1}}
+
+
+def test_unknown_sort_key_is_rejected(travel_db: Path) -> None:
+    with pytest.raises(ValueError, match="price_tier"):
+        search_trip_recommendations.invoke({"sort_by": "price_tier"})
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+import tools
+from tools.hotels_tools import book_hotel, cancel_hotel
+
+READ_QUERY = "SELECT count(*) FROM flights f JOIN ticket_flights tf ON tf.flight_id = f.flight_id"
+
+
+def test_pragma_profile_is_applied(travel_db: Path) -> None:
+    with tools.get_connection() as conn:
+        settings = {
+            name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+            for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size")
+        }
+    assert settings == {
+        "journal_mode": "wal",
+        "synchronous": 1,
+        "busy_timeout": 5000,
+        "cache_size": -16000,
+    }
+    with pytest.raises(ValueError):
+        tools.apply_pragmas(sqlite3.connect(":memory:"), {"cache_size": "1; DROP TABLE x"})
+
+
+def test_readers_are_not_blocked_by_a_writer(travel_db: Path) -> None:
+    with tools.get_connection() as conn:
+        conn.execute("SELECT 1").fetchone()
+
+    with closing(sqlite3.connect(travel_db, isolation_level=None)) as writer:
+        writer.execute("BEGIN EXCLUSIVE")
+        writer.execute("UPDATE hotels SET booked = 1 WHERE id = 1")
+        started = time.perf_counter()
+        with tools.get_connection() as conn:
+            booked = conn.execute("SELECT booked FROM hotels WHERE id = 1").fetchone()[0]
+        elapsed = time.perf_counter() - started
+        writer.execute("ROLLBACK")
+
+    # The reader sees the last committed snapshot instead of waiting for the writer
+    assert booked == 0
+    assert elapsed < 1
+
+
+def test_reads_continue_while_writers_run(travel_db: Path) -> None:
+    stop = threading.Event()
+    errors: list[BaseException] = []
+    reads = [0] * 4
+    writes = [0] * 2
+
+    def reader(slot: int) -> None:
+        try:
+            while not stop.is_set():
+                with tools.get_connection() as conn:
+                    conn.execute(READ_QUERY).fetchone()
+                reads[slot] += 1
+        except BaseException as exc:  # noqa: BLE001
+            errors.append(exc)
+
+    def writer(slot: int) -> None:
+        hotel_id = slot + 1
+        try:
+            while not stop.is_set():
+                book_hotel.invoke({"hotel_id": hotel_id})
+                cancel_hotel.invoke({"hotel_id": hotel_id})
+                writes[slot] += 2
+        except BaseException as exc:  # noqa: BLE001
+            errors.append(exc)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(len(reads))]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(len(writes))]
+    for thread in threads:
+        thread.start()
+    time.sleep(1)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert all(reads) and all(writes)
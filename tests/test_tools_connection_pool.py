@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import tools
+from tools.flights_tools import search_flights
+from tools.hotels_tools import book_hotel, search_hotels
+
+
+def test_tool_calls_reuse_pooled_connection(travel_db: Path) -> None:
+    pool = tools.get_pool()
+    with pool.connection() as first:
+        pass
+
+    assert search_flights.invoke({"departure_airport": "BSL"})
+    assert search_hotels.invoke({"location": "Basel"})["results"]
+
+    with pool.connection() as second:
+        assert second is first
+
+
+def test_uncommitted_work_is_rolled_back_on_release(travel_db: Path) -> None:
+    with tools.get_connection() as conn:
+        conn.execute("UPDATE hotels SET booked = 1 WHERE id = 1")
+
+    with tools.get_connection() as conn:
+        assert conn.execute("SELECT booked FROM hotels WHERE id = 1").fetchone() == (0,)
+
+    assert "成功预定" in book_hotel.invoke({"hotel_id": 1})
+    with tools.get_connection() as conn:
+        assert conn.execute("SELECT booked FROM hotels WHERE id = 1").fetchone() == (1,)
+
+
+def test_close_all_discards_checked_out_connections(travel_db: Path) -> None:
+    pool = tools.get_pool()
+    with pool.connection() as conn:
+        pool.close_all()
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    with pool.connection() as fresh:
+        assert fresh is not conn
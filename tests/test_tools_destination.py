@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import shutil
+import sqlite3
+from contextlib import closing
+from datetime import UTC, datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+import tools
+import tools.destination_tools as destination_tools
+from tools.cache import result_cache
+from tools.destination_tools import _run_section, destination_airports, search_destination_bundle
+from tools.hotels_tools import book_hotel
+from tools.provision import provision_travel_db
+
+JUNE = {"start_date": "2025-06-01", "end_date": "2025-06-05"}
+PASSENGER_CONFIG = {"configurable": {"passenger_id": "3442 587242"}}
+
+
+def test_bundle_merges_every_section(travel_db: Path) -> None:
+    bundle = search_destination_bundle.invoke({"location": "Paris"})
+    assert bundle["location"] == "Paris"
+    assert set(bundle) >= {"flights", "hotels", "car_rentals", "trip_recommendations"}
+    # Flights are matched through the destination's airports (ORY comes from the gazetteer),
+    # ordered by departure
+    assert bundle["flights"]["airports"] == ["CDG", "ORY"]
+    assert [flight["flight_id"] for flight in bundle["flights"]["results"]] == [2, 5, 3]
+    assert set(bundle["flights"]["results"][0]) == {
+        "flight_id",
+        "flight_no",
+        "departure_airport",
+        "arrival_airport",
+        "scheduled_departure",
+        "scheduled_arrival",
+    }
+
+    limited = search_destination_bundle.invoke({"location": "Paris", "limit": 1})
+    assert [flight["flight_id"] for flight in limited["flights"]["results"]] == [2]
+    assert limited["flights"]["total"] == 3
+
+
+@pytest.mark.parametrize("provisioned", [True, False])
+def test_flights_from_several_airports_are_merged_by_utc_time(
+    travel_db: Path, provisioned: bool
+) -> None:
+    with closing(sqlite3.connect(travel_db)) as conn:
+        (departure,) = conn.execute(
+            "SELECT scheduled_departure FROM flights WHERE flight_id = 2"
+        ).fetchone()
+        # An hour after flight 2, but written in a timezone whose local text sorts first
+        later = datetime.fromisoformat(departure) + timedelta(hours=1)
+        text = later.astimezone(timezone(timedelta(hours=-5))).isoformat(sep=" ")
+        conn.execute(
+            "INSERT INTO flights SELECT 8, 'LX108', ?, ?, departure_airport, 'ORY', status, "
+            "aircraft_code, actual_departure, actual_arrival FROM flights WHERE flight_id = 2",
+            (text, text),
+        )
+        conn.commit()
+    if provisioned:
+        provision_travel_db()
+
+    bundle = search_destination_bundle.invoke({"location": "Paris"})
+    assert [flight["flight_id"] for flight in bundle["flights"]["results"]] == [2, 8, 5, 3]
+
+
+def test_bundle_filters_catalogs_by_dates(travel_db: Path) -> None:
+    provision_travel_db()
+    assert (
+        book_hotel.invoke(
+            {"hotel_id": 1, "checkin_date": "2025-06-01", "checkout_date": "2025-06-05"}
+        )
+        == "Hotel 1 成功预定。"
+    )
+
+    bundle = search_destination_bundle.invoke({"location": "Basel", **JUNE})
+    assert bundle["start_date"] == "2025-06-01T00:00:00"
+    assert [hotel["id"] for hotel in bundle["hotels"]["results"]] == [3]
+    assert sorted(car["id"] for car in bundle["car_rentals"]["results"]) == [1, 2]
+    # The fixture's flights are all scheduled relative to now, so none fall in June 2025
+    assert bundle["flights"] == {"airports": ["BSL"], "total": 0, "results": []}
+
+
+def test_repeated_bundles_without_dates_hit_the_cache(
+    travel_db: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    moments = iter(
+        datetime(2030, 1, 1, 12, 30, second, micro, tzinfo=UTC)
+        for second, micro in ((1, 123456), (42, 987654))
+    )
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return next(moments)
+
+    monkeypatch.setattr(destination_tools, "datetime", FrozenDatetime)
+    first = search_destination_bundle.invoke({"location": "Paris"})
+    before = result_cache.stats()
+    assert search_destination_bundle.invoke({"location": "Paris"}) == first
+    assert result_cache.stats()["misses"] == before["misses"]
+
+
+def test_bundle_reads_the_passengers_own_writes(travel_db: Path, tmp_path: Path) -> None:
+    provision_travel_db()
+    # A replica that never receives the booking below
+    replica = tmp_path / "replica.sqlite"
+    shutil.copy(travel_db, replica)
+    tools.configure_database(str(travel_db), replica_database=str(replica))
+    stay = {"checkin_date": "2025-06-01", "checkout_date": "2025-06-05"}
+    assert book_hotel.invoke({"hotel_id": 1, **stay}, PASSENGER_CONFIG) == "Hotel 1 成功预定。"
+
+    arguments = {"location": "Basel", **JUNE}
+    bundles = [
+        search_destination_bundle.invoke(arguments, PASSENGER_CONFIG),
+        asyncio.run(search_destination_bundle.ainvoke(arguments, PASSENGER_CONFIG)),
+    ]
+    for bundle in bundles:
+        assert [hotel["id"] for hotel in bundle["hotels"]["results"]] == [3]
+
+
+def test_async_bundle_matches_sync(travel_db: Path) -> None:
+    arguments = {"location": "Basel", "limit": 3}
+    assert asyncio.run(search_destination_bundle.ainvoke(arguments)) == (
+        search_destination_bundle.invoke(arguments)
+    )
+
+
+def test_failed_section_is_isolated(travel_db: Path) -> None:
+    def broken() -> dict:
+        raise ValueError("boom")
+
+    assert _run_section(broken) == {"error": "boom"}
+    assert destination_airports("zrh") == ["ZRH"]
+    assert destination_airports("Nowhere") == []
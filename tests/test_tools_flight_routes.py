@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from tools.flights_tools import search_flight_routes
+from tools.provision import provision_travel_db
+from tools.route_index import route_index
+
+
+def _add_flight(path: Path, flight_id: int, origin: str, destination: str, hours: float) -> None:
+    departure = datetime.now(UTC).replace(minute=0, second=0, microsecond=0) + timedelta(
+        hours=hours
+    )
+    arrival = departure + timedelta(hours=1)
+    with closing(sqlite3.connect(path)) as conn:
+        conn.execute(
+            "INSERT INTO flights (flight_id, flight_no, scheduled_departure, scheduled_arrival, "
+            "departure_airport, arrival_airport, status, aircraft_code, actual_departure, "
+            "actual_arrival) VALUES (?, ?, ?, ?, ?, ?, 'Scheduled', '320', '\\N', '\\N')",
+            (
+                flight_id,
+                f"LX{100 + flight_id}",
+                departure.isoformat(sep=" ", timespec="microseconds"),
+                arrival.isoformat(sep=" ", timespec="microseconds"),
+                origin,
+                destination,
+            ),
+        )
+        conn.commit()
+
+
+def _route_ids(routes: list[dict]) -> list[list[int]]:
+    return [[leg["flight_id"] for leg in route["legs"]] for route in routes]
+
+
+@pytest.mark.parametrize("provisioned", [False, True])
+def test_routes_are_ranked_by_arrival(travel_db: Path, provisioned: bool) -> None:
+    # BSL -> ZRH lands at +3h20; ZRH -> CDG departing at +5h makes a connection
+    _add_flight(travel_db, 8, "ZRH", "CDG", 5)
+    if provisioned:
+        provision_travel_db()
+
+    routes = search_flight_routes.invoke({"departure_airport": "BSL", "arrival_airport": "CDG"})
+
+    assert _route_ids(routes) == [[7, 8], [2]]
+    assert routes[0]["connections"] == 1
+    assert routes[0]["duration_minutes"] == 240
+    assert (
+        search_flight_routes.invoke(
+            {"departure_airport": "BSL", "arrival_airport": "CDG", "max_legs": 1}
+        )
+        == routes[1:]
+    )
+
+
+def test_minimum_connection_time_is_enforced(travel_db: Path) -> None:
+    _add_flight(travel_db, 8, "ZRH", "CDG", 3.5)
+    arguments = {"departure_airport": "BSL", "arrival_airport": "CDG"}
+
+    assert _route_ids(search_flight_routes.invoke(arguments)) == [[2]]
+    short = search_flight_routes.invoke({**arguments, "min_connection_minutes": 5})
+    assert _route_ids(short) == [[7, 8], [2]]
+
+
+@pytest.mark.parametrize("provisioned", [False, True])
+def test_new_flights_are_added_incrementally(travel_db: Path, provisioned: bool) -> None:
+    if provisioned:
+        provision_travel_db()
+    arguments = {"departure_airport": "BSL", "arrival_airport": "CDG"}
+    assert _route_ids(search_flight_routes.invoke(arguments)) == [[2]]
+    rebuilds = route_index.rebuilds
+
+    _add_flight(travel_db, 8, "ZRH", "CDG", 5)
+    assert _route_ids(search_flight_routes.invoke(arguments)) == [[7, 8], [2]]
+    assert route_index.rebuilds == rebuilds
+
+    # Rescheduling an already indexed flight forces a full rebuild
+    with closing(sqlite3.connect(travel_db)) as conn:
+        conn.execute("UPDATE flights SET status = 'Cancelled' WHERE flight_id = 2")
+        conn.commit()
+    assert _route_ids(search_flight_routes.invoke(arguments)) == [[7, 8]]
+    assert route_index.rebuilds == rebuilds + 1
+
+
+def test_unchanged_flights_are_not_rescanned(travel_db: Path) -> None:
+    provision_travel_db()
+    statements: list[str] = []
+    with closing(sqlite3.connect(travel_db)) as conn:
+        route_index.refresh(conn)
+        conn.set_trace_callback(statements.append)
+        route_index.refresh(conn)
+        assert not [sql for sql in statements if "FROM flights " in sql]
+
+        _add_flight(travel_db, 8, "ZRH", "CDG", 5)
+        statements.clear()
+        rebuilds = route_index.rebuilds
+        route_index.refresh(conn)
+        # Only the new row is read
+        assert [sql for sql in statements if "FROM flights " in sql] == [
+            sql for sql in statements if "FROM flights WHERE rowid > " in sql
+        ]
+        assert route_index.rebuilds == rebuilds
+
+
+def test_fewer_legs_are_not_pruned_by_earlier_arrivals(travel_db: Path) -> None:
+    # BSL -> ZRH -> GVA reaches GVA first, but only the direct BSL -> GVA leg leaves
+    # enough legs for GVA -> LYS -> NCE within max_legs = 3
+    _add_flight(travel_db, 10, "ZRH", "GVA", 4)
+    _add_flight(travel_db, 11, "BSL", "GVA", 4.5)
+    _add_flight(travel_db, 12, "GVA", "LYS", 7)
+    _add_flight(travel_db, 13, "LYS", "NCE", 9)
+    arguments = {"departure_airport": "BSL", "arrival_airport": "NCE", "limit": 1}
+
+    assert _route_ids(search_flight_routes.invoke(arguments)) == [[11, 12, 13]]
+
+
+def test_later_arrivals_reach_connections_beyond_earlier_layovers(travel_db: Path) -> None:
+    # GVA -> NCE leaves more than the 24 h maximum layover after flight 10 lands,
+    # so only the later flight 11 into GVA can connect to it
+    _add_flight(travel_db, 10, "BSL", "GVA", 1)
+    _add_flight(travel_db, 11, "BSL", "GVA", 20)
+    _add_flight(travel_db, 12, "GVA", "NCE", 30)
+    arguments = {"departure_airport": "BSL", "arrival_airport": "NCE", "limit": 1}
+
+    assert _route_ids(search_flight_routes.invoke(arguments)) == [[11, 12]]
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from tools.flights_tools import search_flights
+
+
+def _all_pages(arguments: dict, limit: int) -> list[dict]:
+    pages = []
+    page = search_flights.invoke({**arguments, "limit": limit})
+    pages.append(page)
+    while page["next_cursor"]:
+        page = search_flights.invoke({**arguments, "limit": limit, "cursor": page["next_cursor"]})
+        pages.append(page)
+    return pages
+
+
+def test_pages_are_ordered_and_complete(travel_db: Path) -> None:
+    pages = _all_pages({"departure_airport": "BSL"}, limit=1)
+    flights = [flight for page in pages for flight in page["flights"]]
+
+    assert [flight["flight_id"] for flight in flights] == [1, 7, 2, 3]
+    assert [len(page["flights"]) for page in pages] == [1, 1, 1, 1]
+    assert {page["total_estimate"] for page in pages} == {4}
+    assert all(page["total_exact"] for page in pages)
+
+
+def test_single_page_has_no_cursor(travel_db: Path) -> None:
+    page = search_flights.invoke({"arrival_airport": "CDG"})
+    assert [flight["flight_id"] for flight in page["flights"]] == [1, 2, 5, 3]
+    assert page["next_cursor"] is None
+
+
+def test_cursor_is_bound_to_its_filters(travel_db: Path) -> None:
+    cursor = search_flights.invoke({"departure_airport": "BSL", "limit": 1})["next_cursor"]
+    with pytest.raises(ValueError, match="不匹配"):
+        search_flights.invoke({"departure_airport": "CDG", "limit": 1, "cursor": cursor})
+    with pytest.raises(ValueError, match="无效"):
+        search_flights.invoke({"departure_airport": "BSL", "cursor": "not-a-cursor"})
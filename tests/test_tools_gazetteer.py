@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from tools.gazetteer import GAZETTEER_FILE, Gazetteer, default_gazetteer, load_gazetteer, normalize
+from tools.hotels_tools import search_hotels
+from tools.location_trans import transform_location
+
+
+@pytest.mark.parametrize(
+    ("query", "name", "kind"),
+    [
+        ("巴塞尔", "Basel", "exact"),
+        ("Ba Sai Er", "Basel", "exact"),
+        ("Zürich", "Zurich", "exact"),
+        ("苏黎世机场", "Zurich", "exact"),
+        ("New York City", "New York", "exact"),
+        ("zrh", "Zurich", "iata"),
+        ("JFK", "New York", "iata"),
+        ("苏黎", "Zurich", "prefix"),
+        ("Luc", "Lucerne", "prefix"),
+        ("Lucrene", "Lucerne", "fuzzy"),
+        ("Frankfrut", "Frankfurt", "fuzzy"),
+    ],
+)
+def test_lookup_resolves_names_codes_and_typos(query: str, name: str, kind: str) -> None:
+    match = default_gazetteer().lookup(query)
+    assert match is not None
+    assert (match.place.name, match.kind) == (name, kind)
+
+
+def test_ambiguous_and_unknown_names_are_not_guessed() -> None:
+    gazetteer = default_gazetteer()
+    # 巴塞尔 (Basel) and 巴塞罗那 (Barcelona) share the prefix
+    assert gazetteer.lookup("巴塞") is None
+    assert gazetteer.lookup("Ba") is None
+    assert gazetteer.lookup("Hilton") is None
+    assert [place.name for place in gazetteer.complete("巴塞")] == ["Barcelona", "Basel"]
+
+
+def test_transform_location_passes_unknown_names_through() -> None:
+    assert transform_location("巴塞尔") == "Basel"
+    assert transform_location("BSL") == "Basel"
+    assert transform_location(" 不存在的城市 ") == "不存在的城市"
+    assert transform_location(None) is None
+
+
+def test_chinese_location_search_finds_rows(travel_db: Path) -> None:
+    results = search_hotels.invoke({"location": "巴塞尔"})["results"]
+    assert sorted(hotel["id"] for hotel in results) == [1, 3]
+
+
+def test_gazetteer_file_is_consistent() -> None:
+    gazetteer = load_gazetteer(GAZETTEER_FILE)
+    assert len(gazetteer) == len(default_gazetteer())
+    assert normalize("Xi'an") == "xian"
+    with pytest.raises(ValueError):
+        Gazetteer([{"name": "A", "airports": ["AAA"]}, {"name": "B", "airports": ["aaa"]}])
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+
+import pytest
+from conftest import build_travel_db
+
+import tools
+import tools.init_db
+from tools.hotels_tools import book_hotel, search_hotels
+from tools.init_db import rebase_dates, rebased_snapshot, reset_database, update_dates
+from tools.timestamps import register_timestamp_functions
+
+
+def _stale_copy(path: Path, days: int) -> Path:
+    """A sample database whose dates lag `days` behind, like the bundled backup file."""
+    build_travel_db(path)
+    with closing(sqlite3.connect(path)) as conn:
+        register_timestamp_functions(conn)
+        offset = -days * 86400
+        conn.execute(
+            "UPDATE flights SET scheduled_departure = shift_timestamp(scheduled_departure, ?), "
+            "actual_departure = shift_timestamp(actual_departure, ?)",
+            (offset, offset),
+        )
+        conn.execute("CREATE INDEX idx_custom_flight_no ON flights (flight_no)")
+        conn.commit()
+    return path
+
+
+def _latest_departure(conn: sqlite3.Connection) -> datetime:
+    values = [
+        row[0]
+        for row in conn.execute(
+            "SELECT actual_departure FROM flights WHERE actual_departure != '\\N'"
+        )
+    ]
+    return max(datetime.strptime(value, "%Y-%m-%d %H:%M:%S.%f%z") for value in values)
+
+
+def test_rebase_shifts_dates_in_place(tmp_path: Path) -> None:
+    path = _stale_copy(tmp_path / "travel.sqlite", days=400)
+    now = datetime(2026, 5, 1, 12, tzinfo=UTC)
+    with closing(sqlite3.connect(path)) as conn:
+        before = _latest_departure(conn)
+        offset = rebase_dates(conn, now=now)
+
+        assert offset == (now - before).total_seconds()
+        assert _latest_departure(conn) == now
+        assert conn.execute(
+            "SELECT count(*) FROM flights WHERE actual_arrival = '\\N'"
+        ).fetchone() == (6,)
+        indexes = {
+            row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        }
+        assert "idx_custom_flight_no" in indexes
+
+
+def test_update_dates_resets_from_backup(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    backup = _stale_copy(tmp_path / "backup.sqlite", days=30)
+    local = tmp_path / "local.sqlite"
+    monkeypatch.setattr(tools.init_db, "backup_file", str(backup))
+    monkeypatch.setattr(tools.init_db, "local_file", str(local))
+
+    assert update_dates() == str(local)
+
+    with closing(sqlite3.connect(local)) as conn:
+        assert datetime.now(UTC) - _latest_departure(conn) < timedelta(minutes=1)
+        indexes = {
+            row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        }
+    assert {"idx_custom_flight_no", "idx_flights_route_departure"} <= indexes
+    with closing(sqlite3.connect(backup)) as conn:
+        assert datetime.now(UTC) - _latest_departure(conn) > timedelta(days=29)
+
+
+def test_reset_reuses_rebased_snapshot(tmp_path: Path) -> None:
+    backup = _stale_copy(tmp_path / "backup.sqlite", days=30)
+    local = tmp_path / "local.sqlite"
+    tools.configure_database(str(local))
+    try:
+        reset_database(str(local), source=str(backup))
+        assert book_hotel.invoke({"hotel_id": 1}) == "Hotel 1 成功预定。"
+        assert search_hotels.invoke({"name": "Hilton"})["results"][0]["booked"] == 1
+
+        snapshot = rebased_snapshot(str(backup))
+        reset_database(str(local), source=str(backup))
+        assert rebased_snapshot(str(backup)) is snapshot
+        assert search_hotels.invoke({"name": "Hilton"})["results"][0]["booked"] == 0
+        with closing(sqlite3.connect(local)) as conn:
+            assert datetime.now(UTC) - _latest_departure(conn) < timedelta(days=1)
+
+        tomorrow = date.today() + timedelta(days=1)
+        assert rebased_snapshot(str(backup), today=tomorrow) is not snapshot
+    finally:
+        tools.configure_database(tools.db)
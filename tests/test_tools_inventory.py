@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+import tools
+from tools.car_tools import book_car_rental, search_car_rentals
+from tools.hotels_tools import book_hotel, cancel_hotel, search_hotels, update_hotel
+from tools.inventory import availability_condition, to_day
+from tools.provision import ensure_inventory, provision_travel_db
+
+JUNE = {"checkin_date": "2025-06-01", "checkout_date": "2025-06-05"}
+
+
+def _hotel_ids(**arguments: object) -> list[int]:
+    return sorted(hotel["id"] for hotel in search_hotels.invoke(arguments)["results"])
+
+
+def _set_capacity(path: Path, table: str, item_id: int, capacity: int) -> None:
+    with closing(sqlite3.connect(path)) as conn:
+        conn.execute(f"UPDATE {table} SET capacity = ? WHERE id = ?", (capacity, item_id))
+        conn.commit()
+
+
+def test_date_search_excludes_fully_booked_hotels(travel_db: Path) -> None:
+    provision_travel_db()
+    assert book_hotel.invoke({"hotel_id": 1, **JUNE}) == "Hotel 1 成功预定。"
+    assert book_hotel.invoke({"hotel_id": 1, **JUNE}) == "Hotel 1 在所选日期没有空房。"
+
+    overlapping = {"checkin_date": "2025-06-04", "checkout_date": "2025-06-06"}
+    assert _hotel_ids(location="Basel", **overlapping) == [3]
+    # Stays are half-open: checking in on the previous guest's checkout day is fine
+    following = {"checkin_date": "2025-06-05", "checkout_date": "2025-06-07"}
+    assert _hotel_ids(location="Basel", **following) == [1, 3]
+    assert _hotel_ids(location="Basel") == [1, 3]
+
+    assert cancel_hotel.invoke({"hotel_id": 1, **overlapping}) == (
+        "未找到 Hotel 1 在所选日期的预订。"
+    )
+    assert cancel_hotel.invoke({"hotel_id": 1, **JUNE}) == "Hotel 1 成功取消。"
+    assert _hotel_ids(location="Basel", **overlapping) == [1, 3]
+    with closing(sqlite3.connect(travel_db)) as conn:
+        assert conn.execute("SELECT booked FROM hotels WHERE id = 1").fetchone() == (0,)
+
+
+def test_capacity_counts_peak_overlap(travel_db: Path) -> None:
+    provision_travel_db()
+    _set_capacity(travel_db, "car_rentals", 1, 2)
+    early = {"start_date": "2025-06-01", "end_date": "2025-06-03"}
+    late = {"start_date": "2025-06-03", "end_date": "2025-06-05"}
+    whole = {"start_date": "2025-06-01", "end_date": "2025-06-05"}
+    assert book_car_rental.invoke({"rental_id": 1, **early}) == "汽车租赁 1 成功预订。"
+    assert book_car_rental.invoke({"rental_id": 1, **late}) == "汽车租赁 1 成功预订。"
+
+    # The two reservations never overlap, so one car is still free for the whole range
+    ids = [
+        car["id"] for car in search_car_rentals.invoke({"location": "Basel", **whole})["results"]
+    ]
+    assert 1 in ids
+    assert book_car_rental.invoke({"rental_id": 1, **whole}) == "汽车租赁 1 成功预订。"
+    assert book_car_rental.invoke({"rental_id": 1, **early}) == (
+        "汽车租赁 1 在所选日期没有空闲车辆。"
+    )
+    ids = [
+        car["id"] for car in search_car_rentals.invoke({"location": "Basel", **early})["results"]
+    ]
+    assert 1 not in ids
+
+
+def test_updating_dates_moves_the_reservation(travel_db: Path) -> None:
+    provision_travel_db()
+    january = {"checkin_date": "2030-01-01", "checkout_date": "2030-01-05"}
+    february = {"checkin_date": "2030-02-01", "checkout_date": "2030-02-05"}
+    assert book_hotel.invoke({"hotel_id": 1, **january}) == "Hotel 1 成功预定。"
+    assert update_hotel.invoke({"hotel_id": 1, **february}) == "Hotel 1 成功更新。"
+
+    assert _hotel_ids(location="Basel", **january) == [1, 3]
+    assert _hotel_ids(location="Basel", **february) == [3]
+    # Moving only the checkout keeps the checkin of the moved stay
+    assert update_hotel.invoke({"hotel_id": 1, "checkout_date": "2030-02-07"}) == (
+        "Hotel 1 成功更新。"
+    )
+    assert _hotel_ids(location="Basel", checkin_date="2030-02-06") == [3]
+
+    assert cancel_hotel.invoke({"hotel_id": 1, **february}) == "未找到 Hotel 1 在所选日期的预订。"
+    moved = {"checkin_date": "2030-02-01", "checkout_date": "2030-02-07"}
+    assert cancel_hotel.invoke({"hotel_id": 1, **moved}) == "Hotel 1 成功取消。"
+    assert _hotel_ids(location="Basel", **moved) == [1, 3]
+
+
+def test_updating_dates_into_a_full_window_is_rejected(travel_db: Path) -> None:
+    provision_travel_db()
+    assert book_hotel.invoke({"hotel_id": 1, **JUNE}) == "Hotel 1 成功预定。"
+    july = {"checkin_date": "2025-07-01", "checkout_date": "2025-07-05"}
+    assert book_hotel.invoke({"hotel_id": 1, **july}) == "Hotel 1 成功预定。"
+
+    # The latest stay is the one moved; it cannot overlap the June stay
+    overlapping = {"checkin_date": "2025-06-03", "checkout_date": "2025-06-07"}
+    assert update_hotel.invoke({"hotel_id": 1, **overlapping}) == "Hotel 1 在所选日期没有空房。"
+    # The rejected move leaves both stays in place
+    assert cancel_hotel.invoke({"hotel_id": 1, **JUNE}) == "Hotel 1 成功取消。"
+    assert cancel_hotel.invoke({"hotel_id": 1, **july}) == "Hotel 1 成功取消。"
+
+
+def test_booked_rows_are_backfilled_once(travel_db: Path) -> None:
+    with closing(sqlite3.connect(travel_db)) as conn:
+        # Hotel 2 is booked from 2024-04-14 to 2024-04-21
+        conn.execute("UPDATE hotels SET booked = 1 WHERE id = 2")
+        conn.commit()
+        assert ensure_inventory(conn) is True
+        assert ensure_inventory(conn) is True
+        rows = conn.execute("SELECT resource_id, start_day, end_day FROM reservations").fetchall()
+        assert rows == [(2, to_day("2024-04-14"), to_day("2024-04-21"))]
+        assert conn.execute("SELECT count(*) FROM reservations_index").fetchone() == (1,)
+
+    tools.notify_database_reset()
+    assert _hotel_ids(location="Zurich", checkin_date="2024-04-20") == []
+    assert _hotel_ids(location="Zurich", checkin_date="2024-04-21") == [2]
+
+
+def test_undated_booking_blocks_dated_bookings(travel_db: Path) -> None:
+    provision_travel_db()
+    assert book_hotel.invoke({"hotel_id": 1}) == "Hotel 1 成功预定。"
+    assert _hotel_ids(location="Basel", **JUNE) == [3]
+    assert book_hotel.invoke({"hotel_id": 1, **JUNE}) == "Hotel 1 在所选日期没有空房。"
+
+    # Cancelling without dates frees every date again
+    assert cancel_hotel.invoke({"hotel_id": 1}) == "Hotel 1 成功取消。"
+    assert _hotel_ids(location="Basel", **JUNE) == [1, 3]
+    assert book_hotel.invoke({"hotel_id": 1, **JUNE}) == "Hotel 1 成功预定。"
+
+
+def test_booked_rows_without_dates_are_backfilled(travel_db: Path) -> None:
+    with closing(sqlite3.connect(travel_db)) as conn:
+        conn.execute("UPDATE hotels SET booked = 1, checkout_date = checkin_date WHERE id = 1")
+        conn.commit()
+        assert ensure_inventory(conn) is True
+        assert ensure_inventory(conn) is True
+        assert conn.execute("SELECT count(*) FROM reservations_index").fetchone() == (1,)
+
+    tools.notify_database_reset()
+    assert _hotel_ids(location="Basel", **JUNE) == [3]
+
+
+def test_unprovisioned_search_falls_back_to_booked_flag(travel_db: Path) -> None:
+    assert book_hotel.invoke({"hotel_id": 1, **JUNE}) == "Hotel 1 成功预定。"
+    assert _hotel_ids(location="Basel", checkin_date="2030-01-01") == [3]
+    with pytest.raises(ValueError):
+        search_hotels.invoke({"location": "Basel", **{**JUNE, "checkout_date": "2025-05-01"}})
+
+
+def test_availability_uses_the_interval_index(travel_db: Path) -> None:
+    provision_travel_db()
+    condition, params = availability_condition(
+        "hotels", "t", to_day("2025-06-01"), to_day("2025-06-05")
+    )
+    with closing(sqlite3.connect(travel_db)) as conn:
+        plan = [
+            row[-1]
+            for row in conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT * FROM hotels t WHERE t.id = 1 AND {condition}",
+                params,
+            )
+        ]
+    lookups = [step for step in plan if "VIRTUAL TABLE INDEX" in step]
+    # Both R*Tree lookups are constrained on type, resource and day (an empty idxStr is a full scan)
+    assert len(lookups) == 2, plan
+    assert all(step.endswith("INDEX 2:B0D1B2D3B4D5") for step in lookups), plan
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+from tools.flights_tools import (
+    cancel_ticket,
+    fetch_user_flight_information,
+    update_ticket_to_new_flight,
+)
+from tools.init_db import rebase_dates
+from tools.itineraries import ITINERARY_TRIGGERS, check_itineraries, rebuild_itineraries
+from tools.provision import ensure_itineraries, provision_travel_db
+
+PASSENGER_CONFIG = {"configurable": {"passenger_id": "3442 587242"}}
+
+
+def _check(path: Path) -> dict:
+    with closing(sqlite3.connect(path)) as conn:
+        return check_itineraries(conn)
+
+
+def test_tool_reads_the_materialized_rows(travel_db: Path) -> None:
+    joined = fetch_user_flight_information.invoke({}, PASSENGER_CONFIG)
+    provision_travel_db()
+    assert _check(travel_db) == {
+        "rows": 3,
+        "expected": 3,
+        "missing": 0,
+        "extra": 0,
+        "consistent": True,
+    }
+    materialized = fetch_user_flight_information.invoke({}, PASSENGER_CONFIG)
+    assert sorted(materialized, key=lambda row: row["ticket_no"]) == sorted(
+        joined, key=lambda row: row["ticket_no"]
+    )
+
+
+def test_triggers_follow_tool_writes(travel_db: Path) -> None:
+    provision_travel_db()
+    assert update_ticket_to_new_flight.invoke(
+        {"ticket_no": "7240005432906569", "new_flight_id": 3}, PASSENGER_CONFIG
+    ) == ("机票已成功更新为新的航班。")
+    assert _check(travel_db)["consistent"]
+    assert cancel_ticket.invoke({"ticket_no": "7240005432906570"}, PASSENGER_CONFIG) == (
+        "机票已成功取消。"
+    )
+    assert _check(travel_db)["consistent"]
+
+
+def test_triggers_follow_direct_writes(travel_db: Path) -> None:
+    provision_travel_db()
+    with closing(sqlite3.connect(travel_db)) as conn:
+        conn.execute("INSERT INTO tickets VALUES ('7240005432906572', 'B00002', '3442 587242')")
+        conn.execute("INSERT INTO ticket_flights VALUES ('7240005432906572', 5, 'Economy', 1.0)")
+        conn.execute("INSERT INTO boarding_passes VALUES ('7240005432906572', 5, 1, '2B')")
+        conn.execute("UPDATE boarding_passes SET seat_no = '1B' WHERE ticket_no LIKE '%6570'")
+        conn.execute("UPDATE tickets SET passenger_id = 'X' WHERE ticket_no LIKE '%6571'")
+        conn.execute("UPDATE flights SET flight_no = 'LX999' WHERE flight_id = 2")
+        conn.execute("UPDATE flights SET flight_id = 40 WHERE flight_id = 4")
+        conn.execute("DELETE FROM flights WHERE flight_id = 5")
+        conn.commit()
+        report = check_itineraries(conn)
+        assert report["consistent"], report
+        assert report["rows"] == 2
+
+        rebase_dates(conn)
+        assert check_itineraries(conn)["consistent"]
+
+
+def test_lost_triggers_and_drift_are_repaired(travel_db: Path) -> None:
+    provision_travel_db()
+    with closing(sqlite3.connect(travel_db)) as conn:
+        conn.execute("DELETE FROM passenger_itineraries WHERE flight_id = 2")
+        conn.execute(f"DROP TRIGGER {next(iter(ITINERARY_TRIGGERS))}")
+        conn.commit()
+        assert check_itineraries(conn, "3442 587242")["missing"] == 1
+        assert ensure_itineraries(conn) is True
+        assert check_itineraries(conn)["consistent"]
+
+        conn.execute("UPDATE passenger_itineraries SET seat_no = '9Z'")
+        report = check_itineraries(conn)
+        assert (report["missing"], report["extra"]) == (3, 3)
+        assert rebuild_itineraries(conn) == 3
+        assert check_itineraries(conn)["consistent"]
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import tools
+from tools.cache import itinerary_cache
+from tools.flights_tools import fetch_user_flight_information, update_ticket_to_new_flight
+
+PASSENGER_CONFIG = {"configurable": {"passenger_id": "3442 587242"}}
+OTHER_CONFIG = {"configurable": {"passenger_id": "8149 604011"}}
+
+
+def _count_selects(call) -> tuple[object, int]:
+    statements: list[str] = []
+    with tools.get_read_connection() as conn:
+        conn.set_trace_callback(statements.append)
+    try:
+        result = call()
+    finally:
+        with tools.get_read_connection() as conn:
+            conn.set_trace_callback(None)
+    # Schema lookups (is the itinerary table provisioned?) are not itinerary queries
+    return result, sum(
+        1
+        for statement in statements
+        if statement.lstrip().startswith("SELECT") and "sqlite_master" not in statement
+    )
+
+
+def test_repeated_fetch_is_served_from_cache(travel_db: Path) -> None:
+    first, queries = _count_selects(
+        lambda: fetch_user_flight_information.invoke({}, PASSENGER_CONFIG)
+    )
+    assert queries == 1
+    assert {row["flight_id"] for row in first} == {2, 4}
+
+    second, queries = _count_selects(
+        lambda: fetch_user_flight_information.invoke({}, PASSENGER_CONFIG)
+    )
+    assert queries == 0
+    assert second == first
+
+    # Callers get a copy and cannot corrupt the cached itinerary
+    second[0]["seat_no"] = "99Z"
+    assert fetch_user_flight_information.invoke({}, PASSENGER_CONFIG) == first
+
+
+def test_rebooking_invalidates_only_that_passenger(travel_db: Path) -> None:
+    fetch_user_flight_information.invoke({}, PASSENGER_CONFIG)
+    fetch_user_flight_information.invoke({}, OTHER_CONFIG)
+    assert itinerary_cache.stats()["size"] == 2
+
+    result = update_ticket_to_new_flight.invoke(
+        {"ticket_no": "7240005432906569", "new_flight_id": 3}, PASSENGER_CONFIG
+    )
+    assert result == "机票已成功更新为新的航班。"
+    assert itinerary_cache.stats()["size"] == 1
+
+    _, queries = _count_selects(lambda: fetch_user_flight_information.invoke({}, OTHER_CONFIG))
+    assert queries == 0
+    itinerary, queries = _count_selects(
+        lambda: fetch_user_flight_information.invoke({}, PASSENGER_CONFIG)
+    )
+    assert queries == 1
+    assert 2 not in {row["flight_id"] for row in itinerary}
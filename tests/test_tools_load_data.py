@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import csv
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+from tools import load_data
+from tools.flights_tools import fetch_user_flight_information
+from tools.itineraries import check_itineraries
+from tools.load_data import discover_sources, load_files
+from tools.provision import TRAVEL_INDEXES, provision_travel_db
+from tools.schema import table_columns
+
+NEW_PASSENGER = "9999 000001"
+
+
+def _write_csv(path: Path, columns: tuple[str, ...], rows: list[tuple]) -> Path:
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(columns)
+        writer.writerows(rows)
+    return path
+
+
+def _flight_rows(start: int, count: int) -> list[tuple]:
+    return [
+        (
+            flight_id,
+            f"LX{flight_id}",
+            "2030-01-01 08:00:00.000000+00:00",
+            "2030-01-01 09:20:00.000000+00:00",
+            "BSL",
+            "ZRH",
+            "Scheduled",
+            "320",
+            "\\N",
+            "",
+        )
+        for flight_id in range(start, start + count)
+    ]
+
+
+@pytest.fixture
+def schedule(tmp_path: Path) -> Path:
+    directory = tmp_path / "schedule"
+    directory.mkdir()
+    _write_csv(directory / "flights.csv", table_columns("flights"), _flight_rows(100, 25))
+    _write_csv(
+        directory / "tickets.csv",
+        table_columns("tickets"),
+        [("9990000000001", "B09999", NEW_PASSENGER)],
+    )
+    _write_csv(
+        directory / "ticket_flights.csv",
+        table_columns("ticket_flights"),
+        [("9990000000001", 110, "Economy", 99.0)],
+    )
+    _write_csv(
+        directory / "boarding_passes.csv",
+        table_columns("boarding_passes"),
+        [("9990000000001", 110, 1, "3C")],
+    )
+    return directory
+
+
+def _count(database: Path, query: str) -> int:
+    with closing(sqlite3.connect(database)) as conn:
+        return conn.execute(query).fetchone()[0]
+
+
+def test_load_appends_and_reprovisions(travel_db: Path, schedule: Path) -> None:
+    provision_travel_db()
+    with closing(sqlite3.connect(travel_db)) as conn:
+        loaded = load_files(conn, discover_sources([str(schedule)]), chunk_size=10)
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+        assert check_itineraries(conn)["consistent"]
+
+    assert sorted(loaded.values()) == [1, 1, 1, 25]
+    assert _count(travel_db, "SELECT count(*) FROM flights") == 7 + 25
+    # Empty CSV fields become NULL, epoch columns are backfilled by provisioning
+    assert _count(travel_db, "SELECT count(*) FROM flights WHERE actual_arrival IS NULL") == 25
+    assert (
+        _count(travel_db, "SELECT count(*) FROM flights WHERE scheduled_departure_epoch IS NULL")
+        == 0
+    )
+    assert set(TRAVEL_INDEXES) <= names
+    assert {"tickets_itinerary_ai", "hotels_fts_ai"} <= names
+    assert _count(travel_db, "SELECT count(*) FROM load_checkpoints") == 0
+
+    itinerary = fetch_user_flight_information.invoke(
+        {}, {"configurable": {"passenger_id": NEW_PASSENGER}}
+    )
+    assert [(row["flight_id"], row["seat_no"]) for row in itinerary] == [(110, "3C")]
+
+
+def test_replace_clears_target_tables(travel_db: Path, schedule: Path) -> None:
+    with closing(sqlite3.connect(travel_db)) as conn:
+        load_files(conn, discover_sources([str(schedule / "flights.csv")]), replace=True)
+
+    assert _count(travel_db, "SELECT count(*) FROM flights") == 25
+    assert _count(travel_db, "SELECT count(*) FROM tickets") == 3
+
+
+def test_interrupted_load_resumes_from_checkpoint(
+    tmp_path: Path, schedule: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    database = tmp_path / "fresh.sqlite"
+    sources = discover_sources([str(schedule / "flights.csv")])
+    write_chunk = load_data._write_chunk
+    calls = []
+
+    def crash_on_third_chunk(*args) -> None:
+        calls.append(args)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        write_chunk(*args)
+
+    monkeypatch.setattr(load_data, "_write_chunk", crash_on_third_chunk)
+    with closing(sqlite3.connect(database)) as conn, pytest.raises(KeyboardInterrupt):
+        load_files(conn, sources, chunk_size=10)
+    assert _count(database, "SELECT count(*) FROM flights") == 20
+    assert _count(database, "SELECT rows_loaded FROM load_checkpoints") == 20
+
+    monkeypatch.setattr(load_data, "_write_chunk", write_chunk)
+    with closing(sqlite3.connect(database)) as conn:
+        assert load_files(conn, sources, chunk_size=10) == {str(sources[0].path): 5}
+    assert _count(database, "SELECT count(DISTINCT flight_id) FROM flights") == 25
+    assert _count(database, "SELECT count(*) FROM flights") == 25
+
+
+def test_changed_source_requires_restart(
+    tmp_path: Path, schedule: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    database = tmp_path / "fresh.sqlite"
+    path = schedule / "flights.csv"
+
+    def crash(*args) -> None:
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(load_data, "_write_chunk", crash)
+    with closing(sqlite3.connect(database)) as conn, pytest.raises(KeyboardInterrupt):
+        load_files(conn, discover_sources([str(path)]))
+    monkeypatch.undo()
+
+    _write_csv(path, table_columns("flights"), _flight_rows(200, 3))
+    with closing(sqlite3.connect(database)) as conn:
+        with pytest.raises(ValueError, match="--restart"):
+            load_files(conn, discover_sources([str(path)]))
+        load_files(conn, discover_sources([str(path)]), restart=True)
+    assert _count(database, "SELECT count(*) FROM flights") == 3
+
+
+def test_unknown_columns_are_rejected_before_writing(travel_db: Path, tmp_path: Path) -> None:
+    path = _write_csv(tmp_path / "hotels.csv", ("id", "stars"), [(9, 5)])
+    with closing(sqlite3.connect(travel_db)) as conn:
+        with pytest.raises(ValueError, match="stars"):
+            load_files(conn, discover_sources([str(path)]))
+    assert _count(travel_db, "SELECT count(*) FROM hotels") == 5
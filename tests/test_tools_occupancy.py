@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import csv
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+from tools.flights_tools import (
+    cancel_ticket,
+    check_flight_availability,
+    search_flights,
+    update_ticket_to_new_flight,
+)
+from tools.load_data import discover_sources, load_files
+from tools.occupancy import OCCUPANCY_TRIGGERS, check_occupancy, rebuild_occupancy
+from tools.provision import ensure_occupancy, provision_travel_db
+
+PASSENGER_CONFIG = {"configurable": {"passenger_id": "3442 587242"}}
+
+
+def _check(path: Path) -> dict:
+    with closing(sqlite3.connect(path)) as conn:
+        return check_occupancy(conn)
+
+
+def _available(flight_id: int, fare_conditions: str | None = None) -> int:
+    arguments = {"flight_id": flight_id}
+    if fare_conditions:
+        arguments["fare_conditions"] = fare_conditions
+    return check_flight_availability.invoke(arguments)["available"]
+
+
+def test_counters_match_the_source_tables(travel_db: Path) -> None:
+    provision_travel_db()
+    assert _check(travel_db) == {
+        "rows": 14,
+        "expected": 14,
+        "missing": 0,
+        "extra": 0,
+        "consistent": True,
+    }
+    result = check_flight_availability.invoke({"flight_id": 2})
+    assert result == {
+        "flight_id": 2,
+        "cabins": [
+            {
+                "fare_conditions": "Business",
+                "seats": 2,
+                "booked": 0,
+                "checked_in": 0,
+                "available": 2,
+            },
+            {
+                "fare_conditions": "Economy",
+                "seats": 2,
+                "booked": 2,
+                "checked_in": 2,
+                "available": 0,
+            },
+        ],
+        "available": 2,
+    }
+    assert _available(2, "economy") == 0
+    assert check_flight_availability.invoke({"flight_id": 999})["cabins"] == []
+
+
+def test_availability_without_provisioning(travel_db: Path) -> None:
+    # 没有 flight_occupancy 时实时汇总，结果一致；搜索结果的余座未知
+    assert _available(2) == 2
+    assert _available(4, "Business") == 1
+    flights = search_flights.invoke({"departure_airport": "BSL", "arrival_airport": "CDG"})
+    assert {flight["seats_available"] for flight in flights["flights"]} == {None}
+
+
+def test_counters_follow_rebooking_and_cancellation(travel_db: Path) -> None:
+    provision_travel_db()
+    assert update_ticket_to_new_flight.invoke(
+        {"ticket_no": "7240005432906569", "new_flight_id": 3}, PASSENGER_CONFIG
+    ) == ("机票已成功更新为新的航班。")
+    assert (_available(2, "Economy"), _available(3, "Economy")) == (1, 1)
+    assert _check(travel_db)["consistent"]
+
+    assert cancel_ticket.invoke({"ticket_no": "7240005432906570"}, PASSENGER_CONFIG) == (
+        "机票已成功取消。"
+    )
+    assert _available(4, "Business") == 2
+    assert _check(travel_db)["consistent"]
+
+
+def test_search_results_show_seats_left(travel_db: Path) -> None:
+    provision_travel_db()
+    arguments = {"departure_airport": "BSL", "arrival_airport": "CDG"}
+    seats = {
+        flight["flight_id"]: flight["seats_available"]
+        for flight in search_flights.invoke(arguments)["flights"]
+    }
+    assert seats == {1: 4, 2: 2, 3: 4}
+
+    # 改签后缓存的搜索结果失效
+    update_ticket_to_new_flight.invoke(
+        {"ticket_no": "7240005432906569", "new_flight_id": 3}, PASSENGER_CONFIG
+    )
+    seats = {
+        flight["flight_id"]: flight["seats_available"]
+        for flight in search_flights.invoke(arguments)["flights"]
+    }
+    assert seats == {1: 4, 2: 3, 3: 3}
+
+
+def test_rebooking_into_a_full_cabin_is_rejected(travel_db: Path) -> None:
+    provision_travel_db()
+    # 两张新机票占满航班 3 的经济舱
+    other_config = {"configurable": {"passenger_id": "8149 604011"}}
+    with closing(sqlite3.connect(travel_db)) as conn:
+        conn.execute("INSERT INTO ticket_flights VALUES ('7240005432906572', 3, 'Economy', 1.0)")
+        conn.execute("INSERT INTO ticket_flights VALUES ('7240005432906573', 3, 'Economy', 1.0)")
+        conn.commit()
+    assert _available(3, "Economy") == 0
+
+    message = update_ticket_to_new_flight.invoke(
+        {"ticket_no": "7240005432906571", "new_flight_id": 3}, other_config
+    )
+    assert "没有空座" in message
+    with closing(sqlite3.connect(travel_db)) as conn:
+        assert conn.execute(
+            "SELECT flight_id FROM ticket_flights WHERE ticket_no = '7240005432906571'"
+        ).fetchone() == (2,)
+
+    # 商务舱机票不受经济舱满员影响
+    assert update_ticket_to_new_flight.invoke(
+        {"ticket_no": "7240005432906570", "new_flight_id": 3}, PASSENGER_CONFIG
+    ) == ("机票已成功更新为新的航班。")
+
+
+def test_counters_follow_direct_writes(travel_db: Path) -> None:
+    provision_travel_db()
+    with closing(sqlite3.connect(travel_db)) as conn:
+        conn.execute("INSERT INTO ticket_flights VALUES ('7240005432906572', 5, 'Economy', 1.0)")
+        conn.execute("INSERT INTO boarding_passes VALUES ('7240005432906572', 5, 1, '2B')")
+        conn.execute("UPDATE boarding_passes SET flight_id = 3 WHERE ticket_no LIKE '%6569'")
+        conn.execute(
+            "UPDATE ticket_flights SET fare_conditions = 'Business' WHERE ticket_no LIKE '%6571'"
+        )
+        conn.execute("DELETE FROM boarding_passes WHERE ticket_no LIKE '%6570'")
+        conn.execute("UPDATE flights SET flight_id = 40 WHERE flight_id = 4")
+        conn.execute("DELETE FROM flights WHERE flight_id = 6")
+        conn.commit()
+        report = check_occupancy(conn)
+        assert report["consistent"], report
+
+
+def test_counters_follow_seat_map_changes(travel_db: Path) -> None:
+    provision_travel_db()
+    with closing(sqlite3.connect(travel_db)) as conn:
+        conn.execute("INSERT INTO seats VALUES ('320', '3A', 'Comfort')")
+        conn.execute("UPDATE seats SET fare_conditions = 'Comfort' WHERE seat_no = '1B'")
+        conn.execute("DELETE FROM seats WHERE seat_no = '2B'")
+        conn.commit()
+        report = check_occupancy(conn)
+        assert report["consistent"], report
+    assert _available(3, "Comfort") == 2
+    assert _available(3, "Business") == 1
+
+
+def test_loading_seats_rebuilds_the_counters(travel_db: Path, tmp_path: Path) -> None:
+    provision_travel_db()
+    path = tmp_path / "seats.csv"
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(("aircraft_code", "seat_no", "fare_conditions"))
+        writer.writerows(("320", f"{row}{seat}", "Economy") for row in range(3, 9) for seat in "AB")
+    with closing(sqlite3.connect(travel_db)) as conn:
+        load_files(conn, discover_sources([str(path)]))
+        report = check_occupancy(conn)
+        assert report["consistent"], report
+    assert _available(3, "Economy") == 14
+
+
+def test_lost_triggers_and_drift_are_repaired(travel_db: Path) -> None:
+    provision_travel_db()
+    with closing(sqlite3.connect(travel_db)) as conn:
+        conn.execute(f"DROP TRIGGER {next(iter(OCCUPANCY_TRIGGERS))}")
+        conn.execute("INSERT INTO ticket_flights VALUES ('7240005432906572', 5, 'Economy', 1.0)")
+        conn.commit()
+        assert check_occupancy(conn)["missing"] == 1
+        assert ensure_occupancy(conn) is True
+        assert check_occupancy(conn)["consistent"]
+
+        conn.execute("UPDATE flight_occupancy SET booked = 0")
+        report = check_occupancy(conn)
+        assert (report["missing"], report["extra"]) == (3, 3)
+        assert rebuild_occupancy(conn) == 14
+        assert check_occupancy(conn)["consistent"]
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import tools
+from tools.hotels_tools import book_hotel, search_hotels
+
+PASSENGER_CONFIG = {"configurable": {"passenger_id": "3442 587242"}}
+OTHER_CONFIG = {"configurable": {"passenger_id": "8149 604011"}}
+
+
+@pytest.fixture
+def stale_replica(travel_db: Path, tmp_path: Path) -> Path:
+    """A replica file that never receives the primary's later writes."""
+    replica = tmp_path / "replica.sqlite"
+    shutil.copy(travel_db, replica)
+    tools.configure_database(str(travel_db), replica_database=str(replica))
+    return replica
+
+
+def _booked(config: dict) -> bool:
+    results = search_hotels.invoke({"name": "Hilton"}, config)["results"]
+    return bool(results[0]["booked"])
+
+
+def test_read_connections_are_read_only(travel_db: Path) -> None:
+    assert tools.get_read_pool().database == str(travel_db)
+    with tools.get_read_connection() as conn:
+        assert conn.execute("SELECT booked FROM hotels WHERE id = 1").fetchone() == (0,)
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            conn.execute("UPDATE hotels SET booked = 1 WHERE id = 1")
+
+
+def test_safe_tools_see_primary_writes_without_replica(travel_db: Path) -> None:
+    assert "成功预定" in book_hotel.invoke({"hotel_id": 1}, PASSENGER_CONFIG)
+    assert _booked(OTHER_CONFIG)
+
+
+def test_writer_reads_own_writes_from_primary(stale_replica: Path) -> None:
+    assert "成功预定" in book_hotel.invoke({"hotel_id": 1}, PASSENGER_CONFIG)
+
+    # Other passengers read the lagging replica; that result must not be cached for the writer
+    assert not _booked(OTHER_CONFIG)
+    assert _booked(PASSENGER_CONFIG)
+    assert tools.replica_may_lag()
+
+
+def test_replica_serves_reads_after_the_window(
+    stale_replica: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    assert "成功预定" in book_hotel.invoke({"hotel_id": 1}, PASSENGER_CONFIG)
+    monkeypatch.setattr(tools, "READ_YOUR_WRITES_SECONDS", 0)
+
+    assert not tools.replica_may_lag()
+    assert not _booked(PASSENGER_CONFIG)
+
+
+def test_writes_without_passenger_route_every_read_to_primary(stale_replica: Path) -> None:
+    assert "成功预定" in book_hotel.invoke({"hotel_id": 1})
+    assert _booked(OTHER_CONFIG)
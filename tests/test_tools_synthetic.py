@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+import tools
+from tools.flights_tools import fetch_user_flight_information, search_flights
+from tools.hotels_tools import search_hotels
+from tools.itineraries import check_itineraries
+from tools.occupancy import check_occupancy
+from tools.schema import TRAVEL_TABLES
+from tools.synthetic import DatasetSpec, generate_travel_db, passenger_id, rebase
+
+SPEC = DatasetSpec(airports=120, flights=300, passengers=200, hotels=40, car_rentals=20, days=10)
+
+
+def _dump(path: Path) -> list[str]:
+    with closing(sqlite3.connect(path)) as conn:
+        return list(conn.iterdump())
+
+
+def test_same_seed_generates_identical_databases(tmp_path: Path) -> None:
+    generate_travel_db(tmp_path / "a.sqlite", SPEC, seed=3, provision=False)
+    generate_travel_db(tmp_path / "b.sqlite", SPEC, seed=3, provision=False)
+    generate_travel_db(tmp_path / "c.sqlite", SPEC, seed=4, provision=False)
+
+    assert _dump(tmp_path / "a.sqlite") == _dump(tmp_path / "b.sqlite")
+    assert _dump(tmp_path / "a.sqlite") != _dump(tmp_path / "c.sqlite")
+
+
+def test_tables_are_generated_independently(tmp_path: Path) -> None:
+    generate_travel_db(tmp_path / "a.sqlite", SPEC, provision=False)
+    generate_travel_db(
+        tmp_path / "b.sqlite", DatasetSpec(**{**vars(SPEC), "hotels": 5}), provision=False
+    )
+
+    with (
+        closing(sqlite3.connect(tmp_path / "a.sqlite")) as a,
+        closing(sqlite3.connect(tmp_path / "b.sqlite")) as b,
+    ):
+        query = "SELECT * FROM ticket_flights ORDER BY ticket_no, flight_id"
+        assert a.execute(query).fetchall() == b.execute(query).fetchall()
+
+
+def test_generated_data_is_consistent(tmp_path: Path) -> None:
+    path = tmp_path / "travel.sqlite"
+    counts = generate_travel_db(path, SPEC)
+
+    assert counts["airports_data"] == 120
+    assert counts["flights"] == 300
+    assert counts["hotels"] == 40
+    with closing(sqlite3.connect(path)) as conn:
+        for table, columns in TRAVEL_TABLES.items():
+            existing = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+            assert existing[: len(columns)] == [column for column, _ in columns]
+        assert conn.execute("SELECT count(DISTINCT passenger_id) FROM tickets").fetchone() == (200,)
+        # Seats are unique per flight and their class matches the aircraft's seat map
+        assert conn.execute(
+            "SELECT count(*) FROM (SELECT 1 FROM boarding_passes GROUP BY flight_id, seat_no "
+            "HAVING count(*) > 1)"
+        ).fetchone() == (0,)
+        assert conn.execute(
+            "SELECT count(*) FROM boarding_passes bp "
+            "JOIN flights f ON f.flight_id = bp.flight_id "
+            "JOIN seats s ON s.aircraft_code = f.aircraft_code AND s.seat_no = bp.seat_no "
+            "JOIN ticket_flights tf ON tf.ticket_no = bp.ticket_no AND tf.flight_id = bp.flight_id "
+            "WHERE s.fare_conditions != tf.fare_conditions"
+        ).fetchone() == (0,)
+        assert check_itineraries(conn)["consistent"]
+        assert check_occupancy(conn)["consistent"]
+
+
+def test_full_flights_do_not_produce_empty_tickets(tmp_path: Path) -> None:
+    # Far more passengers than seats: every ticket still has flights and a price
+    path = tmp_path / "travel.sqlite"
+    spec = DatasetSpec(**{**vars(SPEC), "flights": 3, "passengers": 2000})
+    counts = generate_travel_db(path, spec, provision=False)
+
+    with closing(sqlite3.connect(path)) as conn:
+        seats = conn.execute(
+            "SELECT sum(n) FROM flights f "
+            "JOIN (SELECT aircraft_code, count(*) AS n FROM seats GROUP BY aircraft_code) s "
+            "USING (aircraft_code)"
+        ).fetchone()[0]
+        assert counts["ticket_flights"] == seats
+        assert conn.execute(
+            "SELECT count(*) FROM tickets t JOIN bookings b USING (book_ref) "
+            "WHERE b.total_amount <= 0 "
+            "OR NOT EXISTS (SELECT 1 FROM ticket_flights tf WHERE tf.ticket_no = t.ticket_no)"
+        ).fetchone() == (0,)
+
+
+def test_existing_files_are_not_overwritten(tmp_path: Path) -> None:
+    path = tmp_path / "travel.sqlite"
+    path.touch()
+    with pytest.raises(ValueError, match="已经存在"):
+        generate_travel_db(path, SPEC)
+
+
+def test_scaled_spec() -> None:
+    spec = DatasetSpec().scaled(10)
+    assert spec.flights == DatasetSpec().flights * 10
+    assert spec.days == DatasetSpec().days
+    assert DatasetSpec().scaled(0.001).airports == 2
+
+
+def test_tools_run_on_a_rebased_dataset(tmp_path: Path) -> None:
+    path = tmp_path / "travel.sqlite"
+    generate_travel_db(path, SPEC)
+    rebase(path)
+    tools.configure_database(str(path))
+    try:
+        assert fetch_user_flight_information.invoke(
+            {}, {"configurable": {"passenger_id": passenger_id(0)}}
+        )
+        with closing(sqlite3.connect(path)) as conn:
+            (departure,) = conn.execute(
+                "SELECT departure_airport FROM flights WHERE status = 'Scheduled' LIMIT 1"
+            ).fetchone()
+            (city,) = conn.execute("SELECT location FROM hotels LIMIT 1").fetchone()
+        assert search_flights.invoke({"departure_airport": departure})["flights"]
+        assert search_hotels.invoke({"location": city})["results"]
+    finally:
+        tools.configure_database(tools.db)
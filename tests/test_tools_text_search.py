@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import tools
+from tools.car_tools import search_car_rentals
+from tools.hotels_tools import search_hotels
+from tools.provision import ensure_fts, provision_travel_db
+from tools.text_search import build_match_expression, fts_search_query
+from tools.trip_tools import search_trip_recommendations
+
+
+def test_match_expression_quotes_user_input() -> None:
+    expression = build_match_expression({"name": 'Hilton "Basel OR', "location": None})
+    assert expression == 'name : ("Hilton"* AND "Basel"* AND "OR"*)'
+    assert build_match_expression({"name": "!!!"}) is None
+    assert build_match_expression({}, {"keywords": ["art", " history"]}) == (
+        'keywords : (("art"*) OR ("history"*))'
+    )
+
+
+def test_searches_use_fts_when_provisioned(travel_db: Path) -> None:
+    provision_travel_db()
+
+    hotels = search_hotels.invoke({"location": "Basel"})["results"]
+    assert {hotel["name"] for hotel in hotels} == {"Hilton Basel", "Hyatt Regency Basel"}
+    assert [car["name"] for car in search_car_rentals.invoke({"name": "sixt"})["results"]] == [
+        "Sixt"
+    ]
+
+    trips = search_trip_recommendations.invoke({"keywords": "art, bridge"})["results"]
+    assert {trip["name"] for trip in trips} == {"Kunstmuseum Basel", "Lucerne Chapel Bridge"}
+
+    with tools.get_connection() as conn:
+        query, params = fts_search_query(conn, "hotels", {"location": "Basel"})
+        plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+    assert not [step for step in plan if step == "SCAN t"], plan
+
+
+def test_search_falls_back_to_like_without_fts(travel_db: Path) -> None:
+    hotels = search_hotels.invoke({"location": "Basel"})["results"]
+    assert {hotel["name"] for hotel in hotels} == {"Hilton Basel", "Hyatt Regency Basel"}
+
+
+def test_triggers_keep_fts_in_sync(travel_db: Path) -> None:
+    with closing(sqlite3.connect(travel_db)) as conn:
+        ensure_fts(conn)
+        conn.execute(
+            "INSERT INTO hotels VALUES (6, 'Grand Hotel Les Trois Rois', 'Basel', 'Luxury', "
+            "'2024-04-01', '2024-04-02', 0)"
+        )
+        conn.execute("UPDATE hotels SET name = 'Hilton Garden Inn Basel' WHERE id = 1")
+        conn.execute("DELETE FROM hotels WHERE id = 3")
+        conn.commit()
+        # Re-provisioning an intact database must not rebuild or duplicate entries
+        ensure_fts(conn)
+
+    names = [hotel["name"] for hotel in search_hotels.invoke({"location": "basel"})["results"]]
+    assert sorted(names) == ["Grand Hotel Les Trois Rois", "Hilton Garden Inn Basel"]
+    assert search_hotels.invoke({"name": "Hyatt"})["results"] == []
+    assert [hotel["id"] for hotel in search_hotels.invoke({"name": "garden"})["results"]] == [1]
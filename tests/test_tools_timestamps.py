@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from datetime import UTC, date, datetime, timedelta, timezone
+from pathlib import Path
+
+from tools.flights_tools import search_flights, update_ticket_to_new_flight
+from tools.init_db import rebase_dates
+from tools.provision import ensure_epoch_columns, provision_travel_db
+from tools.timestamps import epoch_sql, timestamp_epoch, to_epoch
+
+PASSENGER_CONFIG = {"configurable": {"passenger_id": "3442 587242"}}
+
+
+def test_to_epoch_accepts_tool_arguments() -> None:
+    assert to_epoch(date(2024, 5, 1)) == int(datetime(2024, 5, 1, tzinfo=UTC).timestamp())
+    assert to_epoch(datetime(2024, 5, 1, 3)) == to_epoch("2024-05-01 05:00:00.000+02")
+    assert timestamp_epoch("\\N") is None
+
+
+def test_sql_epoch_matches_python() -> None:
+    values = [
+        "2024-04-28 17:46:00.000000-04:00",
+        "2024-04-28 17:46:00.250000+05:30",
+        "2024-04-28 17:46:00+03",
+        "2024-04-28 17:46:00",
+        "\\N",
+    ]
+    with closing(sqlite3.connect(":memory:")) as conn:
+        for value in values:
+            (epoch,) = conn.execute(
+                f"SELECT {epoch_sql('v')} FROM (SELECT ? AS v)", (value,)
+            ).fetchone()
+            expected = timestamp_epoch(value)
+            assert epoch == (None if expected is None else int(expected)), value
+
+
+def test_triggers_keep_new_and_edited_rows_in_sync(travel_db: Path) -> None:
+    provision_travel_db()
+    soon = datetime.now(UTC).replace(microsecond=0) + timedelta(hours=1)
+    departure = soon.astimezone(timezone(timedelta(hours=3))).isoformat(sep=" ")[:-3]
+    with closing(sqlite3.connect(travel_db)) as conn:
+        conn.execute(
+            "INSERT INTO flights (flight_id, flight_no, scheduled_departure, scheduled_arrival, "
+            "departure_airport, arrival_airport, status, aircraft_code, actual_departure, "
+            "actual_arrival) VALUES (8, 'LX108', ?, ?, 'ZRH', 'BSL', 'Scheduled', '320', "
+            "'\\N', '\\N')",
+            (departure, departure),
+        )
+        # Moving flight 3 to within the hour must be seen by the 3-hour rule
+        conn.execute("UPDATE flights SET scheduled_departure = ? WHERE flight_id = 3", (departure,))
+        conn.commit()
+        rows = conn.execute(
+            "SELECT scheduled_departure, scheduled_departure_epoch FROM flights "
+            "WHERE flight_id IN (3, 8)"
+        ).fetchall()
+    assert rows == [(departure, int(soon.timestamp()))] * 2
+
+    flights = search_flights.invoke({"departure_airport": "ZRH", "arrival_airport": "BSL"})
+    assert [flight["flight_id"] for flight in flights["flights"]] == [8]
+    too_soon = update_ticket_to_new_flight.invoke(
+        {"ticket_no": "7240005432906569", "new_flight_id": 3}, PASSENGER_CONFIG
+    )
+    assert too_soon.startswith("不允许重新安排到距离当前时间少于 3 小时的航班")
+
+
+def test_epoch_columns_are_backfilled(travel_db: Path) -> None:
+    with closing(sqlite3.connect(travel_db)) as conn:
+        assert ensure_epoch_columns(conn) == [
+            "flights.scheduled_departure_epoch",
+            "flights.scheduled_arrival_epoch",
+        ]
+        rows = conn.execute(
+            "SELECT scheduled_departure, scheduled_departure_epoch FROM flights"
+        ).fetchall()
+    assert all(epoch == int(datetime.fromisoformat(text).timestamp()) for text, epoch in rows)
+
+
+def test_range_filter_is_correct_across_timezones(travel_db: Path) -> None:
+    # 15:00 at UTC+05:00 is 10:00 UTC, although the text sorts after "12:00 UTC"
+    start = datetime.now(UTC).replace(microsecond=0) + timedelta(days=10)
+    local_departure = start.replace(hour=15, tzinfo=timezone(timedelta(hours=5)))
+    with closing(sqlite3.connect(travel_db)) as conn:
+        conn.execute(
+            "INSERT INTO flights (flight_id, flight_no, scheduled_departure, scheduled_arrival, "
+            "departure_airport, arrival_airport, status, aircraft_code, actual_departure, "
+            "actual_arrival) VALUES (8, 'LX108', ?, ?, 'ZRH', 'BSL', 'Scheduled', '320', "
+            "'\\N', '\\N')",
+            (
+                local_departure.isoformat(sep=" ", timespec="microseconds"),
+                (local_departure + timedelta(hours=1)).isoformat(sep=" ", timespec="microseconds"),
+            ),
+        )
+        conn.commit()
+    provision_travel_db()
+
+    noon = start.replace(hour=12)
+    arguments = {"departure_airport": "ZRH", "arrival_airport": "BSL"}
+    later = search_flights.invoke({**arguments, "start_time": noon})["flights"]
+    earlier = search_flights.invoke({**arguments, "end_time": noon})["flights"]
+    assert later == []
+    assert [flight["flight_id"] for flight in earlier] == [8]
+
+
+def test_three_hour_rule_uses_epoch_columns(travel_db: Path) -> None:
+    provision_travel_db()
+    too_soon = update_ticket_to_new_flight.invoke(
+        {"ticket_no": "7240005432906569", "new_flight_id": 7}, PASSENGER_CONFIG
+    )
+    assert too_soon.startswith("不允许重新安排到距离当前时间少于 3 小时的航班")
+    accepted = update_ticket_to_new_flight.invoke(
+        {"ticket_no": "7240005432906569", "new_flight_id": 3}, PASSENGER_CONFIG
+    )
+    assert accepted == "机票已成功更新为新的航班。"
+
+
+def test_rebase_keeps_epoch_columns_in_sync(travel_db: Path) -> None:
+    with closing(sqlite3.connect(travel_db)) as conn:
+        ensure_epoch_columns(conn)
+        rebase_dates(conn, now=datetime.now(UTC) + timedelta(days=3))
+        rows = conn.execute(
+            "SELECT scheduled_arrival, scheduled_arrival_epoch FROM flights"
+        ).fetchall()
+    assert all(epoch == int(datetime.fromisoformat(text).timestamp()) for text, epoch in rows)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import sqlite3
+from collections.abc import Callable
+from contextlib import closing
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+import tools
+from tools.flights_tools import (
+    cancel_ticket,
+    fetch_user_flight_information,
+    search_flights,
+    update_ticket_to_new_flight,
+)
+from tools.provision import TRAVEL_INDEXES, ensure_indexes, provision_travel_db
+
+PASSENGER_CONFIG = {"configurable": {"passenger_id": "3442 587242"}}
+
+
+def _is_schema_lookup(statement: str) -> bool:
+    return "sqlite_master" in statement or "pragma_" in statement
+
+
+def _query_plans(call: Callable[[], object]) -> list[list[str]]:
+    """Run a tool and return the EXPLAIN QUERY PLAN details of every SELECT it issued."""
+    statements: list[str] = []
+    # Drop cached tool results so the call actually reaches the database
+    tools.notify_database_reset()
+    # Searches read through the read-only pool, bookings write through the primary pool
+    for connection in (tools.get_connection, tools.get_read_connection):
+        with connection() as conn:
+            conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        for connection in (tools.get_connection, tools.get_read_connection):
+            with connection() as conn:
+                conn.set_trace_callback(None)
+
+    # A fresh connection, so plans are not served from the statement cache of earlier calls
+    plans = []
+    with closing(sqlite3.connect(tools.get_pool().database)) as conn:
+        for statement in statements:
+            # Schema lookups (sqlite_master, pragma functions) are not travel data queries
+            if statement.lstrip().upper().startswith("SELECT") and not _is_schema_lookup(statement):
+                rows = conn.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()
+                plans.append([row[-1] for row in rows])
+    return plans
+
+
+def _assert_no_full_scans(plans: list[list[str]]) -> None:
+    assert plans
+    for plan in plans:
+        # "SCAN (subquery-N)" only walks rows an inner query already produced, and
+        # "SCAN CONSTANT ROW" is a SELECT without a FROM clause
+        table_scans = [
+            step
+            for step in plan
+            if step.startswith("SCAN") and "(subquery" not in step and "CONSTANT ROW" not in step
+        ]
+        assert not table_scans, plan
+
+
+def test_provisioning_is_idempotent(travel_db: Path) -> None:
+    assert provision_travel_db() is True
+    assert provision_travel_db() is True
+
+    with tools.get_connection() as conn:
+        names = {
+            row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        }
+    assert set(TRAVEL_INDEXES) <= names
+
+
+def test_provisioning_skips_missing_database(tmp_path: Path) -> None:
+    missing = tmp_path / "missing.sqlite"
+    tools.configure_database(str(missing))
+    try:
+        assert provision_travel_db() is False
+        assert not missing.exists()
+    finally:
+        tools.configure_database(tools.db)
+
+
+@pytest.mark.parametrize(
+    "arguments",
+    [
+        {"departure_airport": "BSL", "arrival_airport": "CDG"},
+        {"departure_airport": "BSL", "start_time": datetime.now(UTC)},
+        {"arrival_airport": "CDG", "end_time": datetime.now(UTC) + timedelta(days=2)},
+        {"start_time": datetime.now(UTC), "end_time": datetime.now(UTC) + timedelta(days=2)},
+    ],
+)
+def test_search_flights_uses_indexes(travel_db: Path, arguments: dict) -> None:
+    provision_travel_db()
+    plans = _query_plans(lambda: search_flights.invoke(arguments))
+    _assert_no_full_scans(plans)
+
+
+def test_deep_flight_pages_seek_the_index(travel_db: Path) -> None:
+    provision_travel_db()
+    arguments = {"departure_airport": "BSL", "arrival_airport": "CDG", "limit": 1}
+    cursor = search_flights.invoke(arguments)["next_cursor"]
+    plans = _query_plans(lambda: search_flights.invoke({**arguments, "cursor": cursor}))
+    _assert_no_full_scans(plans)
+    assert not [step for plan in plans for step in plan if "TEMP B-TREE" in step], plans
+
+
+def test_user_flight_information_uses_indexes(travel_db: Path) -> None:
+    provision_travel_db()
+    plans = _query_plans(lambda: fetch_user_flight_information.invoke({}, PASSENGER_CONFIG))
+    _assert_no_full_scans(plans)
+
+
+def test_unprovisioned_join_scans_tables(travel_db: Path) -> None:
+    plans = _query_plans(lambda: fetch_user_flight_information.invoke({}, PASSENGER_CONFIG))
+    assert any(step.startswith("SCAN") for plan in plans for step in plan)
+
+    with closing(sqlite3.connect(travel_db)) as conn:
+        ensure_indexes(conn)
+    plans = _query_plans(lambda: fetch_user_flight_information.invoke({}, PASSENGER_CONFIG))
+    _assert_no_full_scans(plans)
+
+
+def test_outdated_index_definitions_are_rebuilt(travel_db: Path) -> None:
+    with closing(sqlite3.connect(travel_db)) as conn:
+        conn.execute(
+            "CREATE INDEX idx_flights_scheduled_departure ON flights (scheduled_departure)"
+        )
+        provision_travel_db(conn)
+        columns = [
+            row[2] for row in conn.execute("PRAGMA index_info(idx_flights_scheduled_departure)")
+        ]
+    assert columns == ["scheduled_departure_epoch", "flight_id"]
+
+
+def test_booking_checks_use_indexes(travel_db: Path) -> None:
+    provision_travel_db()
+    plans = _query_plans(
+        lambda: update_ticket_to_new_flight.invoke(
+            {"ticket_no": "7240005432906569", "new_flight_id": 3}, PASSENGER_CONFIG
+        )
+    )
+    plans += _query_plans(
+        lambda: cancel_ticket.invoke({"ticket_no": "7240005432906570"}, PASSENGER_CONFIG)
+    )
+    _assert_no_full_scans(plans)
@@ -1,5 +1,13 @@
 # 得到项目所在绝对路径
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from queue import Empty, Full, LifoQueue
+from typing import Callable, Iterator, Optional, Union
 
 basic_dir = Path(__file__).resolve().parent.parent
 
@@ -11,3 +19,295 @@ local_file = str(basic_dir / "travel_new.sqlite")
 
 # 创建一个备份文件，允许我们在测试的时候可以重新开始
 backup_file = str(basic_dir / "travel2.sqlite")
+
+# 每个工具连接打开后执行的 PRAGMA，可以通过环境变量调整：
+# WAL 让读操作不被写操作阻塞；写锁被占用时等待 busy_timeout 毫秒而不是立即报 database is locked；
+# cache_size 为负数时单位是 KiB
+DEFAULT_PRAGMAS: dict[str, Union[str, int]] = {
+    "journal_mode": os.getenv("TRAVEL_DB_JOURNAL_MODE", "wal"),
+    "synchronous": os.getenv("TRAVEL_DB_SYNCHRONOUS", "normal"),
+    "busy_timeout": int(os.getenv("TRAVEL_DB_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.getenv("TRAVEL_DB_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("TRAVEL_DB_CACHE_SIZE", "-16000")),
+}
+
+# 只读连接不能切换日志模式，跳过这些需要写数据库文件的 PRAGMA
+_WRITE_PRAGMAS = frozenset({"journal_mode"})
+
+# 安全工具读取的只读副本，例如 litestream/LiteFS 同步的文件；为空时以只读方式打开主库
+replica_db = os.getenv("TRAVEL_DB_REPLICA") or None
+
+# 乘客写入后在这段时间（秒）内读取走主库，保证读到自己刚写入的数据；为 0 时不做保证
+READ_YOUR_WRITES_SECONDS = float(os.getenv("TRAVEL_DB_READ_YOUR_WRITES_SECONDS", "5"))
+
+_PRAGMA_VALUE = re.compile(r"^-?\w+$")
+
+
+def apply_pragmas(conn: sqlite3.Connection, pragmas: dict[str, Union[str, int]]) -> None:
+    """
+    在连接上执行一组 PRAGMA。
+
+    参数:
+        conn (sqlite3.Connection): 数据库连接。
+        pragmas (dict[str, Union[str, int]]): PRAGMA 名 -> 值。
+    """
+    for name, value in pragmas.items():
+        if not name.isidentifier() or not _PRAGMA_VALUE.match(str(value)):
+            raise ValueError(f"无效的 PRAGMA 配置: {name}={value!r}")
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+class ConnectionPool:
+    """
+    旅行数据库的连接池。
+
+    每次工具调用不再重新打开数据库（打开文件、解析 schema、关闭），而是从池中借出一个长连接，
+    用完后归还。sqlite3 会按 SQL 文本在连接上缓存预编译语句，长连接可以让这些语句被复用。
+
+    参数:
+        database (str): 数据库文件路径。
+        max_size (int): 池中最多保留的空闲连接数，超出部分在归还时直接关闭。为 0 时不保留连接，
+            每次借出都重新打开数据库（即未使用连接池时的行为）。
+        cached_statements (int): 每个连接缓存的预编译语句数量。
+        pragmas (Optional[dict[str, Union[str, int]]]): 每个新连接执行的 PRAGMA，默认为 DEFAULT_PRAGMAS；
+            传入空字典时保持 SQLite 的默认设置。
+        read_only (bool): 以 mode=ro 打开数据库，连接上的任何写操作都会报错。
+    """
+
+    def __init__(
+            self,
+            database: str,
+            max_size: int = 8,
+            cached_statements: int = 256,
+            pragmas: Optional[dict[str, Union[str, int]]] = None,
+            read_only: bool = False,
+    ):
+        self.database = database
+        self.read_only = read_only
+        self.max_size = max_size
+        self.cached_statements = cached_statements
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self._idle: LifoQueue = LifoQueue(maxsize=max_size)
+        self._lock = threading.Lock()
+        # 每次 close_all 后递增，借出中的旧连接在归还时会被关闭而不是放回池中
+        self._generation = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        pragmas = self.pragmas
+        if self.read_only:
+            database, uri = f"{Path(self.database).resolve().as_uri()}?mode=ro", True
+            pragmas = {name: value for name, value in pragmas.items() if name not in _WRITE_PRAGMAS}
+        else:
+            database, uri = self.database, False
+        # 连接会在不同线程间借出，但同一时刻只被一个线程使用
+        conn = sqlite3.connect(
+            database,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            uri=uri,
+        )
+        apply_pragmas(conn, pragmas)
+        return conn
+
+    def _acquire(self) -> tuple[sqlite3.Connection, int]:
+        with self._lock:
+            generation = self._generation
+        try:
+            return self._idle.get_nowait(), generation
+        except Empty:
+            return self._connect(), generation
+
+    def _release(self, conn: sqlite3.Connection, generation: int) -> None:
+        with self._lock:
+            stale = generation != self._generation
+        if stale or self.max_size <= 0:
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        借出一个连接。退出上下文时未提交的事务会被回滚，然后连接归还到池中。
+
+        返回:
+            Iterator[sqlite3.Connection]: 可直接执行 SQL 的连接。
+        """
+        conn, generation = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._release(conn, generation)
+
+    def close_all(self) -> None:
+        """关闭所有空闲连接，并让借出中的连接在归还时关闭。"""
+        with self._lock:
+            self._generation += 1
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+
+
+# 所有工具共享的连接池：敏感工具（预订、改签、取消）和其他写操作使用主库
+_pool = ConnectionPool(db)
+
+# 安全工具（搜索、查询行程）使用的只读连接池
+_read_pool = ConnectionPool(replica_db or db, read_only=True)
+
+# 只读查询是否还会读取连接池之外的副本（TRAVEL_DATABASE_URL 指向的服务端数据库，见 tools.backend）
+_external_replica = False
+
+# 乘客 ID（没有登录乘客的写入记为 None）-> 最近一次写入提交的 time.monotonic()
+_recent_writes: dict[Optional[str], float] = {}
+_recent_writes_lock = threading.Lock()
+
+# 数据库被整体替换（切换文件、重置数据）时需要清空的进程内缓存
+_reset_callbacks: list[Callable[[], None]] = []
+
+
+def on_database_reset(callback: Callable[[], None]) -> Callable[[], None]:
+    """
+    注册一个在数据库被整体替换时调用的回调，可以用作装饰器。
+
+    参数:
+        callback (Callable[[], None]): 清空缓存等操作。
+
+    返回:
+        Callable[[], None]: 原回调。
+    """
+    _reset_callbacks.append(callback)
+    return callback
+
+
+def notify_database_reset() -> None:
+    """通知所有缓存：数据库内容已被整体替换。"""
+    for callback in list(_reset_callbacks):
+        callback()
+
+
+def get_pool() -> ConnectionPool:
+    """返回当前工具使用的连接池。"""
+    return _pool
+
+
+def get_read_pool() -> ConnectionPool:
+    """返回安全工具使用的只读连接池。"""
+    return _read_pool
+
+
+def close_all_pools() -> None:
+    """关闭主库和只读连接池中的连接，数据库文件被覆盖前调用。"""
+    _pool.close_all()
+    _read_pool.close_all()
+
+
+def configure_database(
+        database: str, replica_database: Optional[str] = None, **pool_options
+) -> ConnectionPool:
+    """
+    切换工具使用的数据库文件（例如测试或压测时指向临时数据库），旧连接池会被关闭。
+
+    参数:
+        database (str): 新的数据库文件路径。
+        replica_database (Optional[str]): 安全工具读取的只读副本。默认以只读方式打开 database；
+            database 为默认数据库 db 时使用 TRAVEL_DB_REPLICA 配置的副本。
+        **pool_options: 传给 ConnectionPool 的其他参数。
+
+    返回:
+        ConnectionPool: 新的连接池。
+    """
+    global _pool, _read_pool
+    old_pools = (_pool, _read_pool)
+    _pool = ConnectionPool(database, **pool_options)
+    if replica_database is None:
+        replica_database = replica_db if database == db and replica_db else database
+    _read_pool = ConnectionPool(replica_database, read_only=True, **pool_options)
+    for old_pool in old_pools:
+        old_pool.close_all()
+    with _recent_writes_lock:
+        _recent_writes.clear()
+    notify_database_reset()
+    return _pool
+
+
+def get_connection():
+    """
+    从共享连接池借出一个连接，所有工具都通过它访问旅行数据库::
+
+        with get_connection() as conn:
+            rows = conn.execute("SELECT ...", params).fetchall()
+    """
+    return _pool.connection()
+
+
+def current_passenger_id() -> Optional[str]:
+    """返回当前工具调用的 LangChain 运行配置中的 passenger_id，不在工具调用中时返回 None。"""
+    from langchain_core.runnables import ensure_config
+
+    return ensure_config().get("configurable", {}).get("passenger_id")
+
+
+def note_write(passenger_id: Optional[str] = None) -> None:
+    """
+    记录一次已提交的写入，之后 READ_YOUR_WRITES_SECONDS 秒内该乘客的读取走主库。
+
+    参数:
+        passenger_id (Optional[str]): 写入的乘客；为 None 时该时间段内所有读取都走主库。
+    """
+    if READ_YOUR_WRITES_SECONDS <= 0:
+        return
+    now = time.monotonic()
+    with _recent_writes_lock:
+        # 顺便清理已经过期的记录，字典大小不超过窗口内写入过的乘客数
+        expired = [key for key, at in _recent_writes.items() if now - at >= READ_YOUR_WRITES_SECONDS]
+        for key in expired:
+            del _recent_writes[key]
+        _recent_writes[passenger_id] = now
+
+
+def use_external_replica(enabled: bool) -> None:
+    """
+    声明只读查询是否还会读取连接池之外的副本（见 tools.backend）。写入始终提交到工具连接池的主库，
+    启用后与 TRAVEL_DB_REPLICA 一样按 READ_YOUR_WRITES_SECONDS 把刚写入过的乘客的读取切回主库。
+    """
+    global _external_replica
+    _external_replica = enabled
+
+
+def _written_within_window(keys: Optional[tuple] = None) -> bool:
+    # 只读查询打开的都是主库时总能读到最新提交，不需要切换
+    replicated = _external_replica or _read_pool.database != _pool.database
+    if not replicated or READ_YOUR_WRITES_SECONDS <= 0:
+        return False
+    now = time.monotonic()
+    with _recent_writes_lock:
+        written = _recent_writes.values() if keys is None else [_recent_writes.get(key) for key in keys]
+        return any(at is not None and now - at < READ_YOUR_WRITES_SECONDS for at in written)
+
+
+def replica_may_lag() -> bool:
+    """只读副本可能还没有同步最近 READ_YOUR_WRITES_SECONDS 秒内的写入时返回 True。"""
+    return _written_within_window()
+
+
+def reads_from_primary() -> bool:
+    """当前乘客（或没有登录乘客的写入）在 READ_YOUR_WRITES_SECONDS 秒内写入过、只读查询应改走主库时返回 True。"""
+    return _written_within_window((None, current_passenger_id()))
+
+
+def get_read_connection():
+    """
+    为安全工具借出一个只读连接。副本可能落后于主库：当前乘客刚写入过时改为借出主库连接，
+    保证乘客能读到自己的改签、预订::
+
+        with get_read_connection() as conn:
+            rows = conn.execute("SELECT ...", params).fetchall()
+    """
+    return _pool.connection() if reads_from_primary() else _read_pool.connection()
@@ -0,0 +1,127 @@
+"""
+机场代码与城市名之间的双向索引。
+
+flights 使用 IATA 机场代码，hotels、car_rentals、trip_recommendations 使用城市名。准备数据库时把
+airports_data 和地名表（tools/gazetteer.json）中的机场合并写入 airport_cities 表，城市名统一为地名表
+中的英文名（与酒店、租车的 location 一致）。这样搜索工具可以直接接受机场代码，航班与酒店、租车
+之间也可以在 SQL 中按城市连接，例如“某个航班落地城市的酒店”。
+"""
+import sqlite3
+from dataclasses import dataclass
+from typing import Optional
+
+from tools import get_read_connection
+from tools.cache import result_cache
+from tools.gazetteer import default_gazetteer
+from tools.location_trans import transform_location
+
+AIRPORT_CITIES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS airport_cities (
+    airport_code TEXT PRIMARY KEY,
+    city TEXT NOT NULL COLLATE NOCASE
+) WITHOUT ROWID
+"""
+
+# 没有准备 airport_cities 时 SQL 连接退回到 airports_data（城市名未经地名表统一）
+_FALLBACK_SOURCE = "(SELECT airport_code, city FROM airports_data)"
+
+
+@dataclass(frozen=True)
+class AirportIndex:
+    """机场代码 -> 城市名，以及城市名（小写）-> 排序后的机场代码。"""
+
+    cities: dict[str, str]
+    airports: dict[str, tuple[str, ...]]
+
+
+def airport_city_rows(conn: sqlite3.Connection) -> dict[str, str]:
+    """
+    合并地名表和 airports_data，返回机场代码 -> 城市名。
+
+    两边都有的机场以 airports_data 为准；airports_data 中的城市名能在地名表中完全匹配时
+    换成地名表的英文名（例如 Zürich -> Zurich）。
+    """
+    gazetteer = default_gazetteer()
+    cities = {code: place.name for place in gazetteer.places for code in place.airports}
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if "airports_data" in tables:
+        for code, city in conn.execute("SELECT airport_code, city FROM airports_data"):
+            if not code or not city:
+                continue
+            match = gazetteer.lookup(city)
+            cities[code.upper()] = match.place.name if match and match.kind == "exact" else city
+    return cities
+
+
+def airport_cities_available(conn: sqlite3.Connection) -> bool:
+    """判断数据库是否已经建好 airport_cities 表（见 tools.provision.ensure_airport_cities）。"""
+    row = conn.execute(
+        "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = 'airport_cities'"
+    ).fetchone()
+    return row[0] == 1
+
+
+def airport_index() -> AirportIndex:
+    """
+    返回进程内缓存的双向索引，airports_data 或 airport_cities 被修改、数据库被重置时重新加载。
+    """
+    def load() -> AirportIndex:
+        with get_read_connection() as conn:
+            if airport_cities_available(conn):
+                cities = dict(conn.execute("SELECT airport_code, city FROM airport_cities"))
+            else:
+                cities = airport_city_rows(conn)
+        airports: dict[str, list[str]] = {}
+        for code, city in sorted(cities.items()):
+            airports.setdefault(city.lower(), []).append(code)
+        return AirportIndex(cities, {city: tuple(codes) for city, codes in airports.items()})
+
+    return result_cache.get_or_compute(("airport_index",), ("airports_data", "airport_cities"), load)
+
+
+def airport_city(code: str) -> Optional[str]:
+    """返回机场代码所在城市的英文名，未知的代码返回 None。"""
+    return airport_index().cities.get(code.strip().upper())
+
+
+def city_airports(city: str) -> list[str]:
+    """
+    返回城市的全部机场代码。
+
+    参数:
+        city (str): 城市名、别名或机场代码（返回该机场所在城市的全部机场）。
+    """
+    return list(airport_index().airports.get((resolve_location(city) or "").lower(), ()))
+
+
+def resolve_location(location: Optional[str]) -> Optional[str]:
+    """
+    把搜索工具收到的地点转换为城市英文名：机场代码换成所在城市，其余交给 transform_location。
+    """
+    if location and len(location.strip()) == 3 and location.strip().isalpha():
+        city = airport_city(location)
+        if city:
+            return city
+    return transform_location(location)
+
+
+def arrival_city_condition(
+        conn: sqlite3.Connection, alias: str, flight_id: int
+) -> tuple[str, list]:
+    """
+    生成“位于某个航班到达城市”的 WHERE 条件，在 SQL 中把 flights 与 airport_cities 连接。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+        alias (str): 酒店/租车表在查询中的别名。
+        flight_id (int): 航班 ID。
+
+    返回:
+        tuple[str, list]: (条件 SQL, 参数)。
+    """
+    source = "airport_cities" if airport_cities_available(conn) else _FALLBACK_SOURCE
+    condition = (
+        f"{alias}.location IN (SELECT a.city FROM flights f "
+        f"JOIN {source} a ON a.airport_code = f.arrival_airport WHERE f.flight_id = ?)"
+    )
+    return condition, [flight_id]
@@ -0,0 +1,70 @@
+"""
+旅行工具的异步版本。
+
+sqlite3 的调用都是阻塞的。@async_variant 为同名工具加上 async 实现：调用被转交到专用的数据库线程池执行，
+graph.astream 中的工具节点因此不会阻塞事件循环，同一条 AI 消息中的多个工具调用也可以并发执行::
+
+    @async_variant
+    @tool
+    def search_hotels(...): ...
+
+    await search_hotels.ainvoke({"location": "Basel"})
+"""
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from langchain_core.tools import StructuredTool
+
+# 专用于旅行数据库访问的线程池，大小默认与连接池一致，避免与其他阻塞任务争用默认线程池
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TRAVEL_TOOL_WORKERS", "8")),
+    thread_name_prefix="travel-db",
+)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """返回执行旅行工具的线程池。"""
+    return _executor
+
+
+async def run_in_executor(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    在数据库线程池中执行一个阻塞函数并等待结果。
+
+    参数:
+        func (Callable[..., Any]): 阻塞函数。
+        *args (Any): 位置参数。
+        **kwargs (Any): 关键字参数。
+
+    返回:
+        Any: 函数的返回值。
+    """
+    loop = asyncio.get_running_loop()
+    # 复制当前上下文，LangChain 通过 contextvars 传递的运行配置在线程中仍然可用
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+def async_variant(travel_tool: StructuredTool) -> StructuredTool:
+    """
+    为 @tool 创建的同步工具加上在数据库线程池中执行的 async 实现，工具名和参数不变。
+
+    参数:
+        travel_tool (StructuredTool): 同步工具。
+
+    返回:
+        StructuredTool: 同一个工具对象，同时支持 invoke 和 ainvoke。
+    """
+    func = travel_tool.func
+
+    # 保留原函数签名，LangChain 据此把 config 等运行时参数传给 async 实现
+    @functools.wraps(func)
+    async def coroutine(*args: Any, **kwargs: Any) -> Any:
+        return await run_in_executor(func, *args, **kwargs)
+
+    travel_tool.coroutine = coroutine
+    return travel_tool
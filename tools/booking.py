@@ -0,0 +1,688 @@
+"""
+敏感工具（改签、退票，以及酒店、租车、旅行项目的预订/修改/取消）共用的预订服务。
+
+每个操作都在一个 BEGIN IMMEDIATE 事务中完成：事务开始时就取得写锁，存在性、归属和冲突检查
+与随后的写入之间不会插入其他写操作，并发的两次预订不会都成功。检查尽量合并为一条查询，
+写锁的持有时间只覆盖这条查询和写入语句；每个操作的等锁时间和持锁时间记录在 booking_stats 中::
+
+    result = book_item("hotels", 1)
+    result.status   # "ok" / "not_found" / "conflict" / "forbidden" / "rejected"
+    result.message  # 返回给 LLM 的消息
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Iterator, Optional
+
+from tools import current_passenger_id, get_connection, note_write
+from tools.cache import itinerary_cache, passenger_tag, result_cache
+from tools.inventory import (
+    RESOURCE_TYPES,
+    UNDATED_WINDOW,
+    inventory_available,
+    peak_load_params,
+    peak_load_query,
+    stay_days,
+)
+from tools.occupancy import occupancy_available
+from tools.timestamps import epoch_columns_available, timestamp_epoch
+
+# 改签的新航班起飞时间至少要晚于当前时间的秒数
+MIN_REBOOKING_NOTICE = 3 * 3600
+
+
+@dataclass(frozen=True)
+class BookingResult:
+    """
+    一次预订操作的结果。
+
+    参数:
+        status (str): "ok"、"not_found"（目标不存在）、"conflict"（重复预订或没有空余）、
+            "forbidden"（不是机票的拥有者）或 "rejected"（不满足业务规则）。
+        message (str): 返回给 LLM 的消息。
+    """
+
+    status: str
+    message: str
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+@dataclass(frozen=True)
+class Catalog:
+    """
+    可以预订的目录表（酒店、租车、旅行项目）以及各结果对应的消息模板，模板中的 {id} 为记录 ID。
+
+    参数:
+        table (str): 表名，同时是结果缓存的失效标签。
+        columns (tuple[str, ...]): update_item 允许修改的列。
+        messages (dict[str, str]): "booked"、"updated"、"cancelled"、"not_found"、"conflict" 对应的消息；
+            支持按日期预订的表还有 "unavailable"（所选日期没有空余）和 "no_reservation"（没有这段日期的预订）。
+    """
+
+    table: str
+    columns: tuple[str, ...]
+    messages: dict[str, str] = field(default_factory=dict)
+
+
+CATALOGS = {
+    "hotels": Catalog(
+        "hotels",
+        ("checkin_date", "checkout_date"),
+        {
+            "booked": "Hotel {id} 成功预定。",
+            "updated": "Hotel {id} 成功更新。",
+            "cancelled": "Hotel {id} 成功取消。",
+            "not_found": "未找到ID为 {id} 的酒店。",
+            "conflict": "Hotel {id} 已被预订，不能重复预订。",
+            "unavailable": "Hotel {id} 在所选日期没有空房。",
+            "no_reservation": "未找到 Hotel {id} 在所选日期的预订。",
+        },
+    ),
+    "car_rentals": Catalog(
+        "car_rentals",
+        ("start_date", "end_date"),
+        {
+            "booked": "汽车租赁 {id} 成功预订。",
+            "updated": "汽车租赁 {id} 成功更新。",
+            "cancelled": "汽车租赁 {id} 成功取消。",
+            "not_found": "未找到ID为 {id} 的汽车租赁服务。",
+            "conflict": "汽车租赁 {id} 已被预订，不能重复预订。",
+            "unavailable": "汽车租赁 {id} 在所选日期没有空闲车辆。",
+            "no_reservation": "未找到汽车租赁 {id} 在所选日期的预订。",
+        },
+    ),
+    "trip_recommendations": Catalog(
+        "trip_recommendations",
+        ("details",),
+        {
+            "booked": "旅行推荐  {id} 成功预定.",
+            "updated": "旅行推荐 {id} 成功更新。",
+            "cancelled": "旅行推荐 {id} 成功取消。",
+            "not_found": "未找到ID为 {id} 的旅行推荐。",
+            "conflict": "旅行推荐 {id} 已被预订，不能重复预订。",
+        },
+    ),
+}
+
+
+class BookingStats:
+    """按操作统计次数、各结果的数量以及等锁/持锁时间，用于评估写操作的延迟和锁竞争。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations: dict[str, dict[str, Any]] = {}
+
+    def record(self, operation: str, status: str, wait: float, hold: float) -> None:
+        with self._lock:
+            entry = self._operations.setdefault(
+                operation,
+                {"count": 0, "statuses": {}, "wait_seconds": 0.0, "hold_seconds": 0.0, "max_hold_seconds": 0.0},
+            )
+            entry["count"] += 1
+            entry["statuses"][status] = entry["statuses"].get(status, 0) + 1
+            entry["wait_seconds"] += wait
+            entry["hold_seconds"] += hold
+            entry["max_hold_seconds"] = max(entry["max_hold_seconds"], hold)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """返回每个操作的统计（wait_seconds 为等待写锁的总时间，hold_seconds 为持有写锁的总时间）。"""
+        with self._lock:
+            return {
+                operation: {**entry, "statuses": dict(entry["statuses"])}
+                for operation, entry in self._operations.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._operations.clear()
+
+
+booking_stats = BookingStats()
+
+
+class _Transaction:
+    """write_transaction 中的事务句柄，finish 设置操作结果后由上下文统一记录统计。"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.result: Optional[BookingResult] = None
+
+    def finish(self, status: str, message: str) -> BookingResult:
+        return self.record(BookingResult(status, message))
+
+    def record(self, result: BookingResult) -> BookingResult:
+        self.result = result
+        return result
+
+
+@contextmanager
+def write_transaction(operation: str) -> Iterator[_Transaction]:
+    """
+    借出一个连接并开启 BEGIN IMMEDIATE 事务，正常退出时提交，出现异常时回滚。
+
+    参数:
+        operation (str): 操作名，用于 booking_stats 统计。
+
+    返回:
+        Iterator[_Transaction]: 事务句柄，通过 transaction.conn 执行 SQL。
+    """
+    with get_connection() as conn:
+        started = time.perf_counter()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as exc:
+            booking_stats.record(operation, "busy", time.perf_counter() - started, 0.0)
+            raise ValueError("数据库正忙，请稍后重试。") from exc
+        acquired = time.perf_counter()
+        transaction = _Transaction(conn)
+        try:
+            yield transaction
+            conn.commit()
+            # 只读副本可能还没同步这次写入，之后一段时间该乘客的查询改走主库
+            note_write(current_passenger_id())
+        except BaseException:
+            conn.rollback()
+            booking_stats.record(operation, "error", acquired - started, time.perf_counter() - acquired)
+            raise
+        status = transaction.result.status if transaction.result else "ok"
+        booking_stats.record(operation, status, acquired - started, time.perf_counter() - acquired)
+
+
+def _catalog(table: str) -> Catalog:
+    catalog = CATALOGS.get(table)
+    if catalog is None:
+        raise ValueError(f"不支持预订的表: {table}")
+    return catalog
+
+
+def _item_exists(conn: sqlite3.Connection, table: str, item_id: int) -> bool:
+    return conn.execute(f"SELECT 1 FROM {table} WHERE id = ?", (item_id,)).fetchone() is not None
+
+
+def _done(catalog: Catalog, status: str, key: str, item_id: int) -> BookingResult:
+    return BookingResult(status, catalog.messages[key].format(id=item_id))
+
+
+def _book(conn: sqlite3.Connection, catalog: Catalog, item_id: int, inventory: bool = False) -> BookingResult:
+    # 比较并设置：只有未被预订的记录会被更新，成功路径只需要一条语句
+    cursor = conn.execute(f"UPDATE {catalog.table} SET booked = 1 WHERE id = ? AND booked = 0", (item_id,))
+    if cursor.rowcount > 0:
+        if inventory and catalog.table in RESOURCE_TYPES:
+            # 按日期的容量检查只看 reservations：不指定日期的预订记为占满全部日期的一条预订
+            conn.execute(
+                f"INSERT INTO reservations (resource_type, resource_id, start_day, end_day, units) "
+                f"SELECT ?, id, ?, ?, max(capacity, 1) FROM {catalog.table} WHERE id = ?",
+                (RESOURCE_TYPES[catalog.table], *UNDATED_WINDOW, item_id),
+            )
+        return _done(catalog, "ok", "booked", item_id)
+    if _item_exists(conn, catalog.table, item_id):
+        return _done(catalog, "conflict", "conflict", item_id)
+    return _done(catalog, "not_found", "not_found", item_id)
+
+
+def _cancel(conn: sqlite3.Connection, catalog: Catalog, item_id: int, inventory: bool) -> BookingResult:
+    if inventory and catalog.table in RESOURCE_TYPES:
+        # 不指定日期时取消这条记录的全部预订
+        conn.execute(
+            "DELETE FROM reservations WHERE resource_type = ? AND resource_id = ?",
+            (RESOURCE_TYPES[catalog.table], item_id),
+        )
+    cursor = conn.execute(f"UPDATE {catalog.table} SET booked = 0 WHERE id = ?", (item_id,))
+    if cursor.rowcount > 0:
+        return _done(catalog, "ok", "cancelled", item_id)
+    return _done(catalog, "not_found", "not_found", item_id)
+
+
+def _reserve(
+        conn: sqlite3.Connection,
+        catalog: Catalog,
+        item_id: int,
+        window: tuple[int, int],
+        units: int,
+        inventory: bool,
+) -> BookingResult:
+    if not inventory:
+        # 还没有按日期库存时改用 booked 标记
+        return _book(conn, catalog, item_id)
+    table = catalog.table
+    start_day, end_day = window
+    # 记录的存在性、容量和这段日期的最大占用量在同一条查询中取出
+    row = conn.execute(
+        f"SELECT t.capacity, coalesce({peak_load_query('t.id')}, 0) FROM {table} t WHERE t.id = ?",
+        (*peak_load_params(table, start_day, end_day), item_id),
+    ).fetchone()
+    if row is None:
+        return _done(catalog, "not_found", "not_found", item_id)
+    if row[0] - row[1] < units:
+        return _done(catalog, "conflict", "unavailable", item_id)
+    conn.execute(
+        "INSERT INTO reservations (resource_type, resource_id, start_day, end_day, units) VALUES (?, ?, ?, ?, ?)",
+        (RESOURCE_TYPES[table], item_id, start_day, end_day, units),
+    )
+    conn.execute(f"UPDATE {table} SET booked = 1 WHERE id = ?", (item_id,))
+    return _done(catalog, "ok", "booked", item_id)
+
+
+def _cancel_reservation(
+        conn: sqlite3.Connection, catalog: Catalog, item_id: int, window: tuple[int, int], inventory: bool
+) -> BookingResult:
+    if not inventory:
+        return _cancel(conn, catalog, item_id, inventory)
+    table = catalog.table
+    resource_type = RESOURCE_TYPES[table]
+    start_day, end_day = window
+    # 先在 R*Tree 中找到预订再删除：删除触发器会写入 R*Tree，不能在读取它的同一条语句中执行
+    row = conn.execute(
+        "SELECT id FROM reservations_index WHERE type_min = ? AND type_max = ? "
+        "AND resource_min = ? AND resource_max = ? AND day_min = ? AND day_max = ? LIMIT 1",
+        (resource_type, resource_type, item_id, item_id, start_day, end_day - 1),
+    ).fetchone()
+    if row is None:
+        if _item_exists(conn, table, item_id):
+            return _done(catalog, "not_found", "no_reservation", item_id)
+        return _done(catalog, "not_found", "not_found", item_id)
+    conn.execute("DELETE FROM reservations WHERE id = ?", row)
+    conn.execute(
+        f"UPDATE {table} SET booked = EXISTS ("
+        f"SELECT 1 FROM reservations_index WHERE type_min = ? AND type_max = ? "
+        f"AND resource_min = ? AND resource_max = ?) WHERE id = ?",
+        (resource_type, resource_type, item_id, item_id, item_id),
+    )
+    return _done(catalog, "ok", "cancelled", item_id)
+
+
+def _stored_window(start: Any, end: Any) -> Optional[tuple[int, int]]:
+    try:
+        return stay_days(start, end)
+    except (TypeError, ValueError):
+        return None
+
+
+def _move_reservation(
+        conn: sqlite3.Connection, catalog: Catalog, item_id: int, changes: dict[str, Any]
+) -> Optional[BookingResult]:
+    # 修改日期时把按日期的预订移到新日期，没有按日期的预订时返回 None（只修改记录的列）
+    table = catalog.table
+    resource_type = RESOURCE_TYPES[table]
+    start_column, end_column = catalog.columns
+    rows = conn.execute(
+        f"SELECT r.id, r.start_day, r.end_day, r.units, t.{start_column}, t.{end_column} "
+        f"FROM {table} t JOIN reservations r ON r.resource_type = ? AND r.resource_id = t.id "
+        f"WHERE t.id = ? AND r.start_day != ? ORDER BY r.id DESC",
+        (resource_type, item_id, UNDATED_WINDOW[0]),
+    ).fetchall()
+    if not rows:
+        return None
+    # 优先移动与记录上的日期一致的预订（与 ensure_inventory 回填的约定一致），否则移动最近的一条
+    reservation_id, start_day, end_day, units = next(
+        (row for row in rows if _stored_window(row[4], row[5]) == (row[1], row[2])), rows[0]
+    )[:4]
+    start = changes.get(start_column) or date.fromordinal(start_day).isoformat()
+    end = changes.get(end_column) or date.fromordinal(end_day).isoformat()
+    window = stay_days(start, end)
+
+    # 先删除原预订再检查新日期的容量，新日期没有空余时恢复原预订
+    conn.execute("DELETE FROM reservations WHERE id = ?", (reservation_id,))
+    result = _reserve(conn, catalog, item_id, window, units, inventory=True)
+    if not result.ok:
+        conn.execute(
+            "INSERT INTO reservations (id, resource_type, resource_id, start_day, end_day, units) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (reservation_id, resource_type, item_id, start_day, end_day, units),
+        )
+        return result
+    conn.execute(f"UPDATE {table} SET {start_column} = ?, {end_column} = ? WHERE id = ?", (start, end, item_id))
+    return _done(catalog, "ok", "updated", item_id)
+
+
+def _reservation_window(table: str, start: Any, end: Any) -> tuple[int, int]:
+    if table not in RESOURCE_TYPES:
+        raise ValueError(f"{table} 不支持按日期预订。")
+    if not start or not end:
+        raise ValueError("按日期预订需要同时给出开始和结束日期。")
+    return stay_days(start, end)
+
+
+def _committed(table: str, result: BookingResult) -> BookingResult:
+    if result.ok:
+        result_cache.invalidate_tables(table)
+    return result
+
+
+def book_item(table: str, item_id: int) -> BookingResult:
+    """
+    预订一条目录记录。记录已被预订时返回 "conflict"，并发的两次预订只有一次成功。
+
+    参数:
+        table (str): CATALOGS 中的表名。
+        item_id (int): 记录 ID。
+
+    返回:
+        BookingResult: 操作结果。
+    """
+    catalog = _catalog(table)
+    with write_transaction(f"book:{table}") as transaction:
+        inventory = inventory_available(transaction.conn)
+        result = transaction.record(_book(transaction.conn, catalog, item_id, inventory))
+    return _committed(table, result)
+
+
+def update_item(table: str, item_id: int, **values: Any) -> BookingResult:
+    """
+    修改一条目录记录的列，值为 None 的列保持不变。
+
+    修改酒店/租车的日期且这条记录有按日期的预订时，预订在同一个写事务中移到新日期：
+    新日期内没有空余时返回 "conflict"，原预订保持不变。
+
+    参数:
+        table (str): CATALOGS 中的表名。
+        item_id (int): 记录 ID。
+        **values (Any): 列名 -> 新值，列名必须在 Catalog.columns 中。
+
+    返回:
+        BookingResult: 操作结果。
+    """
+    catalog = _catalog(table)
+    unknown = set(values) - set(catalog.columns)
+    if unknown:
+        raise ValueError(f"{table} 不支持修改的列: {', '.join(sorted(unknown))}")
+    changes = {column: value for column, value in values.items() if value is not None}
+
+    with write_transaction(f"update:{table}") as transaction:
+        conn = transaction.conn
+        moved = None
+        if changes and table in RESOURCE_TYPES and inventory_available(conn):
+            moved = _move_reservation(conn, catalog, item_id, changes)
+        if moved is not None:
+            result = transaction.record(moved)
+        else:
+            if changes:
+                assignments = ", ".join(f"{column} = ?" for column in changes)
+                cursor = conn.execute(f"UPDATE {table} SET {assignments} WHERE id = ?", (*changes.values(), item_id))
+                found = cursor.rowcount > 0
+            else:
+                found = _item_exists(conn, table, item_id)
+            status, key = ("ok", "updated") if found else ("not_found", "not_found")
+            result = transaction.record(_done(catalog, status, key, item_id))
+    if result.ok and changes:
+        result_cache.invalidate_tables(table)
+    return result
+
+
+def cancel_item(table: str, item_id: int) -> BookingResult:
+    """
+    取消一条目录记录的预订（按日期库存可用时，同时删除这条记录的全部按日期预订）。
+
+    参数:
+        table (str): CATALOGS 中的表名。
+        item_id (int): 记录 ID。
+
+    返回:
+        BookingResult: 操作结果。
+    """
+    catalog = _catalog(table)
+    with write_transaction(f"cancel:{table}") as transaction:
+        inventory = inventory_available(transaction.conn)
+        result = transaction.record(_cancel(transaction.conn, catalog, item_id, inventory))
+    return _committed(table, result)
+
+
+def reserve_item(table: str, item_id: int, start: Any, end: Any, units: int = 1) -> BookingResult:
+    """
+    按日期预订酒店房间或租车：[start, end) 内的最大占用量加上 units 不能超过记录的 capacity，
+    容量检查和写入在同一个写事务中完成，并发预订不会超售。数据库还没有按日期库存时退回到 booked 标记。
+
+    参数:
+        table (str): tools.inventory.RESOURCE_TYPES 中的表名。
+        item_id (int): 记录 ID。
+        start (Any): 入住/取车日期。
+        end (Any): 退房/还车日期。
+        units (int): 预订的房间/车辆数。
+
+    返回:
+        BookingResult: 操作结果，没有空余时为 "conflict"。
+    """
+    catalog = _catalog(table)
+    window = _reservation_window(table, start, end)
+    with write_transaction(f"reserve:{table}") as transaction:
+        inventory = inventory_available(transaction.conn)
+        result = transaction.record(_reserve(transaction.conn, catalog, item_id, window, units, inventory))
+    return _committed(table, result)
+
+
+def cancel_reservation(table: str, item_id: int, start: Any, end: Any) -> BookingResult:
+    """
+    取消一条开始和结束日期都与给定日期一致的按日期预订；记录不再有任何预订时 booked 恢复为 0。
+
+    参数:
+        table (str): tools.inventory.RESOURCE_TYPES 中的表名。
+        item_id (int): 记录 ID。
+        start (Any): 入住/取车日期。
+        end (Any): 退房/还车日期。
+
+    返回:
+        BookingResult: 操作结果，没有这段日期的预订时为 "not_found"。
+    """
+    catalog = _catalog(table)
+    window = _reservation_window(table, start, end)
+    with write_transaction(f"cancel_reservation:{table}") as transaction:
+        inventory = inventory_available(transaction.conn)
+        result = transaction.record(_cancel_reservation(transaction.conn, catalog, item_id, window, inventory))
+    return _committed(table, result)
+
+
+@dataclass(frozen=True)
+class BatchItem:
+    """
+    批量操作中的一项。
+
+    参数:
+        action (str): "book" 或 "cancel"。
+        table (str): CATALOGS 中的表名。
+        item_id (int): 记录 ID。
+        start (Any): 按日期预订/取消时的开始日期，只适用于 tools.inventory.RESOURCE_TYPES 中的表。
+        end (Any): 按日期预订/取消时的结束日期。
+    """
+
+    action: str
+    table: str
+    item_id: int
+    start: Any = None
+    end: Any = None
+
+
+def apply_batch(items: list[BatchItem], all_or_nothing: bool = False) -> list[BookingResult]:
+    """
+    在一个写事务中依次执行多项预订/取消（可以跨表），只取一次写锁、提交一次。
+
+    参数:
+        items (list[BatchItem]): 要执行的操作，所有参数在事务开始前校验。
+        all_or_nothing (bool): 为 True 时只要有一项失败就回滚整个批次，成功的项标记为 "rolled_back"。
+
+    返回:
+        list[BookingResult]: 与 items 一一对应的结果。
+    """
+    prepared = []
+    for item in items:
+        if item.action not in ("book", "cancel"):
+            raise ValueError(f"不支持的批量操作: {item.action}")
+        window = None
+        if item.start or item.end:
+            window = _reservation_window(item.table, item.start, item.end)
+        prepared.append((item, _catalog(item.table), window))
+
+    with write_transaction("batch") as transaction:
+        conn = transaction.conn
+        inventory = inventory_available(conn)
+        results = []
+        for item, catalog, window in prepared:
+            if item.action == "book":
+                if window:
+                    result = _reserve(conn, catalog, item.item_id, window, 1, inventory)
+                else:
+                    result = _book(conn, catalog, item.item_id, inventory)
+            elif window:
+                result = _cancel_reservation(conn, catalog, item.item_id, window, inventory)
+            else:
+                result = _cancel(conn, catalog, item.item_id, inventory)
+            results.append(result)
+        succeeded = all(result.ok for result in results)
+        if all_or_nothing and not succeeded:
+            conn.rollback()
+            results = [
+                BookingResult("rolled_back", "批量操作中有项目失败，本项已撤销。") if result.ok else result
+                for result in results
+            ]
+        transaction.finish("ok" if succeeded else "rolled_back" if all_or_nothing else "partial", "")
+
+    for table in {item.table for item, result in zip(items, results) if result.ok}:
+        result_cache.invalidate_tables(table)
+    return results
+
+
+def apply_to_items(
+        action: str,
+        table: str,
+        item_ids: list[int],
+        start: Any = None,
+        end: Any = None,
+        all_or_nothing: bool = False,
+) -> list[dict]:
+    """
+    批量工具（book_hotels 等）使用的便捷函数：对同一张表的多条记录执行同一个操作。
+
+    返回:
+        list[dict]: 每项的 {"id", "status", "message"}。
+    """
+    items = [BatchItem(action, table, item_id, start, end) for item_id in item_ids]
+    results = apply_batch(items, all_or_nothing)
+    return [
+        {"id": item_id, "status": result.status, "message": result.message}
+        for item_id, result in zip(item_ids, results)
+    ]
+
+
+# 机票的存在性、归属以及乘客是否已持有某航班的机票，合并为一条查询
+_TICKET_CHECKS = """
+    EXISTS (SELECT 1 FROM ticket_flights WHERE ticket_no = :ticket_no) AS has_ticket,
+    EXISTS (
+        SELECT 1 FROM tickets WHERE ticket_no = :ticket_no AND passenger_id = :passenger_id
+    ) AS owned
+"""
+
+# 新航班上机票所在舱位已满：对 flight_occupancy 的主键查找
+_FULL_CABIN_CHECK = """
+    EXISTS (
+        SELECT 1 FROM ticket_flights tf
+        JOIN flight_occupancy o ON o.flight_id = :flight_id AND o.fare_conditions = tf.fare_conditions
+        WHERE tf.ticket_no = :ticket_no AND o.seats > 0 AND o.booked >= o.seats
+    )
+"""
+
+
+def _ticket_message(status: str, ticket_no: str, passenger_id: str) -> str:
+    if status == "not_found":
+        return "未找到给定机票号码的现有机票。"
+    return f"当前登录的乘客 ID 为 {passenger_id}，不是机票 {ticket_no} 的拥有者。"
+
+
+def _invalidate_tickets(passenger_id: str) -> None:
+    result_cache.invalidate_tables("ticket_flights")
+    itinerary_cache.invalidate_tables(passenger_tag(passenger_id))
+
+
+def rebook_ticket(passenger_id: str, ticket_no: str, new_flight_id: int) -> BookingResult:
+    """
+    把乘客的机票改签到新航班。新航班信息、机票存在性、归属、乘客是否已持有新航班的机票，
+    以及新航班上机票所在舱位是否还有空座（见 tools.occupancy）在同一条查询中检查。
+
+    参数:
+        passenger_id (str): 当前登录的乘客 ID。
+        ticket_no (str): 机票编号。
+        new_flight_id (int): 新航班 ID。
+
+    返回:
+        BookingResult: 操作结果。
+    """
+    params = {"ticket_no": ticket_no, "passenger_id": passenger_id, "flight_id": new_flight_id}
+    with write_transaction("rebook:ticket") as transaction:
+        conn = transaction.conn
+        # 准备过的数据库直接读取 UTC 时间戳，不必解析时间文本
+        epoch_column = "f.scheduled_departure_epoch" if epoch_columns_available(conn) else "NULL"
+        # 没有准备占用计数的数据库不检查余座；机型没有该舱位（seats 为 0）时同样不检查
+        full_check = _FULL_CABIN_CHECK if occupancy_available(conn) else "0"
+        row = conn.execute(
+            f"""
+            SELECT f.scheduled_departure, {epoch_column},
+                {_TICKET_CHECKS},
+                EXISTS (
+                    SELECT 1 FROM tickets t JOIN ticket_flights tf ON tf.ticket_no = t.ticket_no
+                    WHERE t.passenger_id = :passenger_id AND tf.flight_id = :flight_id
+                ) AS on_flight,
+                {full_check} AS full_cabin
+            FROM flights f WHERE f.flight_id = :flight_id
+            """,
+            params,
+        ).fetchone()
+        if row is None:
+            result = transaction.finish("not_found", "提供的新的航班 ID 无效。")
+        else:
+            departure, departure_epoch, has_ticket, owned, on_flight, full_cabin = row
+            if departure_epoch is None:
+                departure_epoch = timestamp_epoch(departure)
+            if departure_epoch - time.time() < MIN_REBOOKING_NOTICE:
+                result = transaction.finish(
+                    "rejected",
+                    f"不允许重新安排到距离当前时间少于 3 小时的航班。所选航班时间为 {departure}。",
+                )
+            elif not has_ticket:
+                result = transaction.finish("not_found", _ticket_message("not_found", ticket_no, passenger_id))
+            elif not owned:
+                result = transaction.finish("forbidden", _ticket_message("forbidden", ticket_no, passenger_id))
+            elif on_flight:
+                result = transaction.finish(
+                    "conflict", f"乘客 {passenger_id} 已持有航班 {new_flight_id} 的机票，不能重复预订。"
+                )
+            elif full_cabin:
+                result = transaction.finish(
+                    "conflict", f"航班 {new_flight_id} 上机票 {ticket_no} 所在的舱位已经没有空座，请选择其他航班。"
+                )
+            else:
+                conn.execute("UPDATE ticket_flights SET flight_id = :flight_id WHERE ticket_no = :ticket_no", params)
+                result = transaction.finish("ok", "机票已成功更新为新的航班。")
+    if result.ok:
+        _invalidate_tickets(passenger_id)
+    return result
+
+
+def cancel_ticket(passenger_id: str, ticket_no: str) -> BookingResult:
+    """
+    取消乘客的机票，存在性和归属在同一条查询中检查。
+
+    参数:
+        passenger_id (str): 当前登录的乘客 ID。
+        ticket_no (str): 机票编号。
+
+    返回:
+        BookingResult: 操作结果。
+    """
+    params = {"ticket_no": ticket_no, "passenger_id": passenger_id}
+    with write_transaction("cancel:ticket") as transaction:
+        conn = transaction.conn
+        has_ticket, owned = conn.execute(f"SELECT {_TICKET_CHECKS}", params).fetchone()
+        if not has_ticket:
+            result = transaction.finish("not_found", _ticket_message("not_found", ticket_no, passenger_id))
+        elif not owned:
+            result = transaction.finish("forbidden", _ticket_message("forbidden", ticket_no, passenger_id))
+        else:
+            conn.execute("DELETE FROM ticket_flights WHERE ticket_no = :ticket_no", params)
+            result = transaction.finish("ok", "机票已成功取消。")
+    if result.ok:
+        _invalidate_tickets(passenger_id)
+    return result
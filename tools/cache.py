@@ -0,0 +1,225 @@
+"""
+只读旅行工具的结果缓存。
+
+search_flights、search_hotels 等安全工具在 CtripAssistant 的循环中会以相同参数被反复调用。
+这里按“工具名 + 规范化后的参数”缓存结果，容量有上限并按 LRU 淘汰；
+敏感工具写入某张表后，依赖这张表的缓存项会被立即失效。
+"""
+import copy
+import functools
+import inspect
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable, Hashable
+
+from tools import on_database_reset, replica_may_lag
+
+# 不参与缓存键的参数：由运行时注入，而不是由 LLM 给出
+_RUNTIME_PARAMETERS = {"config", "callbacks", "run_manager"}
+
+
+def _normalize_value(value: Any, fold_case: bool) -> Hashable:
+    if isinstance(value, str):
+        # 只折叠 ASCII 大小写：LIKE 对非 ASCII 字符是大小写敏感的
+        return value.lower() if fold_case and value.isascii() else value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize_value(item, fold_case) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _normalize_value(v, fold_case)) for k, v in value.items()))
+    return value
+
+
+def normalize_arguments(func: Callable, args: tuple, kwargs: dict, fold_case: bool = False) -> tuple:
+    """
+    把一次调用的参数规范化为可哈希的元组：位置参数、关键字参数和省略的默认值得到相同的键。
+
+    参数:
+        func (Callable): 被调用的函数。
+        args (tuple): 位置参数。
+        kwargs (dict): 关键字参数。
+        fold_case (bool): 是否忽略 ASCII 字符串的大小写（只适用于大小写不敏感的查询）。
+
+    返回:
+        tuple: 按参数名排序的 (参数名, 规范化值) 元组。
+    """
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return tuple(
+        sorted(
+            (name, _normalize_value(value, fold_case))
+            for name, value in bound.arguments.items()
+            if name not in _RUNTIME_PARAMETERS
+        )
+    )
+
+
+class ToolResultCache:
+    """
+    带表级失效的 LRU 结果缓存。
+
+    参数:
+        max_entries (int): 最多缓存的结果数量，超出后淘汰最久未使用的项。
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[tuple[str, ...], Any]] = OrderedDict()
+        self._keys_by_table: dict[str, set[Hashable]] = {}
+        # 每张表的写入版本号以及整体清空的次数，用于丢弃“查询期间表被修改”的结果
+        self._versions: dict[str, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _current_versions(self, tables: tuple[str, ...]) -> tuple[int, ...]:
+        return (self._epoch,) + tuple(self._versions.get(table, 0) for table in tables)
+
+    def versions(self, tables: tuple[str, ...]) -> tuple[int, ...]:
+        """在执行查询前调用，返回值交给 put 用于判断结果是否已过期。"""
+        with self._lock:
+            return self._current_versions(tables)
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        """返回 (是否命中, 结果)。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, key: Hashable, tables: tuple[str, ...], value: Any, versions: tuple[int, ...]) -> None:
+        """
+        写入结果。如果查询开始后依赖的表已被修改（versions 已过期），结果不会被缓存。
+        """
+        with self._lock:
+            if versions != self._current_versions(tables):
+                return
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = (tables, value)
+            for table in tables:
+                self._keys_by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, tables: tuple[str, ...], compute: Callable[[], Any]) -> Any:
+        """
+        命中时返回缓存结果的副本，否则调用 compute 计算并写入缓存。
+
+        参数:
+            key (Hashable): 缓存键。
+            tables (tuple[str, ...]): 结果依赖的表（或其他失效标签）。
+            compute (Callable[[], Any]): 未命中时执行的查询。
+
+        返回:
+            Any: 查询结果。
+        """
+        found, value = self.get(key)
+        if found:
+            # 返回副本，避免调用方修改缓存中的结果
+            return copy.deepcopy(value)
+        if replica_may_lag():
+            # 查询可能读到落后的只读副本，不写入缓存，避免旧结果一直保留到下一次失效
+            return compute()
+        versions = self.versions(tables)
+        value = compute()
+        self.put(key, tables, copy.deepcopy(value), versions)
+        return value
+
+    def _discard(self, key: Hashable) -> None:
+        tables, _ = self._entries.pop(key)
+        for table in tables:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+
+    def invalidate_tables(self, *tables: str) -> None:
+        """敏感工具修改了这些表之后调用，移除所有依赖它们的缓存项。"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                for key in self._keys_by_table.pop(table, set()):
+                    if key in self._entries:
+                        self._discard(key)
+                        self.invalidations += 1
+
+    def clear(self) -> None:
+        """清空全部缓存（数据库被整体替换时）。"""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._keys_by_table.clear()
+
+    def stats(self) -> dict:
+        """返回命中/未命中等计数，用于评估缓存容量是否合适。"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# 进程内共享的结果缓存，容量可以通过环境变量调整
+result_cache = ToolResultCache(max_entries=int(os.getenv("TRAVEL_TOOL_CACHE_SIZE", "512")))
+on_database_reset(result_cache.clear)
+
+# 每个乘客的行程（fetch_user_info 节点每一轮都会读取），只在该乘客的机票变化时失效
+itinerary_cache = ToolResultCache(max_entries=int(os.getenv("TRAVEL_ITINERARY_CACHE_SIZE", "1024")))
+on_database_reset(itinerary_cache.clear)
+
+
+def passenger_tag(passenger_id: str) -> str:
+    """行程缓存的失效标签：改签、退票后用 itinerary_cache.invalidate_tables(passenger_tag(...)) 失效。"""
+    return f"passenger:{passenger_id}"
+
+
+def cached_tool(
+        *tables: str, fold_case: bool = False, uncached: tuple[str, ...] = ()
+) -> Callable[[Callable], Callable]:
+    """
+    为只读工具加上结果缓存，放在 @tool 之下使用::
+
+        @tool
+        @cached_tool("hotels")
+        def search_hotels(...): ...
+
+    参数:
+        *tables (str): 工具结果依赖的表，这些表被写入时缓存失效。
+        fold_case (bool): 查询本身大小写不敏感时，可以让大小写不同的参数共用一个缓存项。
+        uncached (tuple[str, ...]): 给出这些参数（不为 None）时不使用缓存，用于查询会连接其他表、
+            而这些表的写入不经过失效通知的情况（例如按航班到达城市搜索酒店时连接 flights）。
+
+    返回:
+        Callable[[Callable], Callable]: 装饰器。
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            arguments = normalize_arguments(func, args, kwargs, fold_case)
+            if uncached and any(value is not None for name, value in arguments if name in uncached):
+                return func(*args, **kwargs)
+            key = (func.__name__, arguments)
+            return result_cache.get_or_compute(key, tables, lambda: func(*args, **kwargs))
+
+        wrapper.cache_tables = tables
+        return wrapper
+
+    return decorator
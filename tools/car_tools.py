@@ -1,34 +1,58 @@
-from sqlite3 import connect, Cursor
 from datetime import date, datetime
-from typing import Optional, Union
+from typing import List, Optional, Union
 
 from langchain_core.tools import tool
 
-from tools import db
+from tools import booking, get_read_connection
+from tools.airports import arrival_city_condition, resolve_location
+from tools.async_tools import async_variant
+from tools.backend import replica_backend, search_catalog
+from tools.cache import cached_tool
+from tools.catalog_search import catalog_page
+from tools.inventory import date_filter
 from tools.location_trans import transform_location
+from tools.text_search import fts_search_query
 
 
+@async_variant
 @tool
+@cached_tool("car_rentals", fold_case=True, uncached=("arrival_flight_id",))
 def search_car_rentals(
         location: Optional[str] = None,
-        name: Optional[str] = None
+        name: Optional[str] = None,
         # price_tier: Optional[str] = None,
-        # start_date: Optional[Union[datetime, date]] = None,
-        # end_date: Optional[Union[datetime, date]] = None,
-) -> list[dict]:
+        start_date: Optional[Union[datetime, date]] = None,
+        end_date: Optional[Union[datetime, date]] = None,
+        limit: int = 20,
+        sort_by: Optional[str] = None,
+        arrival_flight_id: Optional[int] = None,
+) -> dict:
     """
     根据位置、名称、价格层级、开始日期和结束日期搜索汽车租赁信息。
 
     参数:
-    - location (Optional[str]): 汽车租赁的位置。默认为None。
+    - location (Optional[str]): 汽车租赁的位置，可以是城市名或机场代码（如 BSL）。默认为None。
     - name (Optional[str]): 汽车租赁公司的名称。默认为None。
+    - start_date (Optional[Union[datetime, date]]): 取车日期，给出时只返回这段日期内还有空闲车辆的租车服务。默认为None。
+    - end_date (Optional[Union[datetime, date]]): 还车日期。默认为None。
+    - limit (int): 最多返回的租车数量，默认为20。
+    - sort_by (Optional[str]): 排序字段，可选 name、location、price_tier，前缀 - 表示倒序。默认按相关度排序。
+    - arrival_flight_id (Optional[int]): 只返回该航班到达城市的租车服务。默认为None。
     返回:
-    - list[dict]: 包含匹配搜索条件的汽车租赁信息的字典列表。
+    - dict: results 为匹配的汽车租赁信息列表；truncated 为 True 时表示还有更多结果，
+      summary 中给出匹配总数和按价格层级的分布，可据此收窄搜索条件。
     """
-    conn = connect(db)
-    cursor = conn.cursor()
-    location = transform_location(location)
-    query = "SELECT * FROM car_rentals WHERE 1=1"
+    backend = replica_backend()
+    if backend is not None:
+        # 服务端副本上没有全文索引和按日期的库存，给出日期时只返回未被预订的租车服务
+        return search_catalog(
+            backend, "car_rentals", limit, sort_by,
+            location=transform_location(location), name=name,
+            available_only=bool(start_date or end_date), arrival_flight_id=arrival_flight_id,
+        )
+
+    location = resolve_location(location)
+    query = "SELECT * FROM car_rentals t WHERE 1=1"
     params = []
 
     if location:
@@ -37,43 +61,57 @@ def search_car_rentals(
     if name:
         query += " AND name LIKE ?"
         params.append(f"%{name}%")
-    # 由于我们的示例数据集没有太多数据，在这里我们不对日期和价格层级进行严格匹配
-
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-
-    conn.close()
+    # 价格层级不做严格匹配；给出日期时只返回这段日期内还有空余的记录
+
+    with get_read_connection() as conn:
+        # 按日期的空余容量过滤，走 reservations 的 R*Tree 索引
+        conditions = []
+        availability = date_filter(conn, "car_rentals", "t", start_date, end_date)
+        if availability:
+            conditions.append(availability)
+            query += f" AND {availability[0]}"
+            params.extend(availability[1])
+        # 与航班的到达机场按城市连接，不需要先查出航班再换算城市
+        if arrival_flight_id is not None:
+            arrival = arrival_city_condition(conn, "t", arrival_flight_id)
+            conditions.append(arrival)
+            query += f" AND {arrival[0]}"
+            params.extend(arrival[1])
+        # 优先走全文索引（按相关度排序），没有建 FTS5 影子表时回退到 LIKE 查询
+        fts_query = fts_search_query(
+            conn, "car_rentals", {"location": location, "name": name}, conditions=conditions
+        )
+        if fts_query:
+            query, params = fts_query
+        page = catalog_page(conn, "car_rentals", query, params, limit, sort_by)
 
-    return [
-        dict(zip([column[0] for column in cursor.description], row)) for row in results
-    ]
+    return page
 
 
+@async_variant
 @tool
-def book_car_rental(rental_id: int) -> str:
+def book_car_rental(
+        rental_id: int,
+        start_date: Optional[Union[datetime, date]] = None,
+        end_date: Optional[Union[datetime, date]] = None,
+) -> str:
     """
     通过ID预订汽车租赁服务。
 
     参数:
     - rental_id (int): 要预订的汽车租赁服务的ID。
+    - start_date (Optional[Union[datetime, date]]): 取车日期，与还车日期一起给出时按日期预订一辆车。默认为None。
+    - end_date (Optional[Union[datetime, date]]): 还车日期。默认为None。
 
     返回:
     - str: 表明汽车租赁是否成功预订的消息。
     """
-    conn = connect(db)
-    cursor = conn.cursor()
-
-    cursor.execute("UPDATE car_rentals SET booked = 1 WHERE id = ?", (rental_id,))
-    conn.commit()
-
-    if cursor.rowcount > 0:
-        conn.close()
-        return f"汽车租赁 {rental_id} 成功预订。"
-    else:
-        conn.close()
-        return f"未找到ID为 {rental_id} 的汽车租赁服务。"
+    if start_date or end_date:
+        return booking.reserve_item("car_rentals", rental_id, start_date, end_date).message
+    return booking.book_item("car_rentals", rental_id).message
 
 
+@async_variant
 @tool
 def update_car_rental(
         rental_id: int,
@@ -91,50 +129,73 @@ def update_car_rental(
     返回:
         str: 表明汽车租赁是否成功更新的消息。
     """
-    conn = connect(db)
-    cursor = conn.cursor()
-
-    if start_date:
-        cursor.execute(
-            "UPDATE car_rentals SET start_date = ? WHERE id = ?",
-            (start_date, rental_id),
-        )
-    if end_date:
-        cursor.execute(
-            "UPDATE car_rentals SET end_date = ? WHERE id = ?", (end_date, rental_id)
-        )
-
-    conn.commit()
-
-    if cursor.rowcount > 0:
-        conn.close()
-        return f"汽车租赁 {rental_id} 成功更新。"
-    else:
-        conn.close()
-        return f"未找到ID为 {rental_id} 的汽车租赁服务。"
+    return booking.update_item(
+        "car_rentals", rental_id, start_date=start_date, end_date=end_date
+    ).message
 
 
+@async_variant
 @tool
-def cancel_car_rental(rental_id: int) -> str:
+def cancel_car_rental(
+        rental_id: int,
+        start_date: Optional[Union[datetime, date]] = None,
+        end_date: Optional[Union[datetime, date]] = None,
+) -> str:
     """
     根据ID取消汽车租赁服务。
 
     参数:
         rental_id (int): 要取消的汽车租赁服务的ID。
+        start_date (Optional[Union[datetime, date]]): 取车日期，与还车日期一起给出时只取消这段日期的预订。默认为None。
+        end_date (Optional[Union[datetime, date]]): 还车日期。默认为None。
 
     返回:
         str: 表明汽车租赁是否成功取消的消息。
     """
-    conn = connect(db)
-    cursor = conn.cursor()
-
-    # 将booked字段设置为0来表示取消预订
-    cursor.execute("UPDATE car_rentals SET booked = 0 WHERE id = ?", (rental_id,))
-    conn.commit()
-
-    if cursor.rowcount > 0:
-        conn.close()
-        return f"汽车租赁 {rental_id} 成功取消。"
-    else:
-        conn.close()
-        return f"未找到ID为 {rental_id} 的汽车租赁服务。"
+    if start_date or end_date:
+        return booking.cancel_reservation("car_rentals", rental_id, start_date, end_date).message
+    return booking.cancel_item("car_rentals", rental_id).message
+
+
+@async_variant
+@tool
+def book_car_rentals(
+        rental_ids: List[int],
+        start_date: Optional[Union[datetime, date]] = None,
+        end_date: Optional[Union[datetime, date]] = None,
+        all_or_nothing: bool = False,
+) -> List[dict]:
+    """
+    在一次确认中预订多个汽车租赁服务，全部预订在同一个事务中完成。
+
+    参数:
+        rental_ids (List[int]): 要预订的汽车租赁服务的ID列表。
+        start_date (Optional[Union[datetime, date]]): 取车日期，与还车日期一起给出时每项按日期预订一辆车。默认为None。
+        end_date (Optional[Union[datetime, date]]): 还车日期。默认为None。
+        all_or_nothing (bool): 为 True 时任意一项失败则全部不预订。默认为False。
+
+    返回:
+        List[dict]: 每项租车的 {"id", "status", "message"}，status 为 ok、conflict、not_found 或 rolled_back。
+    """
+    return booking.apply_to_items("book", "car_rentals", rental_ids, start_date, end_date, all_or_nothing)
+
+
+@async_variant
+@tool
+def cancel_car_rentals(
+        rental_ids: List[int],
+        start_date: Optional[Union[datetime, date]] = None,
+        end_date: Optional[Union[datetime, date]] = None,
+) -> List[dict]:
+    """
+    在一次确认中取消多个汽车租赁服务的预订，全部取消在同一个事务中完成。
+
+    参数:
+        rental_ids (List[int]): 要取消的汽车租赁服务的ID列表。
+        start_date (Optional[Union[datetime, date]]): 取车日期，与还车日期一起给出时只取消这段日期的预订。默认为None。
+        end_date (Optional[Union[datetime, date]]): 还车日期。默认为None。
+
+    返回:
+        List[dict]: 每项租车的 {"id", "status", "message"}，status 为 ok 或 not_found。
+    """
+    return booking.apply_to_items("cancel", "car_rentals", rental_ids, start_date, end_date)
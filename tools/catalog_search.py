@@ -0,0 +1,98 @@
+"""
+酒店、租车和旅行推荐搜索结果的截断、排序与汇总。
+
+搜索结果会被完整地序列化进 ToolMessage 并回传给大模型。热门城市可能有成千上万条匹配，
+因此每次只返回前 limit 条，超出时附带一个在数据库端聚合的汇总（总数、按价格层级的分布），
+让大模型据此收窄条件，而不是读完所有结果。
+"""
+import sqlite3
+from typing import Optional
+
+# 价格层级从低到高，按价格排序时使用；未知层级排在最后
+PRICE_TIERS = (
+    "Economy",
+    "Midsize",
+    "Midscale",
+    "Upper Midscale",
+    "Premium",
+    "Upscale",
+    "Upper Upscale",
+    "Luxury",
+)
+
+# 表名 -> 可排序的列
+SORT_COLUMNS = {
+    "hotels": ("name", "location", "price_tier"),
+    "car_rentals": ("name", "location", "price_tier"),
+    "trip_recommendations": ("name", "location"),
+}
+
+# 表名 -> 截断时用于汇总分布的列（旅行推荐没有价格层级，按位置汇总）
+SUMMARY_COLUMNS = {
+    "hotels": "price_tier",
+    "car_rentals": "price_tier",
+    "trip_recommendations": "location",
+}
+
+
+def _order_clause(table: str, sort_by: str) -> str:
+    descending = sort_by.startswith("-")
+    column = sort_by.lstrip("-").strip().lower()
+    if column not in SORT_COLUMNS[table]:
+        options = ", ".join(SORT_COLUMNS[table])
+        raise ValueError(f"不支持按 {sort_by} 排序，可选字段: {options}（加前缀 - 表示倒序）。")
+    direction = "DESC" if descending else "ASC"
+    if column == "price_tier":
+        ranks = " ".join(f"WHEN '{tier}' THEN {rank}" for rank, tier in enumerate(PRICE_TIERS))
+        # 未知层级始终排在最后
+        unknown = -1 if descending else len(PRICE_TIERS)
+        column = f"CASE price_tier {ranks} ELSE {unknown} END"
+    return f"{column} {direction}, id"
+
+
+def catalog_page(
+        conn: sqlite3.Connection,
+        table: str,
+        query: str,
+        params: list,
+        limit: int = 20,
+        sort_by: Optional[str] = None,
+) -> dict:
+    """
+    执行目录搜索，只返回前 limit 条结果；结果被截断时附带数据库端聚合的汇总。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+        table (str): 目录表名，必须是 SORT_COLUMNS 中的表。
+        query (str): 返回整行（SELECT *）的搜索 SQL，可以是全文检索或 LIKE 查询。
+        params (list): SQL 参数。
+        limit (int): 最多返回的结果数量。
+        sort_by (Optional[str]): 排序字段，前缀 - 表示倒序；为 None 时保持搜索本身的顺序（全文检索按相关度）。
+
+    返回:
+        dict: {"results": [...], "truncated": bool}，截断时还包含
+        {"summary": {"total": 总数, "by_<列名>": {值: 数量}}}。
+    """
+    if sort_by:
+        page_query = f"SELECT * FROM ({query}) ORDER BY {_order_clause(table, sort_by)} LIMIT ?"
+    else:
+        page_query = f"{query} LIMIT ?"
+    # 多取一行，用来判断结果是否被截断
+    cursor = conn.execute(page_query, [*params, limit + 1])
+    rows = cursor.fetchall()
+    column_names = [column[0] for column in cursor.description]
+    page = {
+        "results": [dict(zip(column_names, row)) for row in rows[:limit]],
+        "truncated": len(rows) > limit,
+    }
+    if page["truncated"]:
+        column = SUMMARY_COLUMNS[table]
+        histogram = conn.execute(
+            f"SELECT {column}, count(*) FROM ({query}) GROUP BY {column} ORDER BY count(*) DESC",
+            params,
+        ).fetchall()
+        page["summary"] = {
+            "total": sum(count for _, count in histogram),
+            f"by_{column}": dict(histogram),
+        }
+    return page
@@ -0,0 +1,208 @@
+"""
+跨领域的目的地搜索。
+
+“下周巴塞尔有什么可订的”原本需要主助理依次转交给航班、酒店、租车、旅行推荐四个专门助理，
+每次转交都是一轮大模型调用。search_destination_bundle 并发执行这四类只读查询（每个查询借出各自的
+池化连接），合并成一份精简的汇总，一次工具调用即可回答。
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Callable, Optional, Union
+
+from langchain_core.tools import tool
+
+from tools import get_read_connection
+from tools.airports import city_airports, resolve_location
+from tools.async_tools import run_in_executor
+from tools.cache import result_cache
+from tools.car_tools import search_car_rentals
+from tools.flights_tools import search_flights
+from tools.hotels_tools import search_hotels
+from tools.timestamps import timestamp_epoch
+from tools.trip_tools import search_trip_recommendations
+
+# 同步调用时用于并发执行四类查询的线程池；异步调用直接在数据库线程池中并发
+_fan_out = ThreadPoolExecutor(max_workers=4, thread_name_prefix="travel-bundle")
+
+# 每类结果保留的字段，其余字段可以再用对应的搜索工具查看
+_COMPACT_FIELDS = {
+    "flights": (
+        "flight_id", "flight_no", "departure_airport", "arrival_airport",
+        "scheduled_departure", "scheduled_arrival",
+    ),
+    "hotels": ("id", "name", "location", "price_tier"),
+    "car_rentals": ("id", "name", "location", "price_tier"),
+    "trip_recommendations": ("id", "name", "location", "keywords"),
+}
+
+
+def destination_airports(location: str) -> list[str]:
+    """
+    返回目的地的全部机场代码：先查机场与城市的索引（见 tools.airports），
+    找不到时再按城市名或机场名模糊匹配 airports_data。
+
+    参数:
+        location (str): 城市名、机场名或 IATA 机场代码。
+
+    返回:
+        list[str]: 排序后的机场代码。
+    """
+    airports = city_airports(location)
+    if airports:
+        return airports
+
+    def load() -> list[str]:
+        with get_read_connection() as conn:
+            rows = conn.execute(
+                "SELECT airport_code FROM airports_data "
+                "WHERE city LIKE ? OR airport_name LIKE ? ORDER BY airport_code",
+                (f"%{location}%", f"%{location}%"),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    return result_cache.get_or_compute(
+        ("destination_airports", location.lower()), ("airports_data",), load
+    )
+
+
+def _day_start(value: Union[datetime, date]) -> datetime:
+    return value if isinstance(value, datetime) else datetime.combine(value, time.min)
+
+
+def _compact(kind: str, rows: list[dict]) -> list[dict]:
+    return [{field: row.get(field) for field in _COMPACT_FIELDS[kind]} for row in rows]
+
+
+def _departure_epoch(flight: dict) -> float:
+    epoch = flight.get("scheduled_departure_epoch")
+    if epoch is None:
+        epoch = timestamp_epoch(flight["scheduled_departure"])
+    return float("inf") if epoch is None else epoch
+
+
+def _search_arrivals(
+        airports: list[str], start: Optional[datetime], end: Optional[datetime], limit: int
+) -> dict:
+    flights, total = [], 0
+    for airport in airports:
+        page = search_flights.func(
+            arrival_airport=airport, start_time=start, end_time=end, limit=limit
+        )
+        flights.extend(page["flights"])
+        total += page["total_estimate"]
+    # 各机场的结果按 UTC 时间合并，不同时区的起飞时间文本不能直接比较
+    flights.sort(key=lambda flight: (_departure_epoch(flight), flight["flight_id"]))
+    return {"airports": airports, "total": total, "results": _compact("flights", flights[:limit])}
+
+
+def _catalog_section(kind: str, page: dict) -> dict:
+    total = page["summary"]["total"] if page.get("truncated") else len(page["results"])
+    return {"total": total, "results": _compact(kind, page["results"])}
+
+
+def _bundle_searches(
+        location: str,
+        start_date: Optional[Union[datetime, date]],
+        end_date: Optional[Union[datetime, date]],
+        limit: int,
+) -> dict[str, Callable[[], dict]]:
+    city = resolve_location(location)
+    # 不指定开始日期时从当前时间起查；截断到分钟，同一分钟内的调用共用 search_flights 的缓存
+    start = (
+        _day_start(start_date)
+        if start_date
+        else datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    )
+    # 结束日期当天起飞的航班也包括在内
+    end = _day_start(end_date) + timedelta(days=1) if end_date else None
+    return {
+        "flights": lambda: _search_arrivals(destination_airports(city), start, end, limit),
+        "hotels": lambda: _catalog_section(
+            "hotels",
+            search_hotels.func(
+                location=city, checkin_date=start_date, checkout_date=end_date, limit=limit
+            ),
+        ),
+        "car_rentals": lambda: _catalog_section(
+            "car_rentals",
+            search_car_rentals.func(
+                location=city, start_date=start_date, end_date=end_date, limit=limit
+            ),
+        ),
+        "trip_recommendations": lambda: _catalog_section(
+            "trip_recommendations", search_trip_recommendations.func(location=city, limit=limit)
+        ),
+    }
+
+
+def _run_section(search: Callable[[], dict]) -> dict:
+    # 某一类查询失败时只影响这一部分结果
+    try:
+        return search()
+    except Exception as exc:  # noqa: BLE001
+        return {"error": str(exc)}
+
+
+def _merge(
+        location: str,
+        start_date: Optional[Union[datetime, date]],
+        end_date: Optional[Union[datetime, date]],
+        sections: dict[str, dict],
+) -> dict:
+    return {
+        "location": location,
+        "start_date": start_date.isoformat() if start_date else None,
+        "end_date": end_date.isoformat() if end_date else None,
+        **sections,
+    }
+
+
+@tool
+def search_destination_bundle(
+        location: str,
+        start_date: Optional[Union[datetime, date]] = None,
+        end_date: Optional[Union[datetime, date]] = None,
+        limit: int = 5,
+) -> dict:
+    """
+    一次性查询某个目的地在给定日期内的航班、酒店、租车和旅行推荐，返回精简的汇总。
+    适合回答“下周巴塞尔有什么可订的”这类问题；需要更多结果或预订时再使用对应的搜索工具或专门助理。
+
+    参数:
+        location (str): 目的地城市名或机场代码。
+        start_date (Optional[Union[datetime, date]]): 行程开始日期，默认为当前时间。
+        end_date (Optional[Union[datetime, date]]): 行程结束日期。给出时酒店和租车只返回这段日期内有空余的。
+        limit (int): 每类最多返回的结果数量，默认为5。
+
+    返回:
+        dict: flights（到达该目的地的航班）、hotels、car_rentals、trip_recommendations 四部分，
+        每部分包含 total（匹配总数）和 results；某一部分查询失败时该部分只包含 error。
+    """
+    searches = _bundle_searches(location, start_date, end_date, limit)
+    # 每个查询在当前上下文的副本中执行，线程中仍能取得乘客 ID（读写一致性窗口、缓存标签依赖它）
+    futures = {
+        kind: _fan_out.submit(contextvars.copy_context().run, _run_section, search)
+        for kind, search in searches.items()
+    }
+    return _merge(
+        location, start_date, end_date, {kind: future.result() for kind, future in futures.items()}
+    )
+
+
+async def _search_destination_bundle_async(
+        location: str,
+        start_date: Optional[Union[datetime, date]] = None,
+        end_date: Optional[Union[datetime, date]] = None,
+        limit: int = 5,
+) -> dict:
+    searches = _bundle_searches(location, start_date, end_date, limit)
+    results = await asyncio.gather(
+        *(run_in_executor(_run_section, search) for search in searches.values())
+    )
+    return _merge(location, start_date, end_date, dict(zip(searches, results)))
+
+
+# 异步调用时四类查询直接在数据库线程池中并发，不再占用 _fan_out 的线程
+search_destination_bundle.coroutine = _search_destination_bundle_async
@@ -1,13 +1,54 @@
-from sqlite3 import connect, Cursor
+import base64
+import hashlib
+import json
+import time
+from contextlib import nullcontext
 from datetime import date, datetime
 from typing import Optional, List, Dict
-import pytz
 from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 
-from tools import db
+from tools import booking, get_read_connection
+from tools.async_tools import async_variant
+from tools.backend import ITINERARY_STATEMENT, flight_page, replica_backend
+from tools.cache import cached_tool, itinerary_cache, passenger_tag
+from tools.itineraries import ITINERARY_QUERY, itineraries_available
+from tools.occupancy import flight_availability, occupancy_available
+from tools.route_index import route_index
+from tools.timestamps import epoch_columns_available, to_epoch
 
 
+# 第一页统计匹配总数时最多计数的行数，超过后 total_estimate 只是下界
+_COUNT_CAP = 1000
+
+# 每个航班的余座：按主键读取 flight_occupancy 中该航班的各舱位，超售的舱位按 0 计
+_SEATS_AVAILABLE = (
+    "(SELECT sum(max(o.seats - o.booked, 0)) FROM flight_occupancy o "
+    "WHERE o.flight_id = flights.flight_id AND o.seats > 0)"
+)
+
+
+def _filter_fingerprint(*filters) -> str:
+    # 游标只能用于生成它的那组查询条件
+    return hashlib.sha1(repr(tuple(str(value) for value in filters)).encode()).hexdigest()[:12]
+
+
+def _encode_cursor(departure: str | int, flight_id: int, total: int, fingerprint: str) -> str:
+    payload = json.dumps([departure, flight_id, total, fingerprint], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_cursor(cursor: str, fingerprint: str) -> tuple[str | int, int, int]:
+    try:
+        departure, flight_id, total, expected = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("无效的分页游标。")
+    if expected != fingerprint:
+        raise ValueError("分页游标与当前的查询条件不匹配，请去掉 cursor 重新搜索。")
+    return departure, flight_id, total
+
+
+@async_variant
 @tool
 def fetch_user_flight_information(config: RunnableConfig) -> List[Dict]:
     """
@@ -20,9 +61,6 @@ def fetch_user_flight_information(config: RunnableConfig) -> List[Dict]:
     if not passenger_id:
         raise ValueError("未配置乘客 ID。")
 
-    conn = connect(db)
-    cursor = conn.cursor()
-
     # SQL查询语句，连接多个表以获取所需信息
     query = """
     SELECT 
@@ -37,74 +75,230 @@ def fetch_user_flight_information(config: RunnableConfig) -> List[Dict]:
     WHERE 
         t.passenger_id = ?
     """
-    cursor.execute(query, (passenger_id,))
-    rows = cursor.fetchall()
-    column_names = [column[0] for column in cursor.description]
-    results = [dict(zip(column_names, row)) for row in rows]
 
-    cursor.close()
-    conn.close()
+    def load_itinerary() -> List[Dict]:
+        backend = replica_backend()
+        if backend is not None:
+            return backend.rows(ITINERARY_STATEMENT, passenger_id=passenger_id)
+        with get_read_connection() as conn:
+            # 准备过的数据库直接读取由触发器维护的物化行程，只需一次索引查找
+            sql = ITINERARY_QUERY if itineraries_available(conn) else query
+            cursor = conn.execute(sql, (passenger_id,))
+            rows = cursor.fetchall()
+        column_names = [column[0] for column in cursor.description]
+        return [dict(zip(column_names, row)) for row in rows]
+
+    # 每一轮对话都会读取行程，只有该乘客改签或退票后才需要重新查询
+    return itinerary_cache.get_or_compute(passenger_id, (passenger_tag(passenger_id),), load_itinerary)
+
+
+def _sqlite_flight_page(
+        conn,
+        departure_column: str,
+        departure_airport: Optional[str],
+        arrival_airport: Optional[str],
+        start_value,
+        end_value,
+        after: Optional[tuple],
+        limit: int,
+        count_cap: Optional[int],
+) -> tuple[Optional[int], List[Dict]]:
+    conditions = []
+    params = []
+
+    if departure_airport:
+        conditions.append("departure_airport = ?")
+        params.append(departure_airport)
+
+    if arrival_airport:
+        conditions.append("arrival_airport = ?")
+        params.append(arrival_airport)
 
-    return results
+    if start_value:
+        conditions.append(f"{departure_column} >= ?")
+        params.append(start_value)
+
+    if end_value:
+        conditions.append(f"{departure_column} <= ?")
+        params.append(end_value)
+
+    where = " AND ".join(conditions) or "1 = 1"
+    total = None
+    if count_cap is not None:
+        total = conn.execute(
+            f"SELECT count(*) FROM (SELECT 1 FROM flights WHERE {where} LIMIT ?)", params + [count_cap]
+        ).fetchone()[0]
+    if after is not None:
+        # 从上一页最后一行之后继续读取：沿索引定位，而不是跳过前面所有行
+        where = f"{where} AND ({departure_column}, flight_id) > (?, ?)"
+        params = params + list(after)
+    seats_available = _SEATS_AVAILABLE if occupancy_available(conn) else "NULL"
+    result = conn.execute(
+        f"SELECT flights.*, {seats_available} AS seats_available FROM flights "
+        f"WHERE {where} ORDER BY {departure_column}, flight_id LIMIT ?",
+        params + [limit],
+    )
+    column_names = [column[0] for column in result.description]
+    return total, [dict(zip(column_names, row)) for row in result.fetchall()]
 
 
+@async_variant
 @tool
+@cached_tool("flights", "ticket_flights")
 def search_flights(
         departure_airport: Optional[str] = None,
         arrival_airport: Optional[str] = None,
         start_time: Optional[date | datetime] = None,
         end_time: Optional[date | datetime] = None,
         limit: int = 20,
-) -> List[Dict]:
+        cursor: Optional[str] = None,
+) -> Dict:
     """
-    根据指定的参数（如出发机场、到达机场、出发时间范围等）搜索航班，并返回匹配的航班列表。
-    可以设置一个限制值来控制返回的结果数量。
+    根据指定的参数（如出发机场、到达机场、出发时间范围等）搜索航班，结果按起飞时间排序并分页返回。
+    如果返回的 next_cursor 不为空，说明还有更多航班：保持其他参数不变、传入 cursor=next_cursor 即可获取下一页，
+    不需要放宽查询条件。
 
     参数:
     - departure_airport (Optional[str]): 出发机场（可选）。
     - arrival_airport (Optional[str]): 到达机场（可选）。
     - start_time (Optional[date | datetime]): 出发时间范围的开始时间（可选）。
     - end_time (Optional[date | datetime]): 出发时间范围的结束时间（可选）。
-    - limit (int): 返回结果的最大数量，默认为20。
+    - limit (int): 每页返回结果的最大数量，默认为20。
+    - cursor (Optional[str]): 上一页返回的 next_cursor，获取第一页时不传。
 
     返回:
-        匹配条件的航班信息列表。
+        包含 flights（本页航班列表）、total_estimate（匹配的航班总数，total_exact 为 False 时是下界）
+        和 next_cursor（下一页游标，没有更多结果时为 None）的字典。每个航班的 seats_available 为各舱位
+        剩余座位数之和（为 0 表示已满，为 None 表示未知），各舱位的余座使用 check_flight_availability 查询。
     """
-    conn = connect(db)
-    cursor = conn.cursor()
-
-    query = "SELECT * FROM flights WHERE 1 = 1"
-    params = []
-
-    if departure_airport:
-        query += " AND departure_airport = ?"
-        params.append(departure_airport)
-
-    if arrival_airport:
-        query += " AND arrival_airport = ?"
-        params.append(arrival_airport)
-
-    if start_time:
-        query += " AND scheduled_departure >= ?"
-        params.append(start_time)
+    backend = replica_backend()
+    with nullcontext() if backend is not None else get_read_connection() as conn:
+        # 准备过的数据库按 UTC 时间戳过滤和排序，跨时区也正确，并且可以走索引范围扫描；
+        # 否则回退到按时间文本比较
+        if backend is not None:
+            epoch = backend.has_column("flights", "scheduled_departure_epoch")
+        else:
+            epoch = epoch_columns_available(conn)
+        if epoch:
+            departure_column = "scheduled_departure_epoch"
+            start_value = to_epoch(start_time) if start_time else None
+            end_value = to_epoch(end_time) if end_time else None
+        else:
+            departure_column = "scheduled_departure"
+            start_value, end_value = start_time, end_time
+
+        fingerprint = _filter_fingerprint(
+            departure_column, departure_airport, arrival_airport, start_time, end_time
+        )
+        after, total = None, None
+        if cursor:
+            last_departure, last_flight_id, total = _decode_cursor(cursor, fingerprint)
+            after = (last_departure, last_flight_id)
+        # 多取一行，用来判断是否还有下一页；第一页同时统计匹配总数
+        count_cap = None if cursor else _COUNT_CAP + 1
+        if backend is not None:
+            if not epoch:
+                # 服务端的时间列是文本，按与 SQLite 绑定 datetime 时相同的格式比较
+                start_value, end_value = (str(value) if value else None for value in (start_value, end_value))
+            count, rows = flight_page(
+                backend, departure_airport, arrival_airport, start_value, end_value, after, limit + 1, count_cap
+            )
+        else:
+            count, rows = _sqlite_flight_page(
+                conn, departure_column, departure_airport, arrival_airport,
+                start_value, end_value, after, limit + 1, count_cap,
+            )
+    if count is not None:
+        total = count
+    flights = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit and flights:
+        last = flights[-1]
+        next_cursor = _encode_cursor(last[departure_column], last["flight_id"], total, fingerprint)
+    return {
+        "flights": flights,
+        "total_estimate": min(total, _COUNT_CAP),
+        "total_exact": total <= _COUNT_CAP,
+        "next_cursor": next_cursor,
+    }
+
+
+@async_variant
+@tool
+def check_flight_availability(flight_id: int, fare_conditions: Optional[str] = None) -> Dict:
+    """
+    查询一个航班各舱位的剩余座位。改签前使用此工具确认新航班上乘客机票所在的舱位还有空座。
 
-    if end_time:
-        query += " AND scheduled_departure <= ?"
-        params.append(end_time)
+    参数:
+    - flight_id (int): 航班 ID。
+    - fare_conditions (Optional[str]): 舱位（如 Economy、Comfort、Business），不传时返回全部舱位。
 
-    query += " LIMIT ?"
-    params.append(limit)
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    column_names = [column[0] for column in cursor.description]
-    results = [dict(zip(column_names, row)) for row in rows]
+    返回:
+        包含 flight_id、cabins（每个舱位的 fare_conditions、seats、booked、checked_in 和 available）
+        以及 available（所返回舱位的余座合计）的字典；航班不存在时 cabins 为空列表。
+    """
+    # 不经过结果缓存：每次都是对 flight_occupancy 的主键查找，并且总能看到最新的改签和退票
+    with get_read_connection() as conn:
+        cabins = flight_availability(conn, flight_id, fare_conditions)
+    return {
+        "flight_id": flight_id,
+        "cabins": cabins,
+        "available": sum(cabin["available"] for cabin in cabins),
+    }
 
-    cursor.close()
-    conn.close()
 
-    return results
+@async_variant
+@tool
+def search_flight_routes(
+        departure_airport: str,
+        arrival_airport: str,
+        start_time: Optional[date | datetime] = None,
+        max_legs: int = 3,
+        min_connection_minutes: int = 45,
+        limit: int = 5,
+) -> List[Dict]:
+    """
+    搜索从出发机场到到达机场的航线，包括需要中转的多段航线，按到达时间从早到晚返回。
+    当 search_flights 找不到直飞航班时，使用此工具查找中转方案。
 
+    参数:
+    - departure_airport (str): 出发机场。
+    - arrival_airport (str): 到达机场。
+    - start_time (Optional[date | datetime]): 第一段航班的最早起飞时间，默认为当前时间；只搜索此后 24 小时内起飞的航线。
+    - max_legs (int): 最多乘坐的航段数，默认为3。
+    - min_connection_minutes (int): 两段航班之间的最短中转时间（分钟），默认为45。
+    - limit (int): 返回航线的最大数量，默认为5。
 
+    返回:
+        航线列表。每条航线包含 legs（按顺序乘坐的航班）、scheduled_departure、scheduled_arrival、
+        connections（中转次数）和 duration_minutes（总耗时，分钟）。
+    """
+    earliest_departure = to_epoch(start_time) if start_time else time.time()
+    with get_read_connection() as conn:
+        # 只加载上次搜索之后新增的航班，已有航班被修改时才整体重建
+        route_index.refresh(conn)
+    routes = route_index.search(
+        departure_airport,
+        arrival_airport,
+        earliest_departure,
+        max_legs=max_legs,
+        min_connection=min_connection_minutes * 60,
+        top_k=limit,
+    )
+    return [
+        {
+            "legs": [leg.as_dict() for leg in legs],
+            "scheduled_departure": legs[0].scheduled_departure,
+            "scheduled_arrival": legs[-1].scheduled_arrival,
+            "connections": len(legs) - 1,
+            "duration_minutes": round((legs[-1].arrival_epoch - legs[0].departure_epoch) / 60),
+        }
+        for legs in routes
+    ]
+
+
+@async_variant
 @tool
 def update_ticket_to_new_flight(
         ticket_no: str, new_flight_id: int, *, config: RunnableConfig
@@ -116,7 +310,8 @@ def update_ticket_to_new_flight(
     3、时间验证：确保新选择的航班起飞时间与当前时间相差不少于3小时。
     4、确认原机票存在性：验证提供的机票号是否存在于系统中。
     5、验证乘客身份：确保请求修改机票的乘客是该机票的实际拥有者。
-    6、更新机票信息：如果所有检查都通过，则更新机票对应的新航班ID，并提交更改。
+    6、冲突检查：乘客已持有新航班的机票，或者新航班上机票所在的舱位已满时，不允许改签。
+    7、更新机票信息：如果所有检查都通过，则更新机票对应的新航班ID，并提交更改。
 
     参数:
     - ticket_no (str): 要更新的机票编号。
@@ -131,65 +326,11 @@ def update_ticket_to_new_flight(
     if not passenger_id:
         raise ValueError("未配置乘客 ID。")
 
-    conn = connect(db)
-    cursor = conn.cursor()
-
-    # 查询新航班的信息
-    cursor.execute(
-        "SELECT departure_airport, arrival_airport, scheduled_departure FROM flights WHERE flight_id = ?",
-        (new_flight_id,),
-    )
-    new_flight = cursor.fetchone()
-    if not new_flight:
-        cursor.close()
-        conn.close()
-        return "提供的新的航班 ID 无效。"
-    column_names = [column[0] for column in cursor.description]
-    new_flight_dict = dict(zip(column_names, new_flight))
-
-    # 设置时区并计算当前时间和新航班起飞时间之间的差值
-    timezone = pytz.timezone("Etc/GMT-3")
-    current_time = datetime.now(tz=timezone)
-    departure_time = datetime.strptime(
-        new_flight_dict["scheduled_departure"], "%Y-%m-%d %H:%M:%S.%f%z"
-    )
-    time_until = (departure_time - current_time).total_seconds()
-    if time_until < (3 * 3600):
-        return f"不允许重新安排到距离当前时间少于 3 小时的航班。所选航班时间为 {departure_time}。"
-
-    # 确认原机票的存在性
-    cursor.execute(
-        "SELECT flight_id FROM ticket_flights WHERE ticket_no = ?", (ticket_no,)
-    )
-    current_flight = cursor.fetchone()
-    if not current_flight:
-        cursor.close()
-        conn.close()
-        return "未找到给定机票号码的现有机票。"
-
-    # 确认已登录用户确实拥有此机票
-    cursor.execute(
-        "SELECT * FROM tickets WHERE ticket_no = ? AND passenger_id = ?",
-        (ticket_no, passenger_id),
-    )
-    current_ticket = cursor.fetchone()
-    if not current_ticket:
-        cursor.close()
-        conn.close()
-        return f"当前登录的乘客 ID 为 {passenger_id}，不是机票 {ticket_no} 的拥有者。"
-
-    # 更新机票对应的航班ID
-    cursor.execute(
-        "UPDATE ticket_flights SET flight_id = ? WHERE ticket_no = ?",
-        (new_flight_id, ticket_no),
-    )
-    conn.commit()
-
-    cursor.close()
-    conn.close()
-    return "机票已成功更新为新的航班。"
+    # 检查与改签在同一个写事务中完成，见 tools.booking
+    return booking.rebook_ticket(passenger_id, ticket_no, new_flight_id).message
 
 
+@async_variant
 @tool
 def cancel_ticket(ticket_no: str, *, config: RunnableConfig) -> str:
     """
@@ -211,34 +352,4 @@ def cancel_ticket(ticket_no: str, *, config: RunnableConfig) -> str:
     if not passenger_id:
         raise ValueError("未配置乘客 ID。")
 
-    conn = connect(db)
-    cursor = conn.cursor()
-
-    # 查询给定机票号是否存在
-    cursor.execute(
-        "SELECT flight_id FROM ticket_flights WHERE ticket_no = ?", (ticket_no,)
-    )
-    existing_ticket = cursor.fetchone()
-    if not existing_ticket:
-        cursor.close()
-        conn.close()
-        return "未找到给定机票号码的现有机票。"
-
-    # 确认已登录用户确实拥有此机票
-    cursor.execute(
-        "SELECT flight_id FROM tickets WHERE ticket_no = ? AND passenger_id = ?",
-        (ticket_no, passenger_id),
-    )
-    current_ticket = cursor.fetchone()
-    if not current_ticket:
-        cursor.close()
-        conn.close()
-        return f"当前登录的乘客 ID 为 {passenger_id}，不是机票 {ticket_no} 的拥有者。"
-
-    # 删除机票对应的记录
-    cursor.execute("DELETE FROM ticket_flights WHERE ticket_no = ?", (ticket_no,))
-    conn.commit()
-
-    cursor.close()
-    conn.close()
-    return "机票已成功取消。"
+    return booking.cancel_ticket(passenger_id, ticket_no).message
@@ -0,0 +1,228 @@
+"""
+城市/机场地名表（gazetteer）。
+
+地名数据保存在 tools/gazetteer.json 中：每个地点有数据库使用的英文名、中文名、拼音、其他别名和
+IATA 机场代码。所有名称规范化（去掉声调/重音、空格和标点，统一小写）后插入一棵前缀树，
+首次使用时构建一次。精确匹配和前缀匹配只需沿树走一遍查询串，代价为 O(len(name))；
+拼写错误通过在树上做有界编辑距离搜索来容忍。
+"""
+import json
+import os
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+GAZETTEER_FILE = Path(__file__).with_name("gazetteer.json")
+
+# 匹配失败时去掉这些后缀再试一次，例如“巴塞尔市”、“Zurich Airport”
+_SUFFIXES = ("国际机场", "机场", "市", "airport", "city")
+
+# 前缀匹配的最短长度：中文两个字已经很有区分度，拉丁字母至少三个
+_MIN_PREFIX = {True: 2, False: 3}
+
+
+@dataclass(frozen=True)
+class Place:
+    """地名表中的一个城市。"""
+
+    name: str
+    country: str
+    airports: tuple[str, ...]
+    aliases: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Match:
+    """
+    一次地名匹配的结果。
+
+    kind 为 exact（名称或别名完全相同）、iata（机场代码）、prefix（唯一的前缀）或
+    fuzzy（编辑距离最小且唯一）；distance 为模糊匹配的编辑距离，其余情况为 0。
+    """
+
+    place: Place
+    kind: str
+    distance: int = 0
+
+
+def normalize(name: str) -> str:
+    """
+    规范化地名：去掉重音和声调符号，统一小写，只保留字母、数字和汉字。
+
+    例如 "Zürich"、"Xi'an"、"New York" 分别得到 "zurich"、"xian"、"newyork"。
+    """
+    decomposed = unicodedata.normalize("NFKD", name.strip())
+    return "".join(char for char in decomposed.casefold() if char.isalnum())
+
+
+def _is_cjk(key: str) -> bool:
+    return any("\u4e00" <= char <= "\u9fff" for char in key)
+
+
+class _Node:
+    __slots__ = ("children", "places", "terminal")
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        # 子树中所有名称对应的地点，用于判断前缀是否唯一
+        self.places: set[int] = set()
+        # 恰好在此结束的名称对应的地点
+        self.terminal: set[int] = set()
+
+
+class Gazetteer:
+    """
+    地名前缀树，构建后只读，可在线程间共享。
+
+    参数:
+        places (Iterable[dict]): gazetteer.json 中 places 的条目。
+    """
+
+    def __init__(self, places: Iterable[dict]):
+        self.places: list[Place] = []
+        self._root = _Node()
+        self._airports: dict[str, int] = {}
+        for entry in places:
+            index = len(self.places)
+            airports = tuple(code.upper() for code in entry.get("airports", ()))
+            names = [entry["name"], *entry.get("zh", ()), *entry.get("pinyin", ())]
+            names += entry.get("aliases", ())
+            place = Place(entry["name"], entry.get("country", ""), airports, tuple(names[1:]))
+            self.places.append(place)
+            for name in names:
+                self._insert(normalize(name), index)
+            for code in airports:
+                if code in self._airports:
+                    raise ValueError(f"机场代码 {code} 在地名表中重复出现。")
+                self._airports[code] = index
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def _insert(self, key: str, index: int) -> None:
+        if not key:
+            return
+        node = self._root
+        node.places.add(index)
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+            node.places.add(index)
+        node.terminal.add(index)
+
+    def _walk(self, key: str) -> Optional[_Node]:
+        node = self._root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def _unique(self, indexes: set[int]) -> Optional[Place]:
+        return self.places[next(iter(indexes))] if len(indexes) == 1 else None
+
+    def airport(self, code: str) -> Optional[Place]:
+        """返回 IATA 机场代码所在的城市。"""
+        index = self._airports.get(code.strip().upper())
+        return None if index is None else self.places[index]
+
+    def _exact(self, key: str) -> Optional[Place]:
+        node = self._walk(key)
+        return self._unique(node.terminal) if node else None
+
+    def _fuzzy(self, key: str) -> Optional[Match]:
+        # 短名称的一个字符差异往往就是另一个城市，只对较长的名称做模糊匹配
+        max_distance = 2 if len(key) >= 8 else 1 if len(key) >= 4 else 0
+        start = self._root.children.get(key[0])
+        if not max_distance or _is_cjk(key) or start is None:
+            return None
+        best: dict[int, int] = {}
+
+        def visit(node: _Node, char: str, previous: list, previous_char: str, before: list) -> None:
+            # 每下降一层计算一行 Damerau-Levenshtein 编辑距离，整行都超过上限时剪掉该子树
+            row = [previous[0] + 1]
+            for column in range(1, len(key) + 1):
+                cost = 0 if key[column - 1] == char else 1
+                distance = min(row[-1] + 1, previous[column] + 1, previous[column - 1] + cost)
+                # 相邻两个字母交换位置只算一次编辑
+                if column > 1 and key[column - 1] == previous_char and key[column - 2] == char:
+                    distance = min(distance, before[column - 2] + 1)
+                row.append(distance)
+            if row[-1] <= max_distance:
+                for index in node.terminal:
+                    best[index] = min(best.get(index, row[-1]), row[-1])
+            if min(row) <= max_distance:
+                for next_char, child in node.children.items():
+                    visit(child, next_char, row, char, previous)
+
+        # 假定首字母没有拼错，只在首字母的子树中搜索
+        visit(start, key[0], list(range(len(key) + 1)), "", [])
+        if not best:
+            return None
+        distance = min(best.values())
+        place = self._unique({index for index, value in best.items() if value == distance})
+        return Match(place, "fuzzy", distance) if place else None
+
+    def lookup(self, query: str) -> Optional[Match]:
+        """
+        查找地名，依次尝试：完全匹配、IATA 机场代码、去掉“市/机场”等后缀后完全匹配、唯一前缀、
+        模糊匹配。多个地点同样匹配时视为无法确定，返回 None。
+
+        参数:
+            query (str): 中文名、英文名、拼音、别名或 IATA 机场代码。
+
+        返回:
+            Optional[Match]: 匹配结果；找不到或有歧义时为 None。
+        """
+        key = normalize(query)
+        if not key:
+            return None
+        place = self._exact(key)
+        if place:
+            return Match(place, "exact")
+        if len(key) == 3 and key.isascii():
+            place = self.airport(key)
+            if place:
+                return Match(place, "iata")
+        for suffix in _SUFFIXES:
+            if key.endswith(suffix) and len(key) > len(suffix):
+                place = self._exact(key[: -len(suffix)])
+                if place:
+                    return Match(place, "exact")
+        if len(key) >= _MIN_PREFIX[_is_cjk(key)]:
+            node = self._walk(key)
+            place = self._unique(node.places) if node else None
+            if place:
+                return Match(place, "prefix")
+        return self._fuzzy(key)
+
+    def resolve(self, query: str) -> Optional[Place]:
+        """返回 lookup 匹配到的地点，找不到时为 None。"""
+        match = self.lookup(query)
+        return match.place if match else None
+
+    def complete(self, prefix: str, limit: int = 10) -> list[Place]:
+        """
+        返回名称或别名以 prefix 开头的地点，按英文名排序。
+
+        参数:
+            prefix (str): 名称前缀。
+            limit (int): 最多返回的数量，默认为10。
+        """
+        node = self._walk(normalize(prefix))
+        if node is None:
+            return []
+        return sorted((self.places[index] for index in node.places), key=lambda p: p.name)[:limit]
+
+
+def load_gazetteer(path: Union[str, Path] = GAZETTEER_FILE) -> Gazetteer:
+    """从 JSON 文件构建地名表。"""
+    with open(path, encoding="utf-8") as file:
+        return Gazetteer(json.load(file)["places"])
+
+
+@lru_cache(maxsize=1)
+def default_gazetteer() -> Gazetteer:
+    """进程内共享的地名表，首次调用时加载 TRAVEL_GAZETTEER_FILE（默认为 tools/gazetteer.json）。"""
+    return load_gazetteer(os.getenv("TRAVEL_GAZETTEER_FILE", str(GAZETTEER_FILE)))
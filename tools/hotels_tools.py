@@ -1,35 +1,58 @@
-from sqlite3 import connect, Cursor
 from datetime import date, datetime
-from typing import Optional, Union
+from typing import List, Optional, Union
 
 from langchain_core.tools import tool
 
-from tools import db
+from tools import booking, get_read_connection
+from tools.airports import arrival_city_condition, resolve_location
+from tools.async_tools import async_variant
+from tools.backend import replica_backend, search_catalog
+from tools.cache import cached_tool
+from tools.catalog_search import catalog_page
+from tools.inventory import date_filter
 from tools.location_trans import transform_location
+from tools.text_search import fts_search_query
 
+@async_variant
 @tool
+@cached_tool("hotels", fold_case=True, uncached=("arrival_flight_id",))
 def search_hotels(
         location: Optional[str] = None,
-        name: Optional[str] = None
+        name: Optional[str] = None,
         # price_tier: Optional[str] = None,
-        # checkin_date: Optional[Union[datetime, date]] = None,
-        # checkout_date: Optional[Union[datetime, date]] = None,
-) -> list[dict]:
+        checkin_date: Optional[Union[datetime, date]] = None,
+        checkout_date: Optional[Union[datetime, date]] = None,
+        limit: int = 20,
+        sort_by: Optional[str] = None,
+        arrival_flight_id: Optional[int] = None,
+) -> dict:
     """
     根据位置、名称、价格层级、入住日期和退房日期搜索酒店。
 
     参数:
-        location (Optional[str]): 酒店的位置。默认为None。
+        location (Optional[str]): 酒店的位置，可以是城市名或机场代码（如 BSL）。默认为None。
         name (Optional[str]): 酒店的名称。默认为None。
+        checkin_date (Optional[Union[datetime, date]]): 入住日期，给出时只返回这段日期内还有空房的酒店。默认为None。
+        checkout_date (Optional[Union[datetime, date]]): 退房日期。默认为None。
+        limit (int): 最多返回的酒店数量，默认为20。
+        sort_by (Optional[str]): 排序字段，可选 name、location、price_tier，前缀 - 表示倒序。默认按相关度排序。
+        arrival_flight_id (Optional[int]): 只返回该航班到达城市的酒店。默认为None。
 
     返回:
-        list[dict]: 包含匹配搜索条件的酒店信息的字典列表。
+        dict: results 为匹配的酒店列表；truncated 为 True 时表示还有更多结果，
+        summary 中给出匹配总数和按价格层级的分布，可据此收窄搜索条件。
     """
+    backend = replica_backend()
+    if backend is not None:
+        # 服务端副本上没有全文索引和按日期的库存，给出日期时只返回未被预订的酒店
+        return search_catalog(
+            backend, "hotels", limit, sort_by,
+            location=transform_location(location), name=name,
+            available_only=bool(checkin_date or checkout_date), arrival_flight_id=arrival_flight_id,
+        )
 
-    conn = connect(db)
-    cursor = conn.cursor()
-    location = transform_location(location)
-    query = "SELECT * FROM hotels WHERE 1=1"
+    location = resolve_location(location)
+    query = "SELECT * FROM hotels t WHERE 1=1"
     params = []
 
     if location:
@@ -38,44 +61,56 @@ def search_hotels(
     if name:
         query += " AND name LIKE ?"
         params.append(f"%{name}%")
-    # 为了本教程的目的，我们不对日期和价格层级进行严格匹配
-
-    print('查询酒店的SQL：' + query, '参数: ', params)
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-    print('查询酒店的结果: ', results)
-    conn.close()
-
-    return [
-        dict(zip([column[0] for column in cursor.description], row)) for row in results
-    ]
+    # 价格层级不做严格匹配；给出日期时只返回这段日期内还有空余的记录
+
+    with get_read_connection() as conn:
+        # 按日期的空余容量过滤，走 reservations 的 R*Tree 索引
+        conditions = []
+        availability = date_filter(conn, "hotels", "t", checkin_date, checkout_date)
+        if availability:
+            conditions.append(availability)
+            query += f" AND {availability[0]}"
+            params.extend(availability[1])
+        # 与航班的到达机场按城市连接，不需要先查出航班再换算城市
+        if arrival_flight_id is not None:
+            arrival = arrival_city_condition(conn, "t", arrival_flight_id)
+            conditions.append(arrival)
+            query += f" AND {arrival[0]}"
+            params.extend(arrival[1])
+        # 优先走全文索引（按相关度排序），没有建 FTS5 影子表时回退到 LIKE 查询
+        fts_query = fts_search_query(
+            conn, "hotels", {"location": location, "name": name}, conditions=conditions
+        )
+        if fts_query:
+            query, params = fts_query
+        page = catalog_page(conn, "hotels", query, params, limit, sort_by)
+    return page
 
 
+@async_variant
 @tool
-def book_hotel(hotel_id: int) -> str:
+def book_hotel(
+        hotel_id: int,
+        checkin_date: Optional[Union[datetime, date]] = None,
+        checkout_date: Optional[Union[datetime, date]] = None,
+) -> str:
     """
     通过ID预订酒店。
 
     参数:
         hotel_id (int): 要预订的酒店的ID。
+        checkin_date (Optional[Union[datetime, date]]): 入住日期，与退房日期一起给出时按日期预订一间房。默认为None。
+        checkout_date (Optional[Union[datetime, date]]): 退房日期。默认为None。
 
     返回:
         str: 表明酒店是否成功预订的消息。
     """
-    conn = connect(db)
-    cursor = conn.cursor()
-
-    cursor.execute("UPDATE hotels SET booked = 1 WHERE id = ?", (hotel_id,))
-    conn.commit()
-
-    if cursor.rowcount > 0:
-        conn.close()
-        return f"Hotel {hotel_id} 成功预定。"
-    else:
-        conn.close()
-        return f"未找到ID为 {hotel_id} 的酒店。"
+    if checkin_date or checkout_date:
+        return booking.reserve_item("hotels", hotel_id, checkin_date, checkout_date).message
+    return booking.book_item("hotels", hotel_id).message
 
 
+@async_variant
 @tool
 def update_hotel(
         hotel_id: int,
@@ -93,49 +128,73 @@ def update_hotel(
     返回:
         str: 表明酒店预订是否成功更新的消息。
     """
-    conn = connect(db)
-    cursor = conn.cursor()
-
-    if checkin_date:
-        cursor.execute(
-            "UPDATE hotels SET checkin_date = ? WHERE id = ?", (checkin_date, hotel_id)
-        )
-    if checkout_date:
-        cursor.execute(
-            "UPDATE hotels SET checkout_date = ? WHERE id = ?", (checkout_date, hotel_id)
-        )
-
-    conn.commit()
-
-    if cursor.rowcount > 0:
-        conn.close()
-        return f"Hotel {hotel_id} 成功更新。"
-    else:
-        conn.close()
-        return f"未找到ID为 {hotel_id} 的酒店。"
+    return booking.update_item(
+        "hotels", hotel_id, checkin_date=checkin_date, checkout_date=checkout_date
+    ).message
 
 
+@async_variant
 @tool
-def cancel_hotel(hotel_id: int) -> str:
+def cancel_hotel(
+        hotel_id: int,
+        checkin_date: Optional[Union[datetime, date]] = None,
+        checkout_date: Optional[Union[datetime, date]] = None,
+) -> str:
     """
     根据ID取消酒店预订。
 
     参数:
         hotel_id (int): 要取消的酒店预订的ID。
+        checkin_date (Optional[Union[datetime, date]]): 入住日期，与退房日期一起给出时只取消这段日期的预订。默认为None。
+        checkout_date (Optional[Union[datetime, date]]): 退房日期。默认为None。
 
     返回:
         str: 表明酒店预订是否成功取消的消息。
     """
-    conn = connect(db)
-    cursor = conn.cursor()
-
-    # 将booked字段设置为0来表示取消预订
-    cursor.execute("UPDATE hotels SET booked = 0 WHERE id = ?", (hotel_id,))
-    conn.commit()
-
-    if cursor.rowcount > 0:
-        conn.close()
-        return f"Hotel {hotel_id} 成功取消。"
-    else:
-        conn.close()
-        return f"未找到ID为 {hotel_id} 的酒店。"
+    if checkin_date or checkout_date:
+        return booking.cancel_reservation("hotels", hotel_id, checkin_date, checkout_date).message
+    return booking.cancel_item("hotels", hotel_id).message
+
+
+@async_variant
+@tool
+def book_hotels(
+        hotel_ids: List[int],
+        checkin_date: Optional[Union[datetime, date]] = None,
+        checkout_date: Optional[Union[datetime, date]] = None,
+        all_or_nothing: bool = False,
+) -> List[dict]:
+    """
+    在一次确认中预订多个酒店，全部预订在同一个事务中完成。
+
+    参数:
+        hotel_ids (List[int]): 要预订的酒店的ID列表。
+        checkin_date (Optional[Union[datetime, date]]): 入住日期，与退房日期一起给出时每项按日期预订一间房。默认为None。
+        checkout_date (Optional[Union[datetime, date]]): 退房日期。默认为None。
+        all_or_nothing (bool): 为 True 时任意一项失败则全部不预订。默认为False。
+
+    返回:
+        List[dict]: 每家酒店的 {"id", "status", "message"}，status 为 ok、conflict、not_found 或 rolled_back。
+    """
+    return booking.apply_to_items("book", "hotels", hotel_ids, checkin_date, checkout_date, all_or_nothing)
+
+
+@async_variant
+@tool
+def cancel_hotels(
+        hotel_ids: List[int],
+        checkin_date: Optional[Union[datetime, date]] = None,
+        checkout_date: Optional[Union[datetime, date]] = None,
+) -> List[dict]:
+    """
+    在一次确认中取消多个酒店的预订，全部取消在同一个事务中完成。
+
+    参数:
+        hotel_ids (List[int]): 要取消的酒店的ID列表。
+        checkin_date (Optional[Union[datetime, date]]): 入住日期，与退房日期一起给出时只取消这段日期的预订。默认为None。
+        checkout_date (Optional[Union[datetime, date]]): 退房日期。默认为None。
+
+    返回:
+        List[dict]: 每家酒店的 {"id", "status", "message"}，status 为 ok 或 not_found。
+    """
+    return booking.apply_to_items("cancel", "hotels", hotel_ids, checkin_date, checkout_date)
@@ -1,26 +1,65 @@
 import os
 import shutil
 import sqlite3
-import pandas as pd
+import threading
+from contextlib import closing
+from datetime import date, datetime, timezone
+from typing import Optional
 
-from tools import backup_file, local_file
+from tools import backup_file, close_all_pools, local_file, notify_database_reset
+from tools.provision import provision_travel_db
+from tools.timestamps import EPOCH_COLUMNS, NULL_TIMESTAMP, register_timestamp_functions
 
+# 需要与当前时间对齐的时间列：表名 -> 列
+REBASED_COLUMNS = {
+    "bookings": ("book_date",),
+    "flights": ("scheduled_departure", "scheduled_arrival", "actual_departure", "actual_arrival"),
+}
 
-def update_dates():
+
+def rebase_dates(conn: sqlite3.Connection, now: Optional[datetime] = None) -> float:
     """
-    更新数据库中的日期，使其与当前时间对齐。
+    原地把数据库中的日期平移到当前时间附近。
+
+    用一条聚合查询求出 flights.actual_departure 的最大值与当前时间的差，再对每张表执行一条
+    UPDATE，所有修改在同一个事务中提交。表结构、索引和触发器保持不变，内存占用与表大小无关。
+    已有的 UTC 时间戳列（见 tools.timestamps.EPOCH_COLUMNS）在同一条 UPDATE 中一起更新。
 
     参数:
-        file (str): 要更新的数据库文件路径。
+        conn (sqlite3.Connection): 旅行数据库连接。
+        now (Optional[datetime]): 对齐的目标时间，默认为当前时间。
 
     返回:
-        str: 更新后的数据库文件路径。
+        float: 平移的秒数；没有已起飞的航班时不做修改，返回 0。
     """
-    # 使用备份文件覆盖现有文件，作为重置步骤
-    shutil.copy(backup_file, local_file)  # 如果目标路径已经存在一个同名文件，shutil.copy 会覆盖该文件。
-
-    conn = sqlite3.connect(local_file)
-    # cursor = conn.cursor()
+    register_timestamp_functions(conn)
+    latest = conn.execute(
+        "SELECT max(timestamp_epoch(actual_departure)) FROM flights WHERE actual_departure != ?",
+        (NULL_TIMESTAMP,),
+    ).fetchone()[0]
+    if latest is None:
+        return 0.0
+    offset = (now or datetime.now(timezone.utc)).timestamp() - latest
+
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    with conn:
+        for table, columns in REBASED_COLUMNS.items():
+            if table not in tables:
+                continue
+            assignments = [f"{column} = shift_timestamp({column}, :offset)" for column in columns]
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column, epoch_column in EPOCH_COLUMNS.get(table, {}).items():
+                if epoch_column in existing:
+                    assignments.append(
+                        f"{epoch_column} = CAST(timestamp_epoch(shift_timestamp({column}, :offset)) AS INTEGER)"
+                    )
+            conn.execute(f"UPDATE {table} SET {', '.join(assignments)}", {"offset": offset})
+    return offset
+
+
+def _rewrite_with_pandas(conn: sqlite3.Connection) -> None:
+    # 旧的实现：整表读入 pandas 后用 to_sql(if_exists="replace") 写回，会丢失索引和触发器
+    import pandas as pd
 
     # 获取所有表名
     tables = pd.read_sql("SELECT name FROM sqlite_master WHERE type='table';", conn).name.tolist()
@@ -41,6 +80,9 @@ def update_dates():
     )
 
     # 需要更新的日期列
+    # 旧的时间戳列不再准确，删除后由 provision_travel_db 重新计算
+    tdf["flights"] = tdf["flights"].drop(columns=list(EPOCH_COLUMNS["flights"].values()), errors="ignore")
+
     datetime_columns = ["scheduled_departure", "scheduled_arrival", "actual_departure", "actual_arrival"]
     for column in datetime_columns:
         tdf["flights"][column] = (
@@ -54,12 +96,104 @@ def update_dates():
     del tdf  # 清理内存
 
     conn.commit()
+
+
+def update_dates(in_place: bool = True):
+    """
+    更新数据库中的日期，使其与当前时间对齐。
+
+    参数:
+        in_place (bool): 为 True 时用 SQL 原地平移日期（见 rebase_dates）；
+            为 False 时使用旧的 pandas 整表重写。
+
+    返回:
+        str: 更新后的数据库文件路径。
+    """
+    # 连接池中的长连接仍指向旧文件内容，覆盖前先全部关闭
+    close_all_pools()
+    # WAL 模式下残留的 -wal/-shm 文件属于旧数据库，不能被应用到新复制的文件上
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(local_file + suffix):
+            os.remove(local_file + suffix)
+    # 使用备份文件覆盖现有文件，作为重置步骤
+    shutil.copy(backup_file, local_file)  # 如果目标路径已经存在一个同名文件，shutil.copy 会覆盖该文件。
+
+    conn = sqlite3.connect(local_file)
+    if in_place:
+        rebase_dates(conn)
+    else:
+        _rewrite_with_pandas(conn)
+    # 创建缺失的索引和全文检索表（pandas 重写会删除原有索引）
+    provision_travel_db(conn)
     conn.close()
+    # 数据已整体替换，清空工具的进程内缓存
+    notify_database_reset()
 
     return local_file
 
 
+# 已经平移到当天的内存快照：(备份文件, 备份文件修改时间, 日期) -> 内存数据库
+_snapshot_lock = threading.RLock()
+_snapshot_key: Optional[tuple[str, float, date]] = None
+_snapshot: Optional[sqlite3.Connection] = None
+
+
+def rebased_snapshot(source: Optional[str] = None, today: Optional[date] = None) -> sqlite3.Connection:
+    """
+    返回备份数据库“已平移到今天”的内存快照。
+
+    同一天内、备份文件未被修改时直接复用已有快照；否则用 backup API 把备份文件读入内存，
+    执行 rebase_dates 和索引准备后缓存起来。调用方只能读取快照，不能修改它。
+
+    参数:
+        source (Optional[str]): 备份数据库路径，默认为 backup_file。
+        today (Optional[date]): 快照对应的日期，默认为今天。
+
+    返回:
+        sqlite3.Connection: 内存快照的连接。
+    """
+    global _snapshot, _snapshot_key
+    source = source or backup_file
+    key = (os.path.abspath(source), os.path.getmtime(source), today or date.today())
+    with _snapshot_lock:
+        if _snapshot is not None and _snapshot_key == key:
+            return _snapshot
+        snapshot = sqlite3.connect(":memory:", check_same_thread=False)
+        with closing(sqlite3.connect(source)) as backup:
+            backup.backup(snapshot)
+        rebase_dates(snapshot)
+        provision_travel_db(snapshot)
+        if _snapshot is not None:
+            _snapshot.close()
+        _snapshot, _snapshot_key = snapshot, key
+        return snapshot
+
+
+def reset_database(target: Optional[str] = None, source: Optional[str] = None) -> str:
+    """
+    把数据库快速重置为“已平移到今天”的备份数据，适合在测试用例和压测迭代之间调用。
+
+    与 update_dates 相比，日期平移每天只做一次（见 rebased_snapshot），每次重置只是用
+    sqlite3.Connection.backup 按页把内存快照复制到目标文件。
+
+    参数:
+        target (Optional[str]): 要重置的数据库文件，默认为 local_file。
+        source (Optional[str]): 备份数据库路径，默认为 backup_file。
+
+    返回:
+        str: 重置后的数据库文件路径。
+    """
+    target = target or local_file
+    # 连接池中的长连接仍指向旧内容，覆盖前先全部关闭
+    close_all_pools()
+    with _snapshot_lock, closing(sqlite3.connect(target)) as conn:
+        rebased_snapshot(source).backup(conn)
+    # 数据已整体替换，清空工具的进程内缓存
+    notify_database_reset()
+    return target
+
+
 if __name__ == '__main__':
 
     # 执行日期更新操作
-    db = update_dates()
\ No newline at end of file
+    db = update_dates()
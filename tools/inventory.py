@@ -0,0 +1,180 @@
+"""
+酒店和租车的按日期库存。
+
+hotels/car_rentals 只有一个全局的 booked 标记，无法回答“某段日期是否还有空余”。
+这里为每条记录增加 capacity（可同时预订的房间/车辆数），每次按日期预订在 reservations 表中记录一个
+[start_day, end_day) 区间（日期的序数，date.toordinal()），并由触发器同步到 R*Tree 索引
+reservations_index。按日期搜索时，每条候选记录只需要在 R*Tree 中取出与请求区间重叠的预订，
+不必扫描该记录的全部历史预订。
+"""
+import sqlite3
+from datetime import date, datetime
+from typing import Optional, Union
+
+# 支持按日期预订的表 -> R*Tree 中的资源类型编号
+RESOURCE_TYPES = {"hotels": 1, "car_rentals": 2}
+
+# 不指定日期的预订（只设置 booked 标记）保存为覆盖全部日期、units 等于 capacity 的一条预订，
+# 按日期搜索和按日期预订都会把这条记录算作没有空余
+UNDATED_WINDOW = (1, date.max.toordinal() + 1)
+
+RESERVATIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reservations (
+    id INTEGER PRIMARY KEY,
+    resource_type INTEGER NOT NULL,
+    resource_id INTEGER NOT NULL,
+    start_day INTEGER NOT NULL,
+    end_day INTEGER NOT NULL,
+    units INTEGER NOT NULL DEFAULT 1,
+    CHECK (end_day > start_day AND units > 0)
+)
+"""
+
+# R*Tree 的区间是闭区间，预订的最后一天为 end_day - 1；units 作为辅助列保存，汇总占用时不必回表
+RESERVATIONS_INDEX_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS reservations_index USING rtree_i32(
+    id, type_min, type_max, resource_min, resource_max, day_min, day_max, +units
+)
+"""
+
+_INDEX_ROW = (
+    "INSERT INTO reservations_index VALUES (new.id, new.resource_type, new.resource_type, "
+    "new.resource_id, new.resource_id, new.start_day, new.end_day - 1, new.units);"
+)
+
+RESERVATION_TRIGGERS = {
+    "reservations_index_ai": f"AFTER INSERT ON reservations BEGIN {_INDEX_ROW} END",
+    "reservations_index_ad": "AFTER DELETE ON reservations BEGIN "
+                             "DELETE FROM reservations_index WHERE id = old.id; END",
+    "reservations_index_au": "AFTER UPDATE ON reservations BEGIN "
+                             f"DELETE FROM reservations_index WHERE id = old.id; {_INDEX_ROW} END",
+}
+
+
+def to_day(value: Union[datetime, date, str]) -> int:
+    """
+    把日期转换为 reservations 使用的日序数。
+
+    参数:
+        value (Union[datetime, date, str]): 日期、时间或 ISO 格式的日期文本。
+
+    返回:
+        int: date.toordinal() 的值。
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal()
+
+
+def stay_days(
+        start: Union[datetime, date, str], end: Union[datetime, date, str]
+) -> tuple[int, int]:
+    """
+    把入住/退房（取车/还车）日期转换为半开区间 [start_day, end_day)。
+
+    返回:
+        tuple[int, int]: (start_day, end_day)。
+    """
+    start_day, end_day = to_day(start), to_day(end)
+    if end_day <= start_day:
+        raise ValueError("结束日期必须晚于开始日期。")
+    return start_day, end_day
+
+
+def inventory_available(conn: sqlite3.Connection) -> bool:
+    """判断数据库是否已经建好 reservations 表和 R*Tree 索引（见 tools.provision.ensure_inventory）。"""
+    rows = conn.execute(
+        "SELECT count(*) FROM sqlite_master WHERE name IN ('reservations', 'reservations_index')"
+    ).fetchone()
+    return rows[0] == 2
+
+
+def peak_load_query(resource: str) -> str:
+    """
+    返回计算某条记录在 [start_day, end_day) 内最大同时占用量的标量子查询。
+
+    最大占用一定出现在某个重叠预订开始的那一天（或请求区间的第一天），因此外层在 R*Tree 中
+    取出重叠的预订，内层只在这些时间点上汇总占用量。参数依次为 peak_load_params 的返回值。
+
+    参数:
+        resource (str): 记录 ID 的 SQL 表达式，例如 "t.id"。
+
+    返回:
+        str: 没有重叠预订时结果为 NULL 的标量子查询。
+    """
+    return f"""(
+        SELECT max((
+            SELECT sum(y.units) FROM reservations_index y
+            WHERE y.type_min <= x.type_min AND y.type_max >= x.type_min
+              AND y.resource_min <= x.resource_min AND y.resource_max >= x.resource_min
+              AND y.day_min <= max(x.day_min, ?) AND y.day_max >= max(x.day_min, ?)
+        ))
+        FROM reservations_index x
+        WHERE x.type_min <= ? AND x.type_max >= ?
+          AND x.resource_min <= {resource} AND x.resource_max >= {resource}
+          AND x.day_min <= ? AND x.day_max >= ?
+    )"""
+
+
+def peak_load_params(table: str, start_day: int, end_day: int) -> list:
+    """返回 peak_load_query 的参数。"""
+    resource_type = RESOURCE_TYPES[table]
+    return [start_day, start_day, resource_type, resource_type, end_day - 1, start_day]
+
+
+def availability_condition(
+        table: str, alias: str, start_day: int, end_day: int
+) -> tuple[str, list]:
+    """
+    生成“在 [start_day, end_day) 内还有空余容量”的 WHERE 条件。
+
+    参数:
+        table (str): RESOURCE_TYPES 中的表名。
+        alias (str): 查询中该表的别名。
+        start_day (int): 开始日序数（含）。
+        end_day (int): 结束日序数（不含）。
+
+    返回:
+        tuple[str, list]: (条件 SQL, 参数)。
+    """
+    condition = f"{alias}.capacity > coalesce({peak_load_query(f'{alias}.id')}, 0)"
+    return condition, peak_load_params(table, start_day, end_day)
+
+
+def date_filter(
+        conn: sqlite3.Connection,
+        table: str,
+        alias: str,
+        start: Optional[Union[datetime, date, str]],
+        end: Optional[Union[datetime, date, str]],
+) -> Optional[tuple[str, list]]:
+    """
+    为 search_hotels/search_car_rentals 生成按日期过滤的条件。
+
+    只给出一个日期时按一天计算。数据库还没有 reservations 表时退回到 booked 标记。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+        table (str): RESOURCE_TYPES 中的表名。
+        alias (str): 查询中该表的别名。
+        start (Optional[Union[datetime, date, str]]): 入住/取车日期。
+        end (Optional[Union[datetime, date, str]]): 退房/还车日期。
+
+    返回:
+        Optional[tuple[str, list]]: (条件 SQL, 参数)；没有给出日期时返回 None。
+    """
+    if not start and not end:
+        return None
+    if start and end:
+        start_day, end_day = stay_days(start, end)
+    elif start:
+        start_day = to_day(start)
+        end_day = start_day + 1
+    else:
+        end_day = to_day(end)
+        start_day = end_day - 1
+    if not inventory_available(conn):
+        return f"{alias}.booked = 0", []
+    return availability_condition(table, alias, start_day, end_day)
@@ -0,0 +1,195 @@
+"""
+物化的乘客行程表 passenger_itineraries。
+
+fetch_user_flight_information 每一轮对话都要读取乘客行程，原先每次都执行 tickets、ticket_flights、
+flights、boarding_passes 的四表连接。这里把连接结果保存为一张按 passenger_id 建索引的表，
+由四张源表上的触发器维护：源表的一行变化时，只重算受影响的机票（或航班）对应的行，
+读取行程只需一次索引查找。
+
+check_itineraries 比较物化表与实时连接的结果，rebuild_itineraries 从源表整体重建。
+
+用法:
+    python -m tools.itineraries [--repair] [--db 数据库路径]
+"""
+import argparse
+import sqlite3
+from typing import Optional
+
+# 行程的列，与 fetch_user_flight_information 返回的字段一致（另加 passenger_id）
+ITINERARY_COLUMNS = (
+    "passenger_id", "ticket_no", "book_ref", "flight_id", "flight_no", "departure_airport",
+    "arrival_airport", "scheduled_departure", "scheduled_arrival", "seat_no", "fare_conditions",
+)
+
+# 被物化的四表连接，调用方在后面追加 WHERE 条件
+ITINERARY_JOIN = """
+    SELECT
+        t.passenger_id, t.ticket_no, t.book_ref,
+        f.flight_id, f.flight_no, f.departure_airport, f.arrival_airport,
+        f.scheduled_departure, f.scheduled_arrival,
+        bp.seat_no, tf.fare_conditions
+    FROM
+        tickets t
+        JOIN ticket_flights tf ON t.ticket_no = tf.ticket_no
+        JOIN flights f ON tf.flight_id = f.flight_id
+        JOIN boarding_passes bp ON bp.ticket_no = t.ticket_no AND bp.flight_id = f.flight_id
+"""
+
+# fetch_user_flight_information 读取物化行程的查询
+ITINERARY_QUERY = (
+    f"SELECT {', '.join(ITINERARY_COLUMNS[1:])} FROM passenger_itineraries WHERE passenger_id = ?"
+)
+
+ITINERARIES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS passenger_itineraries (
+    passenger_id TEXT,
+    ticket_no TEXT,
+    book_ref TEXT,
+    flight_id INTEGER,
+    flight_no TEXT,
+    departure_airport TEXT,
+    arrival_airport TEXT,
+    scheduled_departure TIMESTAMP,
+    scheduled_arrival TIMESTAMP,
+    seat_no TEXT,
+    fare_conditions TEXT
+)
+"""
+
+# 源表 -> 物化行程依赖的列
+SOURCE_TABLES = {
+    "tickets": ("ticket_no", "book_ref", "passenger_id"),
+    "ticket_flights": ("ticket_no", "flight_id", "fare_conditions"),
+    "flights": (
+        "flight_id", "flight_no", "departure_airport", "arrival_airport",
+        "scheduled_departure", "scheduled_arrival",
+    ),
+    "boarding_passes": ("ticket_no", "flight_id", "seat_no"),
+}
+
+_INSERT = f"INSERT INTO passenger_itineraries ({', '.join(ITINERARY_COLUMNS)}) {ITINERARY_JOIN}"
+
+
+def _refresh_ticket(ref: str) -> str:
+    # 重算一张机票的全部行程行；ref 为 old 或 new
+    return (
+        f"DELETE FROM passenger_itineraries WHERE ticket_no = {ref}.ticket_no; "
+        f"{_INSERT} WHERE t.ticket_no = {ref}.ticket_no;"
+    )
+
+
+def _refresh_flight(ref: str) -> str:
+    return (
+        f"DELETE FROM passenger_itineraries WHERE flight_id = {ref}.flight_id; "
+        f"{_INSERT} WHERE f.flight_id = {ref}.flight_id;"
+    )
+
+
+def _ticket_triggers(table: str) -> dict[str, str]:
+    columns = ", ".join(SOURCE_TABLES[table])
+    return {
+        f"{table}_itinerary_ai": f"AFTER INSERT ON {table} BEGIN {_refresh_ticket('new')} END",
+        f"{table}_itinerary_ad": f"AFTER DELETE ON {table} BEGIN {_refresh_ticket('old')} END",
+        f"{table}_itinerary_au": (
+            f"AFTER UPDATE OF {columns} ON {table} "
+            f"BEGIN {_refresh_ticket('old')} {_refresh_ticket('new')} END"
+        ),
+    }
+
+
+_FLIGHT_COLUMNS = SOURCE_TABLES["flights"][1:]
+
+ITINERARY_TRIGGERS = {
+    **_ticket_triggers("tickets"),
+    **_ticket_triggers("ticket_flights"),
+    **_ticket_triggers("boarding_passes"),
+    "flights_itinerary_ai": f"AFTER INSERT ON flights BEGIN {_refresh_flight('new')} END",
+    "flights_itinerary_ad": f"AFTER DELETE ON flights BEGIN {_refresh_flight('old')} END",
+    # update_dates 平移时间时每个航班触发一次，只需原地改写该航班的行
+    "flights_itinerary_au": (
+        f"AFTER UPDATE OF {', '.join(SOURCE_TABLES['flights'])} ON flights "
+        f"WHEN old.flight_id IS new.flight_id BEGIN "
+        f"UPDATE passenger_itineraries SET "
+        f"{', '.join(f'{column} = new.{column}' for column in _FLIGHT_COLUMNS)} "
+        f"WHERE flight_id = old.flight_id; END"
+    ),
+    "flights_itinerary_au_id": (
+        f"AFTER UPDATE OF flight_id ON flights WHEN old.flight_id IS NOT new.flight_id "
+        f"BEGIN {_refresh_flight('old')} {_refresh_flight('new')} END"
+    ),
+}
+
+
+def itineraries_available(conn: sqlite3.Connection) -> bool:
+    """判断数据库是否已经建好 passenger_itineraries（见 tools.provision.ensure_itineraries）。"""
+    row = conn.execute(
+        "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = 'passenger_itineraries'"
+    ).fetchone()
+    return row[0] == 1
+
+
+def rebuild_itineraries(conn: sqlite3.Connection) -> int:
+    """
+    从源表整体重建 passenger_itineraries（不提交事务）。
+
+    返回:
+        int: 重建后的行数。
+    """
+    conn.execute("DELETE FROM passenger_itineraries")
+    return conn.execute(_INSERT).rowcount
+
+
+def check_itineraries(conn: sqlite3.Connection, passenger_id: Optional[str] = None) -> dict:
+    """
+    比较物化行程与实时连接的结果。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+        passenger_id (Optional[str]): 只检查该乘客；为 None 时检查全部乘客。
+
+    返回:
+        dict: rows（物化表行数）、expected（连接结果行数）、missing（只在连接结果中的行）、
+        extra（只在物化表中的行）以及 consistent。
+    """
+    columns = ", ".join(ITINERARY_COLUMNS)
+    where, params = ("", ()) if passenger_id is None else (" WHERE passenger_id = ?", (passenger_id,))
+    expected_rows = f"SELECT {columns} FROM ({ITINERARY_JOIN}){where}"
+    stored_rows = f"SELECT {columns} FROM passenger_itineraries{where}"
+
+    def count(query: str, query_params: tuple) -> int:
+        return conn.execute(f"SELECT count(*) FROM ({query})", query_params).fetchone()[0]
+
+    report = {
+        "rows": count(stored_rows, params),
+        "expected": count(expected_rows, params),
+        "missing": count(f"{expected_rows} EXCEPT {stored_rows}", params * 2),
+        "extra": count(f"{stored_rows} EXCEPT {expected_rows}", params * 2),
+    }
+    report["consistent"] = (
+        report["rows"] == report["expected"] and not report["missing"] and not report["extra"]
+    )
+    return report
+
+
+def main() -> None:
+    from tools import db
+
+    parser = argparse.ArgumentParser(description="检查物化的乘客行程表是否与源表一致")
+    parser.add_argument("--db", default=db, help="旅行数据库路径")
+    parser.add_argument("--repair", action="store_true", help="不一致时从源表重建")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    if not itineraries_available(conn):
+        parser.error("数据库中没有 passenger_itineraries，请先执行 python -m tools.provision")
+    report = check_itineraries(conn)
+    print(report)
+    if not report["consistent"] and args.repair:
+        with conn:
+            rebuild_itineraries(conn)
+        print(check_itineraries(conn))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
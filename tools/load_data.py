@@ -0,0 +1,326 @@
+"""
+把 CSV 或 Parquet 文件流式导入旅行数据库。
+
+此前更新数据只能替换整份 travel2.sqlite，update_dates 的 pandas 路径还会把整张表读入内存。
+这里逐块读取源文件（CSV 用 csv 模块，Parquet 用 pyarrow 按批读取），每块用一次 executemany
+在一个事务中写入，内存占用只与块大小有关：
+
+- 写入前删除目标表上由 provision_travel_db 维护的索引和触发器，全部写完后再执行一次
+  provision_travel_db 重建索引、全文索引和物化行程，而不是逐行维护；
+- 每块写入与断点记录（load_checkpoints 表中该文件已写入的行数）在同一个事务中提交，
+  中断后用同样的参数重新执行会跳过已写入的行，从断点继续；全部完成后删除断点记录。
+
+表名取自文件名第一个点之前的部分（flights.csv、flights.2024-05.parquet 都写入 flights），
+文件的列名必须是目标表的列。CSV 中的空字段写入 NULL。
+
+用法:
+    python -m tools.load_data data/flights.csv data/tickets.parquet [--db 数据库路径] [--replace]
+    python -m tools.load_data data/schedules/ --table flights --chunk-size 50000
+"""
+import argparse
+import csv
+import itertools
+import logging
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence
+
+from tools import DEFAULT_PRAGMAS, apply_pragmas, notify_database_reset
+from tools.provision import drop_derived_objects, provision_travel_db
+from tools.schema import TRAVEL_TABLES, create_travel_tables
+
+logger = logging.getLogger(__name__)
+
+SUFFIXES = (".csv", ".parquet")
+
+DEFAULT_CHUNK_SIZE = 50000
+
+CHECKPOINTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS load_checkpoints (
+    source TEXT PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    rows_loaded INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+@dataclass(frozen=True)
+class Source:
+    """一个待导入的文件及其目标表。"""
+
+    path: Path
+    table: str
+
+    @property
+    def key(self) -> str:
+        return str(self.path.resolve())
+
+    def fingerprint(self) -> tuple[int, int]:
+        stat = self.path.stat()
+        return stat.st_size, stat.st_mtime_ns
+
+
+def discover_sources(paths: Sequence[str], table: Optional[str] = None) -> list[Source]:
+    """
+    把命令行给出的文件和目录展开为导入列表，目录中的 .csv/.parquet 文件按文件名排序。
+
+    参数:
+        paths (Sequence[str]): 文件或目录。
+        table (Optional[str]): 全部写入这张表；为 None 时按文件名推断。
+
+    返回:
+        list[Source]: 导入列表。
+    """
+    files: list[Path] = []
+    for value in paths:
+        path = Path(value)
+        if path.is_dir():
+            files.extend(sorted(child for child in path.iterdir() if child.suffix.lower() in SUFFIXES))
+        elif path.suffix.lower() in SUFFIXES:
+            files.append(path)
+        else:
+            raise ValueError(f"不支持的文件类型: {path}（只支持 CSV 和 Parquet）")
+    return [Source(path, table or path.name.split(".")[0]) for path in files]
+
+
+def _cell(value: Any) -> Any:
+    # Parquet 的时间类型按数据库中的文本格式写入，sqlite3 不支持的 Decimal 转为浮点数
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="microseconds")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _parquet_file(path: Path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("读取 Parquet 文件需要安装 pyarrow: pip install pyarrow") from exc
+    return pq.ParquetFile(path)
+
+
+def read_header(path: Path) -> list[str]:
+    """返回 CSV 表头或 Parquet schema 中的列名。"""
+    if path.suffix.lower() == ".parquet":
+        return list(_parquet_file(path).schema_arrow.names)
+    with path.open(newline="", encoding="utf-8") as handle:
+        return next(csv.reader(handle), [])
+
+
+def _csv_rows(path: Path, skip: int) -> Iterator[tuple]:
+    with path.open(newline="", encoding="utf-8") as handle:
+        reader = csv.reader(handle)
+        width = len(next(reader, []))
+        for line_no, row in enumerate(itertools.islice(reader, skip, None), start=skip + 2):
+            if len(row) != width:
+                raise ValueError(f"{path} 第 {line_no} 行有 {len(row)} 列，表头有 {width} 列")
+            yield tuple(value if value != "" else None for value in row)
+
+
+def _parquet_rows(path: Path, skip: int, batch_size: int) -> Iterator[tuple]:
+    parquet = _parquet_file(path)
+    # 断点之前完整的 row group 直接跳过，不解码
+    first_group, offset = 0, skip
+    while first_group < parquet.num_row_groups:
+        group_rows = parquet.metadata.row_group(first_group).num_rows
+        if offset < group_rows:
+            break
+        offset -= group_rows
+        first_group += 1
+    if first_group == parquet.num_row_groups:
+        return
+    batches = parquet.iter_batches(
+        batch_size=batch_size, row_groups=range(first_group, parquet.num_row_groups)
+    )
+    for batch in batches:
+        rows = zip(*(column.to_pylist() for column in batch.columns))
+        if offset:
+            # 剩余的偏移量小于一个 row group，在前几批中跳过
+            skipped = min(offset, batch.num_rows)
+            rows = itertools.islice(rows, skipped, None)
+            offset -= skipped
+        for row in rows:
+            yield tuple(_cell(value) for value in row)
+
+
+def read_rows(path: Path, skip: int = 0, batch_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[tuple]:
+    """
+    流式读取一个 CSV 或 Parquet 文件的数据行，列的顺序与 read_header 一致。
+
+    参数:
+        path (Path): 源文件。
+        skip (int): 跳过的数据行数（断点续传时为已写入的行数）。
+        batch_size (int): Parquet 每批解码的行数。
+
+    返回:
+        Iterator[tuple]: 数据行。
+    """
+    if path.suffix.lower() == ".parquet":
+        return _parquet_rows(path, skip, batch_size)
+    return _csv_rows(path, skip)
+
+
+def _checkpoint(conn: sqlite3.Connection, source: Source) -> Optional[tuple[int, bool]]:
+    row = conn.execute(
+        "SELECT size, mtime_ns, rows_loaded, done FROM load_checkpoints WHERE source = ?",
+        (source.key,),
+    ).fetchone()
+    if row is None:
+        return None
+    if tuple(row[:2]) != source.fingerprint():
+        raise ValueError(f"{source.path} 在上次中断的导入之后被修改过，请使用 --restart 重新导入")
+    return row[2], bool(row[3])
+
+
+def _insert_statement(conn: sqlite3.Connection, source: Source) -> str:
+    header = read_header(source.path)
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({source.table})")}
+    unknown = [column for column in header if column not in columns]
+    if unknown:
+        raise ValueError(f"{source.path} 中的列不在表 {source.table} 中: {', '.join(unknown)}")
+    return (
+        f"INSERT INTO {source.table} ({', '.join(header)}) "
+        f"VALUES ({', '.join('?' for _ in header)})"
+    )
+
+
+def _write_chunk(
+        conn: sqlite3.Connection, insert: str, rows: list[tuple], source: Source, loaded: int
+) -> None:
+    # 数据块与断点在同一个事务中提交，中断后断点不会多于或少于实际写入的行
+    with conn:
+        conn.executemany(insert, rows)
+        conn.execute(
+            "UPDATE load_checkpoints SET rows_loaded = ? WHERE source = ?", (loaded, source.key)
+        )
+
+
+def load_source(
+        conn: sqlite3.Connection, source: Source, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """
+    从断点开始把一个文件写入目标表（调用前需要已经记录断点，见 load_files）。
+
+    返回:
+        int: 本次写入的行数。
+    """
+    checkpoint = _checkpoint(conn, source)
+    skip, done = checkpoint or (0, False)
+    if done:
+        return 0
+    insert = _insert_statement(conn, source)
+    rows = read_rows(source.path, skip, chunk_size)
+    loaded = skip
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        loaded += len(chunk)
+        _write_chunk(conn, insert, chunk, source, loaded)
+        logger.info("%s: %d rows loaded into %s", source.path, loaded, source.table)
+    with conn:
+        conn.execute("UPDATE load_checkpoints SET done = 1 WHERE source = ?", (source.key,))
+    return loaded - skip
+
+
+def load_files(
+        conn: sqlite3.Connection,
+        sources: Sequence[Source],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        replace: bool = False,
+        restart: bool = False,
+) -> dict[str, int]:
+    """
+    导入一组文件，全部写完后执行 provision_travel_db。
+
+    参数:
+        conn (sqlite3.Connection): 目标数据库连接。
+        sources (Sequence[Source]): 导入列表，见 discover_sources。
+        chunk_size (int): 每个事务写入的行数。
+        replace (bool): 写入前清空目标表（从断点继续时不会再次清空）。
+        restart (bool): 丢弃这些文件的断点，从头导入。
+
+    返回:
+        dict[str, int]: 文件路径 -> 本次写入的行数。
+    """
+    tables = {source.table for source in sources}
+    unknown = tables - set(TRAVEL_TABLES)
+    if unknown:
+        raise ValueError(f"不是旅行数据库的表: {', '.join(sorted(unknown))}")
+
+    conn.execute(CHECKPOINTS_SCHEMA)
+    create_travel_tables(conn, tuple(sorted(tables)))
+    if restart:
+        conn.executemany(
+            "DELETE FROM load_checkpoints WHERE source = ?", [(source.key,) for source in sources]
+        )
+    conn.commit()
+    # 先检查全部断点和列名，源文件被修改或列名不对时在写入任何数据之前报错
+    resumed = {source.key for source in sources if _checkpoint(conn, source) is not None}
+    for source in sources:
+        _insert_statement(conn, source)
+    drop_derived_objects(conn, tables)
+
+    with conn:
+        if replace:
+            started = {
+                row[0] for row in conn.execute("SELECT DISTINCT table_name FROM load_checkpoints")
+            }
+            for table in sorted(tables - started):
+                conn.execute(f"DELETE FROM {table}")
+        conn.executemany(
+            "INSERT INTO load_checkpoints (source, table_name, size, mtime_ns) VALUES (?, ?, ?, ?)",
+            [
+                (source.key, source.table, *source.fingerprint())
+                for source in sources
+                if source.key not in resumed
+            ],
+        )
+
+    loaded = {str(source.path): load_source(conn, source, chunk_size) for source in sources}
+    provision_travel_db(conn)
+    with conn:
+        conn.executemany(
+            "DELETE FROM load_checkpoints WHERE source = ?", [(source.key,) for source in sources]
+        )
+    # 同一进程中的工具缓存可能保存了旧数据
+    notify_database_reset()
+    return loaded
+
+
+def main() -> None:
+    from tools import db
+
+    parser = argparse.ArgumentParser(
+        description="把 CSV/Parquet 文件流式导入旅行数据库，支持断点续传",
+    )
+    parser.add_argument("paths", nargs="+", help="CSV/Parquet 文件或包含它们的目录")
+    parser.add_argument("--db", default=db, help="旅行数据库路径")
+    parser.add_argument("--table", help="全部写入这张表，默认按文件名推断")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每个事务写入的行数")
+    parser.add_argument("--replace", action="store_true", help="写入前清空目标表")
+    parser.add_argument("--restart", action="store_true", help="丢弃断点，从头导入")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    conn = sqlite3.connect(args.db)
+    apply_pragmas(conn, DEFAULT_PRAGMAS)
+    try:
+        sources = discover_sources(args.paths, args.table)
+        loaded = load_files(conn, sources, args.chunk_size, args.replace, args.restart)
+    except (ValueError, RuntimeError) as exc:
+        parser.error(str(exc))
+    finally:
+        conn.close()
+    for path, count in loaded.items():
+        print(f"{path}: {count} 行")
+
+
+if __name__ == "__main__":
+    main()
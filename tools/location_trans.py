@@ -1,22 +1,13 @@
-def transform_location(chinese_city: str | None):
-    # 中文到英文的城市名映射表
-    city_dict = {
-        '北京': 'Beijing',
-        '上海': 'Shanghai',
-        '广州': 'Guangzhou',
-        '深圳': 'Shenzhen',
-        '成都': 'Chengdu',
-        '杭州': 'Hangzhou',
-        '巴塞尔': 'Basel',
-        '苏黎世': 'Zurich',
-        # 添加更多的城市映射...
-    }
+from tools.gazetteer import default_gazetteer
 
-    if not chinese_city:
-        return chinese_city
-
-    # Check if the input is in Chinese
-    if all('\u4e00' <= char <= '\u9fff' for char in chinese_city):
-        return city_dict.get(chinese_city, "城市名称未找到")
-    else:
-        return chinese_city
+
+def transform_location(location: str | None):
+    """
+    把用户给出的地点（中文名、拼音、别名、IATA 机场代码或带拼写错误的英文名）转换为数据库使用的英文城市名。
+
+    地名表中找不到或有歧义时原样返回（去掉首尾空白），由搜索工具按原文做模糊匹配。
+    """
+    if not location:
+        return location
+    place = default_gazetteer().resolve(location)
+    return place.name if place else location.strip()
@@ -0,0 +1,287 @@
+"""
+按航班、舱位预先汇总的座位占用计数 flight_occupancy。
+
+航班搜索结果只有航班本身，看不到还剩多少座位，助手可能选中一个已经满员的航班，到改签时才失败。
+这里为每个 (航班, 舱位) 保存一行计数：
+
+- seats: 该航班机型在 seats 表中该舱位的座位数；
+- booked: ticket_flights 中该航班、该舱位的航段数（已售出的座位）；
+- checked_in: 其中已经有登机牌（boarding_passes）的航段数。
+
+计数由 ticket_flights、boarding_passes、flights 和 seats 上的触发器在同一个事务中维护，
+update_ticket_to_new_flight 改签、cancel_ticket 退票时随之更新；查询某个航班的余座只需一次主键查找。
+check_occupancy 比较计数与源表实时汇总的结果，rebuild_occupancy 从源表整体重建。
+
+用法:
+    python -m tools.occupancy [--repair] [--db 数据库路径]
+"""
+import argparse
+import sqlite3
+from typing import Optional
+
+OCCUPANCY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS flight_occupancy (
+    flight_id INTEGER NOT NULL,
+    fare_conditions TEXT NOT NULL,
+    seats INTEGER NOT NULL DEFAULT 0,
+    booked INTEGER NOT NULL DEFAULT 0,
+    checked_in INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (flight_id, fare_conditions)
+) WITHOUT ROWID
+"""
+
+# 计数依赖的源表
+OCCUPANCY_SOURCE_TABLES = ("flights", "seats", "ticket_flights", "boarding_passes")
+
+# 源表实时汇总的计数，rebuild_occupancy 和 check_occupancy 使用
+OCCUPANCY_QUERY = """
+    WITH capacity AS (
+        SELECT f.flight_id, s.fare_conditions, count(*) AS seats
+        FROM flights f JOIN seats s ON s.aircraft_code = f.aircraft_code
+        GROUP BY f.flight_id, s.fare_conditions
+    ),
+    sold AS (
+        SELECT flight_id, fare_conditions, count(*) AS booked
+        FROM ticket_flights
+        WHERE flight_id IS NOT NULL AND fare_conditions IS NOT NULL
+        GROUP BY flight_id, fare_conditions
+    ),
+    boarded AS (
+        SELECT tf.flight_id, tf.fare_conditions, count(*) AS checked_in
+        FROM boarding_passes bp
+        JOIN ticket_flights tf ON tf.ticket_no = bp.ticket_no AND tf.flight_id = bp.flight_id
+        WHERE tf.fare_conditions IS NOT NULL
+        GROUP BY tf.flight_id, tf.fare_conditions
+    ),
+    occupancy_keys AS (
+        SELECT flight_id, fare_conditions FROM capacity
+        UNION SELECT flight_id, fare_conditions FROM sold
+        UNION SELECT flight_id, fare_conditions FROM boarded
+    )
+    SELECT
+        k.flight_id, k.fare_conditions,
+        coalesce(c.seats, 0) AS seats, coalesce(s.booked, 0) AS booked,
+        coalesce(b.checked_in, 0) AS checked_in
+    FROM occupancy_keys k
+    LEFT JOIN capacity c ON c.flight_id = k.flight_id AND c.fare_conditions = k.fare_conditions
+    LEFT JOIN sold s ON s.flight_id = k.flight_id AND s.fare_conditions = k.fare_conditions
+    LEFT JOIN boarded b ON b.flight_id = k.flight_id AND b.fare_conditions = k.fare_conditions
+"""
+
+# 触发器只增减计数，计数都为 0 的行与源表汇总中不存在的行等价
+_STORED_QUERY = (
+    "SELECT flight_id, fare_conditions, seats, booked, checked_in FROM flight_occupancy "
+    "WHERE seats != 0 OR booked != 0 OR checked_in != 0"
+)
+
+_UPSERT = (
+    "ON CONFLICT (flight_id, fare_conditions) DO UPDATE SET {column} = {column} + excluded.{column};"
+)
+
+
+def _adjust(column: str, flight: str, fare: str, delta: str) -> str:
+    # 把 (flight, fare) 这一行的 column 增加 delta；舱位为空的航段不计数
+    return (
+        f"INSERT INTO flight_occupancy (flight_id, fare_conditions, {column}) "
+        f"SELECT {flight}, {fare}, {delta} WHERE {flight} IS NOT NULL AND {fare} IS NOT NULL "
+        + _UPSERT.format(column=column)
+    )
+
+
+def _segment(ref: str, sign: str) -> str:
+    # ticket_flights 的一行（old 或 new）被加入（+）或移出（-）计数
+    boarded = (
+        f"(SELECT count(*) FROM boarding_passes "
+        f"WHERE ticket_no = {ref}.ticket_no AND flight_id = {ref}.flight_id)"
+    )
+    return (
+        _adjust("booked", f"{ref}.flight_id", f"{ref}.fare_conditions", f"{sign}1")
+        + " "
+        + _adjust("checked_in", f"{ref}.flight_id", f"{ref}.fare_conditions", f"{sign}{boarded}")
+    )
+
+
+def _boarding_pass(ref: str, sign: str) -> str:
+    # 登机牌的一行被加入或移出计数，舱位取自对应的航段
+    return (
+        f"INSERT INTO flight_occupancy (flight_id, fare_conditions, checked_in) "
+        f"SELECT flight_id, fare_conditions, {sign}1 FROM ticket_flights "
+        f"WHERE ticket_no = {ref}.ticket_no AND flight_id = {ref}.flight_id "
+        f"AND fare_conditions IS NOT NULL " + _UPSERT.format(column="checked_in")
+    )
+
+
+def _capacity(ref: str) -> str:
+    return (
+        f"INSERT INTO flight_occupancy (flight_id, fare_conditions, seats) "
+        f"SELECT {ref}.flight_id, fare_conditions, count(*) FROM seats "
+        f"WHERE aircraft_code = {ref}.aircraft_code GROUP BY fare_conditions "
+        f"ON CONFLICT (flight_id, fare_conditions) DO UPDATE SET seats = excluded.seats;"
+    )
+
+
+def _seat_map(ref: str) -> str:
+    # 座位表的一行变化后，重算使用该机型的全部航班在该舱位的座位数
+    return (
+        f"INSERT INTO flight_occupancy (flight_id, fare_conditions, seats) "
+        f"SELECT flight_id, {ref}.fare_conditions, (SELECT count(*) FROM seats "
+        f"WHERE aircraft_code = {ref}.aircraft_code AND fare_conditions = {ref}.fare_conditions) "
+        f"FROM flights WHERE aircraft_code = {ref}.aircraft_code AND {ref}.fare_conditions IS NOT NULL "
+        f"ON CONFLICT (flight_id, fare_conditions) DO UPDATE SET seats = excluded.seats;"
+    )
+
+
+OCCUPANCY_TRIGGERS = {
+    "ticket_flights_occupancy_ai": f"AFTER INSERT ON ticket_flights BEGIN {_segment('new', '+')} END",
+    "ticket_flights_occupancy_ad": f"AFTER DELETE ON ticket_flights BEGIN {_segment('old', '-')} END",
+    # 改签只修改 flight_id：旧航班减一、新航班加一
+    "ticket_flights_occupancy_au": (
+        "AFTER UPDATE OF ticket_no, flight_id, fare_conditions ON ticket_flights "
+        f"BEGIN {_segment('old', '-')} {_segment('new', '+')} END"
+    ),
+    "boarding_passes_occupancy_ai": (
+        f"AFTER INSERT ON boarding_passes BEGIN {_boarding_pass('new', '+')} END"
+    ),
+    "boarding_passes_occupancy_ad": (
+        f"AFTER DELETE ON boarding_passes BEGIN {_boarding_pass('old', '-')} END"
+    ),
+    "boarding_passes_occupancy_au": (
+        "AFTER UPDATE OF ticket_no, flight_id ON boarding_passes "
+        f"BEGIN {_boarding_pass('old', '-')} {_boarding_pass('new', '+')} END"
+    ),
+    # 座位表很少变化；批量导入 seats 时 tools.load_data 会先删除这些触发器，导入后整体重建
+    "seats_occupancy_ai": f"AFTER INSERT ON seats BEGIN {_seat_map('new')} END",
+    "seats_occupancy_ad": f"AFTER DELETE ON seats BEGIN {_seat_map('old')} END",
+    "seats_occupancy_au": (
+        "AFTER UPDATE OF aircraft_code, fare_conditions ON seats "
+        f"BEGIN {_seat_map('old')} {_seat_map('new')} END"
+    ),
+    "flights_occupancy_ai": f"AFTER INSERT ON flights BEGIN {_capacity('new')} END",
+    "flights_occupancy_ad": (
+        "AFTER DELETE ON flights BEGIN "
+        "UPDATE flight_occupancy SET seats = 0 WHERE flight_id = old.flight_id; END"
+    ),
+    "flights_occupancy_au": (
+        "AFTER UPDATE OF flight_id, aircraft_code ON flights BEGIN "
+        "UPDATE flight_occupancy SET seats = 0 WHERE flight_id = old.flight_id; "
+        f"{_capacity('new')} END"
+    ),
+}
+
+# flight_availability 在没有准备 flight_occupancy 时使用的单航班实时汇总
+_LIVE_AVAILABILITY = """
+    SELECT fare_conditions, sum(seats), sum(booked), sum(checked_in) FROM (
+        SELECT s.fare_conditions, 1 AS seats, 0 AS booked, 0 AS checked_in
+        FROM flights f JOIN seats s ON s.aircraft_code = f.aircraft_code WHERE f.flight_id = :flight_id
+        UNION ALL
+        SELECT tf.fare_conditions, 0, 1,
+            EXISTS (SELECT 1 FROM boarding_passes bp
+                    WHERE bp.ticket_no = tf.ticket_no AND bp.flight_id = tf.flight_id)
+        FROM ticket_flights tf WHERE tf.flight_id = :flight_id AND tf.fare_conditions IS NOT NULL
+    )
+    GROUP BY fare_conditions ORDER BY fare_conditions
+"""
+
+
+def occupancy_available(conn: sqlite3.Connection) -> bool:
+    """判断数据库是否已经建好 flight_occupancy（见 tools.provision.ensure_occupancy）。"""
+    row = conn.execute(
+        "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = 'flight_occupancy'"
+    ).fetchone()
+    return row[0] == 1
+
+
+def rebuild_occupancy(conn: sqlite3.Connection) -> int:
+    """
+    从源表整体重建 flight_occupancy（不提交事务）。
+
+    返回:
+        int: 重建后的行数。
+    """
+    conn.execute("DELETE FROM flight_occupancy")
+    return conn.execute(f"INSERT INTO flight_occupancy {OCCUPANCY_QUERY}").rowcount
+
+
+def check_occupancy(conn: sqlite3.Connection) -> dict:
+    """
+    比较占用计数与源表实时汇总的结果。
+
+    返回:
+        dict: rows（非零计数行数）、expected（实时汇总行数）、missing、extra 以及 consistent。
+    """
+
+    def count(query: str) -> int:
+        return conn.execute(f"SELECT count(*) FROM ({query})").fetchone()[0]
+
+    expected_rows = f"SELECT * FROM ({OCCUPANCY_QUERY})"
+    report = {
+        "rows": count(_STORED_QUERY),
+        "expected": count(expected_rows),
+        "missing": count(f"{expected_rows} EXCEPT {_STORED_QUERY}"),
+        "extra": count(f"{_STORED_QUERY} EXCEPT {expected_rows}"),
+    }
+    report["consistent"] = (
+        report["rows"] == report["expected"] and not report["missing"] and not report["extra"]
+    )
+    return report
+
+
+def flight_availability(
+        conn: sqlite3.Connection, flight_id: int, fare_conditions: Optional[str] = None
+) -> list[dict]:
+    """
+    返回一个航班各舱位的座位数、已售和余座。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+        flight_id (int): 航班 ID。
+        fare_conditions (Optional[str]): 只返回该舱位。
+
+    返回:
+        list[dict]: 每个舱位一项，包含 fare_conditions、seats、booked、checked_in 和 available
+        （seats - booked，超售时为 0）。
+    """
+    if occupancy_available(conn):
+        # 主键查找
+        rows = conn.execute(
+            "SELECT fare_conditions, seats, booked, checked_in FROM flight_occupancy "
+            "WHERE flight_id = ? AND (seats != 0 OR booked != 0) ORDER BY fare_conditions",
+            (flight_id,),
+        ).fetchall()
+    else:
+        rows = conn.execute(_LIVE_AVAILABILITY, {"flight_id": flight_id}).fetchall()
+    return [
+        {
+            "fare_conditions": fare,
+            "seats": seats,
+            "booked": booked,
+            "checked_in": checked_in,
+            "available": max(seats - booked, 0),
+        }
+        for fare, seats, booked, checked_in in rows
+        if fare_conditions is None or fare.lower() == fare_conditions.lower()
+    ]
+
+
+def main() -> None:
+    from tools import db
+
+    parser = argparse.ArgumentParser(description="检查航班座位占用计数是否与源表一致")
+    parser.add_argument("--db", default=db, help="旅行数据库路径")
+    parser.add_argument("--repair", action="store_true", help="不一致时从源表重建")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    if not occupancy_available(conn):
+        parser.error("数据库中没有 flight_occupancy，请先执行 python -m tools.provision")
+    report = check_occupancy(conn)
+    print(report)
+    if not report["consistent"] and args.repair:
+        with conn:
+            rebuild_occupancy(conn)
+        print(check_occupancy(conn))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+跨表的组合预订。
+
+book_hotels、book_car_rentals、book_excursions 各自只处理一张表，“酒店加租车加一个游览项目”仍然需要在
+三个专门助理中分别确认三次。book_trip_package 接收不同表的项目，经 booking.apply_batch 在同一个写事务中
+完成，客户只需确认一次；默认任意一项失败则全部撤销。
+"""
+from datetime import date, datetime
+from typing import List, Literal, Optional, Union
+
+from langchain_core.tools import tool
+from pydantic import BaseModel, Field
+
+from tools import booking
+from tools.async_tools import async_variant
+
+
+class PackageItem(BaseModel):
+    """组合预订中的一项。"""
+
+    action: Literal["book", "cancel"] = Field(default="book", description="预订（book）或取消（cancel）。")
+    table: Literal["hotels", "car_rentals", "trip_recommendations"] = Field(
+        description="项目类型：hotels（酒店）、car_rentals（租车）或 trip_recommendations（旅行推荐）。"
+    )
+    item_id: int = Field(description="酒店、租车或旅行推荐的ID。")
+    start_date: Optional[Union[datetime, date]] = Field(
+        default=None, description="入住/取车日期，与结束日期一起给出时按日期预订或取消；旅行推荐不支持。"
+    )
+    end_date: Optional[Union[datetime, date]] = Field(default=None, description="退房/还车日期。")
+
+
+@async_variant
+@tool
+def book_trip_package(items: List[PackageItem], all_or_nothing: bool = True) -> List[dict]:
+    """
+    在一次确认中预订或取消不同类型的项目（例如酒店、租车和旅行推荐的组合），全部操作在同一个事务中完成。
+
+    参数:
+        items (List[PackageItem]): 要预订或取消的项目。
+        all_or_nothing (bool): 为 True 时任意一项失败则全部撤销。默认为True。
+
+    返回:
+        List[dict]: 每项的 {"table", "id", "status", "message"}，status 为 ok、conflict、not_found 或 rolled_back。
+    """
+    batch = [
+        booking.BatchItem(item.action, item.table, item.item_id, item.start_date, item.end_date)
+        for item in items
+    ]
+    results = booking.apply_batch(batch, all_or_nothing)
+    return [
+        {"table": item.table, "id": item.item_id, "status": result.status, "message": result.message}
+        for item, result in zip(items, results)
+    ]
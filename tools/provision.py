@@ -0,0 +1,458 @@
+"""
+旅行数据库的结构准备（索引等），在 update_dates 重置数据库后以及服务启动时执行。
+
+所有步骤都是幂等的，可以重复执行。
+"""
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+from tools import get_connection, get_pool
+from tools.airports import AIRPORT_CITIES_SCHEMA, airport_city_rows
+from tools.inventory import (
+    RESERVATION_TRIGGERS,
+    RESERVATIONS_INDEX_SCHEMA,
+    RESERVATIONS_SCHEMA,
+    RESOURCE_TYPES,
+    UNDATED_WINDOW,
+)
+from tools.itineraries import (
+    ITINERARIES_SCHEMA,
+    ITINERARY_TRIGGERS,
+    SOURCE_TABLES,
+    rebuild_itineraries,
+)
+from tools.occupancy import (
+    OCCUPANCY_SCHEMA,
+    OCCUPANCY_SOURCE_TABLES,
+    OCCUPANCY_TRIGGERS,
+    rebuild_occupancy,
+)
+from tools.route_index import FLIGHTS_VERSION_SCHEMA, FLIGHTS_VERSION_TRIGGERS
+from tools.text_search import FTS_TABLES, fts_table
+from tools.timestamps import (
+    EPOCH_COLUMNS,
+    NULL_TIMESTAMP,
+    epoch_triggers,
+    register_timestamp_functions,
+)
+
+logger = logging.getLogger(__name__)
+
+# 工具热点查询依赖的索引：索引名 -> (表名, 列)
+TRAVEL_INDEXES = {
+    # search_flights: 出发/到达机场等值过滤 + 起飞时间（UTC 时间戳）范围，末尾的 flight_id 让分页排序
+    # (scheduled_departure_epoch, flight_id) 直接沿索引读取，翻页只需一次索引定位
+    "idx_flights_route_departure": (
+        "flights", "departure_airport, arrival_airport, scheduled_departure_epoch, flight_id"
+    ),
+    "idx_flights_origin_departure": (
+        "flights", "departure_airport, scheduled_departure_epoch, flight_id"
+    ),
+    "idx_flights_arrival_departure": ("flights", "arrival_airport, scheduled_departure_epoch, flight_id"),
+    "idx_flights_scheduled_departure": ("flights", "scheduled_departure_epoch, flight_id"),
+    # fetch_user_flight_information 以及改签/退票的按 ID 查询
+    "idx_flights_flight_id": ("flights", "flight_id"),
+    "idx_tickets_passenger_id": ("tickets", "passenger_id"),
+    "idx_tickets_ticket_no": ("tickets", "ticket_no"),
+    "idx_ticket_flights_ticket_no": ("ticket_flights", "ticket_no, flight_id"),
+    "idx_ticket_flights_flight_id": ("ticket_flights", "flight_id"),
+    "idx_boarding_passes_ticket_flight": ("boarding_passes", "ticket_no, flight_id"),
+    # flight_occupancy 的触发器按机型、舱位统计座位数
+    "idx_seats_aircraft_fare": ("seats", "aircraft_code, fare_conditions"),
+    # 全文检索结果按 rowid 回表
+    "idx_hotels_id": ("hotels", "id"),
+    "idx_car_rentals_id": ("car_rentals", "id"),
+    "idx_trip_recommendations_id": ("trip_recommendations", "id"),
+    # 不指定日期取消时删除某条记录的全部按日期预订
+    "idx_reservations_resource": ("reservations", "resource_type, resource_id, start_day"),
+    # fetch_user_flight_information 按乘客读取物化行程；触发器按机票、航班重算
+    "idx_passenger_itineraries_passenger": ("passenger_itineraries", "passenger_id"),
+    "idx_passenger_itineraries_ticket": ("passenger_itineraries", "ticket_no"),
+    "idx_passenger_itineraries_flight": ("passenger_itineraries", "flight_id"),
+    # 城市 -> 机场代码（机场代码 -> 城市走主键）
+    "idx_airport_cities_city": ("airport_cities", "city, airport_code"),
+}
+
+
+def _existing_tables(conn: sqlite3.Connection) -> set[str]:
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    return {row[0] for row in rows}
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def ensure_epoch_columns(conn: sqlite3.Connection) -> list[str]:
+    """
+    为航班时间补充 UTC 时间戳列（见 tools.timestamps.EPOCH_COLUMNS），回填还没有计算的行，
+    并创建在插入行、修改时间文本后重算时间戳的触发器。触发器是新建的（之前丢失期间修改过的行可能已经过期）
+    时重算全部行。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+
+    返回:
+        list[str]: 本次检查过的列，格式为 "表名.列名"。
+    """
+    register_timestamp_functions(conn)
+    tables = _existing_tables(conn)
+    triggers = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    }
+    ensured = []
+    for table, columns in EPOCH_COLUMNS.items():
+        if table not in tables:
+            continue
+        table_triggers = epoch_triggers(table)
+        recompute_all = not set(table_triggers) <= triggers
+        existing = _table_columns(conn, table)
+        for column, epoch_column in columns.items():
+            if epoch_column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {epoch_column} INTEGER")
+            pending = "1 = 1" if recompute_all else f"{epoch_column} IS NULL"
+            conn.execute(
+                f"UPDATE {table} SET {epoch_column} = CAST(timestamp_epoch({column}) AS INTEGER) "
+                f"WHERE {pending} AND {column} != ?",
+                (NULL_TIMESTAMP,),
+            )
+            ensured.append(f"{table}.{epoch_column}")
+        for trigger_name, body in table_triggers.items():
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {body}")
+    conn.commit()
+    return ensured
+
+
+def _index_columns(conn: sqlite3.Connection, index_name: str) -> list[str]:
+    return [row[2] for row in conn.execute(f"PRAGMA index_info({index_name})")]
+
+
+def ensure_indexes(conn: sqlite3.Connection) -> list[str]:
+    """
+    创建工具查询所需的索引（已存在则跳过，缺少对应的表或列时也跳过）。
+    同名索引的列与 TRAVEL_INDEXES 不一致时（旧版本创建的索引），会删除后重建。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+
+    返回:
+        list[str]: 本次检查过的索引名。
+    """
+    tables = _existing_tables(conn)
+    ensured = []
+    for index_name, (table, columns) in TRAVEL_INDEXES.items():
+        index_columns = [column.strip() for column in columns.split(",")]
+        if table not in tables or not set(index_columns) <= _table_columns(conn, table):
+            continue
+        existing = _index_columns(conn, index_name)
+        if existing and existing != index_columns:
+            conn.execute(f"DROP INDEX {index_name}")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({columns})")
+        ensured.append(index_name)
+    conn.commit()
+    return ensured
+
+
+def _fts_triggers(table: str, columns: tuple[str, ...]) -> dict[str, str]:
+    shadow = fts_table(table)
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    delete_old = (
+        f"INSERT INTO {shadow} ({shadow}, rowid, {column_list}) "
+        f"VALUES ('delete', old.id, {old_values});"
+    )
+    insert_new = f"INSERT INTO {shadow} (rowid, {column_list}) VALUES (new.id, {new_values});"
+    return {
+        f"{shadow}_ai": f"AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"{shadow}_ad": f"AFTER DELETE ON {table} BEGIN {delete_old} END",
+        # 只在检索列变化时同步，预订状态等其他列的更新不会触碰全文索引
+        f"{shadow}_au": f"AFTER UPDATE OF id, {column_list} ON {table} BEGIN {delete_old} {insert_new} END",
+    }
+
+
+def ensure_fts(conn: sqlite3.Connection) -> list[str]:
+    """
+    为酒店、租车和旅行推荐创建 FTS5 影子表及同步触发器。
+
+    影子表是新建的，或者原表被重建导致触发器丢失时（例如 update_dates 的 pandas 重写），
+    会对影子表执行一次 rebuild。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+
+    返回:
+        list[str]: 可用的 FTS5 影子表名。SQLite 未编译 FTS5 时返回空列表，工具会回退到 LIKE 查询。
+    """
+    tables = _existing_tables(conn)
+    triggers = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    }
+    ensured = []
+    for table, columns in FTS_TABLES.items():
+        if table not in tables:
+            continue
+        shadow = fts_table(table)
+        table_triggers = _fts_triggers(table, columns)
+        needs_rebuild = shadow not in tables or not set(table_triggers) <= triggers
+        try:
+            conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {shadow} USING fts5("
+                f"{', '.join(columns)}, content='{table}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2')"
+            )
+        except sqlite3.OperationalError:
+            logger.warning("SQLite FTS5 is unavailable, %s keeps using LIKE search", table)
+            return ensured
+        for trigger_name, body in table_triggers.items():
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {body}")
+        if needs_rebuild:
+            conn.execute(f"INSERT INTO {shadow} ({shadow}) VALUES ('rebuild')")
+        ensured.append(shadow)
+    conn.commit()
+    return ensured
+
+
+# 按日期预订的表 -> 已有预订的开始/结束日期列，新建 reservations 时据此回填 booked = 1 的记录
+_RESERVATION_DATE_COLUMNS = {
+    "hotels": ("checkin_date", "checkout_date"),
+    "car_rentals": ("start_date", "end_date"),
+}
+
+# date.toordinal() 与 SQLite julianday() 在午夜时的差值
+_JULIAN_DAY_OFFSET = 1721424.5
+
+
+def ensure_inventory(conn: sqlite3.Connection) -> bool:
+    """
+    为酒店和租车补充 capacity 列，创建 reservations 表、R*Tree 索引 reservations_index 及同步触发器
+    （见 tools.inventory）。
+
+    reservations 是新建的时候，booked = 1 且日期有效的记录会被回填为一条预订；此后仍没有任何预订的
+    booked = 1 记录（不指定日期的预订）回填为占满全部日期的一条预订（见 tools.inventory.UNDATED_WINDOW）；
+    R*Tree 是新建的或者触发器丢失时，会根据 reservations 重建索引。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+
+    返回:
+        bool: 按日期库存是否可用。SQLite 未编译 R*Tree 时返回 False，搜索会回退到 booked 标记。
+    """
+    tables = _existing_tables(conn)
+    resources = [table for table in RESOURCE_TYPES if table in tables]
+    if not resources:
+        return False
+    try:
+        conn.execute(RESERVATIONS_INDEX_SCHEMA)
+    except sqlite3.OperationalError:
+        logger.warning("SQLite R*Tree is unavailable, date searches fall back to the booked flag")
+        return False
+    for table in resources:
+        if "capacity" not in _table_columns(conn, table):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN capacity INTEGER NOT NULL DEFAULT 1")
+
+    triggers = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    }
+    conn.execute(RESERVATIONS_SCHEMA)
+    if "reservations" not in tables:
+        for table in resources:
+            start_column, end_column = _RESERVATION_DATE_COLUMNS[table]
+            start_day = f"CAST(julianday(date({start_column})) - {_JULIAN_DAY_OFFSET} AS INTEGER)"
+            end_day = f"CAST(julianday(date({end_column})) - {_JULIAN_DAY_OFFSET} AS INTEGER)"
+            conn.execute(
+                f"INSERT INTO reservations (resource_type, resource_id, start_day, end_day) "
+                f"SELECT ?, id, {start_day}, {end_day} FROM {table} "
+                f"WHERE booked = 1 AND date({end_column}) > date({start_column})",
+                (RESOURCE_TYPES[table],),
+            )
+    for trigger_name, body in RESERVATION_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {body}")
+    # 没有任何预订记录的 booked = 1 行（不指定日期的预订，或日期无效）按占满全部日期回填
+    for table in resources:
+        conn.execute(
+            f"INSERT INTO reservations (resource_type, resource_id, start_day, end_day, units) "
+            f"SELECT ?, id, ?, ?, max(capacity, 1) FROM {table} t WHERE booked = 1 AND NOT EXISTS ("
+            f"SELECT 1 FROM reservations r WHERE r.resource_type = ? AND r.resource_id = t.id)",
+            (RESOURCE_TYPES[table], *UNDATED_WINDOW, RESOURCE_TYPES[table]),
+        )
+    if "reservations_index" not in tables or not set(RESERVATION_TRIGGERS) <= triggers:
+        conn.execute("DELETE FROM reservations_index")
+        conn.execute(
+            "INSERT INTO reservations_index SELECT id, resource_type, resource_type, "
+            "resource_id, resource_id, start_day, end_day - 1, units FROM reservations"
+        )
+    conn.commit()
+    return True
+
+
+def ensure_itineraries(conn: sqlite3.Connection) -> bool:
+    """
+    创建物化的乘客行程表 passenger_itineraries 及其在四张源表上的触发器（见 tools.itineraries）。
+
+    表是新建的，或者触发器丢失（例如 pandas 重写了源表）时，从源表整体重建。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+
+    返回:
+        bool: 物化行程是否可用；缺少源表时返回 False，工具回退到实时连接。
+    """
+    tables = _existing_tables(conn)
+    if not set(SOURCE_TABLES) <= tables:
+        return False
+    triggers = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    }
+    conn.execute(ITINERARIES_SCHEMA)
+    for trigger_name, body in ITINERARY_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {body}")
+    if "passenger_itineraries" not in tables or not set(ITINERARY_TRIGGERS) <= triggers:
+        rebuild_itineraries(conn)
+    conn.commit()
+    return True
+
+
+def ensure_occupancy(conn: sqlite3.Connection) -> bool:
+    """
+    创建按航班、舱位汇总的座位占用计数表 flight_occupancy 及其触发器（见 tools.occupancy）。
+
+    表是新建的，或者触发器丢失时，从源表整体重建。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+
+    返回:
+        bool: 占用计数是否可用；缺少源表时返回 False，余座查询回退到实时汇总。
+    """
+    tables = _existing_tables(conn)
+    if not set(OCCUPANCY_SOURCE_TABLES) <= tables:
+        return False
+    triggers = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    }
+    conn.execute(OCCUPANCY_SCHEMA)
+    for trigger_name, body in OCCUPANCY_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {body}")
+    if "flight_occupancy" not in tables or not set(OCCUPANCY_TRIGGERS) <= triggers:
+        rebuild_occupancy(conn)
+    conn.commit()
+    return True
+
+
+def ensure_flights_version(conn: sqlite3.Connection) -> bool:
+    """
+    创建 flights 的变化计数表 flights_version 及其触发器（见 tools.route_index）。
+
+    触发器是新建的（之前丢失期间的修改没有被计数）时增加 modified，让航线索引整体重建一次。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+
+    返回:
+        bool: 变化计数是否可用；没有 flights 表时返回 False，航线索引回退到聚合比较。
+    """
+    if "flights" not in _existing_tables(conn):
+        return False
+    triggers = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    }
+    conn.execute(FLIGHTS_VERSION_SCHEMA)
+    conn.execute("INSERT OR IGNORE INTO flights_version (id) VALUES (1)")
+    for trigger_name, body in FLIGHTS_VERSION_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {body}")
+    if not set(FLIGHTS_VERSION_TRIGGERS) <= triggers:
+        conn.execute("UPDATE flights_version SET modified = modified + 1")
+    conn.commit()
+    return True
+
+
+def ensure_airport_cities(conn: sqlite3.Connection) -> int:
+    """
+    根据 airports_data 和地名表重建机场与城市的对应表 airport_cities（见 tools.airports）。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+
+    返回:
+        int: 写入的机场数量。
+    """
+    rows = airport_city_rows(conn)
+    conn.execute(AIRPORT_CITIES_SCHEMA)
+    conn.execute("DELETE FROM airport_cities")
+    conn.executemany("INSERT INTO airport_cities VALUES (?, ?)", sorted(rows.items()))
+    conn.commit()
+    return len(rows)
+
+
+def drop_derived_objects(conn: sqlite3.Connection, tables: set[str]) -> list[str]:
+    """
+    删除建在这些表上、并且会由 provision_travel_db 重建的索引和触发器。
+
+    批量写入大量行之前调用，写入时不再逐行维护索引、时间戳列、全文索引和物化行程；写完后执行
+    provision_travel_db，它会重建索引、回填时间戳，并在发现触发器缺失时整体重建 FTS5 影子表、
+    passenger_itineraries 和 flight_occupancy。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+        tables (set[str]): 即将批量写入的表。
+
+    返回:
+        list[str]: 被删除的索引和触发器名。
+    """
+    derived = {
+        "index": set(TRAVEL_INDEXES),
+        "trigger": set(ITINERARY_TRIGGERS) | set(OCCUPANCY_TRIGGERS) | set(FLIGHTS_VERSION_TRIGGERS),
+    }
+    for table, columns in FTS_TABLES.items():
+        derived["trigger"] |= set(_fts_triggers(table, columns))
+    for table in EPOCH_COLUMNS:
+        derived["trigger"] |= set(epoch_triggers(table))
+    dropped = []
+    rows = conn.execute(
+        "SELECT type, name, tbl_name FROM sqlite_master WHERE type IN ('index', 'trigger')"
+    ).fetchall()
+    for object_type, name, table in rows:
+        if table in tables and name in derived[object_type]:
+            conn.execute(f"DROP {object_type.upper()} {name}")
+            dropped.append(name)
+    conn.commit()
+    return dropped
+
+
+def provision_travel_db(conn: Optional[sqlite3.Connection] = None) -> bool:
+    """
+    执行旅行数据库的全部准备步骤。
+
+    参数:
+        conn (Optional[sqlite3.Connection]): 要准备的数据库连接；为 None 时使用工具连接池。
+
+    返回:
+        bool: 是否执行了准备步骤（数据库文件不存在时返回 False）。
+    """
+    if conn is not None:
+        # 先补充时间戳列以及 reservations、airport_cities、passenger_itineraries 表，索引建在这些列和表上
+        ensure_epoch_columns(conn)
+        ensure_inventory(conn)
+        ensure_airport_cities(conn)
+        ensure_itineraries(conn)
+        ensure_occupancy(conn)
+        ensure_flights_version(conn)
+        ensure_indexes(conn)
+        ensure_fts(conn)
+        return True
+
+    database = get_pool().database
+    if not Path(database).exists():
+        # 不要让 sqlite3 在这里创建一个空数据库文件
+        logger.warning("travel database %s not found, skipping provisioning", database)
+        return False
+    with get_connection() as pooled:
+        provision_travel_db(pooled)
+    return True
+
+
+if __name__ == '__main__':
+    provision_travel_db()
@@ -9,6 +9,8 @@ import numpy as np
 from langchain_core.tools import tool
 from langchain_openai import OpenAIEmbeddings
 
+from tools.async_tools import async_variant
+
 # 得到项目所在绝对路径
 basic_dir = Path(__file__).resolve().parent.parent
 
@@ -98,6 +100,7 @@ def _get_retriever() -> VectorStoreRetriever:
 
 
 # 定义工具函数，用于查询航空公司的政策
+@async_variant
 @tool
 def lookup_policy(query: str) -> str:
     """查询公司政策，检查某些选项是否允许。
@@ -0,0 +1,258 @@
+"""
+多段航线（中转）搜索使用的内存时间展开索引。
+
+每个机场保存一份按起飞时间排序的出发航班列表，搜索时从出发机场开始，
+只沿“到达时间 + 最短中转时间”之后起飞的航班扩展，按到达时间从早到晚给出前 k 条航线。
+
+索引在首次搜索时从 flights 表构建；之后每次搜索前只读取新增的航班并插入到对应机场的列表中，
+已有航班被修改（例如 update_dates 平移日期）时才整体重建。准备过的数据库由触发器在 flights_version
+中维护插入和修改计数，判断有没有变化只需一次主键查找；否则对已加载的行做一次聚合比较。
+"""
+import heapq
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from typing import Optional
+
+from tools import on_database_reset
+from tools.timestamps import epoch_columns_available, timestamp_epoch
+
+# 不参与中转搜索的航班状态
+EXCLUDED_STATUSES = ("Cancelled",)
+
+# flights 的变化计数（只有一行）：插入航班增加 inserted，删除或修改索引用到的列增加 modified
+FLIGHTS_VERSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS flights_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    inserted INTEGER NOT NULL DEFAULT 0,
+    modified INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+# 时间戳列由 flights 上的其他触发器根据时间文本计算，不单独计入
+_INDEXED_COLUMNS = (
+    "flight_id", "flight_no", "departure_airport", "arrival_airport",
+    "scheduled_departure", "scheduled_arrival", "status",
+)
+
+FLIGHTS_VERSION_TRIGGERS = {
+    "flights_version_ai": (
+        "AFTER INSERT ON flights BEGIN UPDATE flights_version SET inserted = inserted + 1; END"
+    ),
+    "flights_version_ad": (
+        "AFTER DELETE ON flights BEGIN UPDATE flights_version SET modified = modified + 1; END"
+    ),
+    "flights_version_au": (
+        f"AFTER UPDATE OF {', '.join(_INDEXED_COLUMNS)} ON flights "
+        f"BEGIN UPDATE flights_version SET modified = modified + 1; END"
+    ),
+}
+
+
+@dataclass(frozen=True, order=True)
+class FlightLeg:
+    """时间展开索引中的一个航班；按 (起飞时间, flight_id) 排序。"""
+
+    departure_epoch: float
+    flight_id: int
+    arrival_epoch: float
+    flight_no: str
+    departure_airport: str
+    arrival_airport: str
+    scheduled_departure: str
+    scheduled_arrival: str
+
+    def as_dict(self) -> dict:
+        return {
+            "flight_id": self.flight_id,
+            "flight_no": self.flight_no,
+            "departure_airport": self.departure_airport,
+            "arrival_airport": self.arrival_airport,
+            "scheduled_departure": self.scheduled_departure,
+            "scheduled_arrival": self.scheduled_arrival,
+        }
+
+
+class FlightRouteIndex:
+    """
+    按机场组织的航班时间展开索引，线程安全。
+    """
+
+    def __init__(self):
+        self._departures: dict[str, list[FlightLeg]] = {}
+        self._lock = threading.Lock()
+        # 已加载的最大 rowid，以及这些行的校验值（行数、时间总和），用于判断能否只做增量加载
+        self._max_rowid = 0
+        self._signature: Optional[tuple] = None
+        self.rebuilds = 0
+
+    def _reset(self) -> None:
+        self._departures = {}
+        self._max_rowid = 0
+        self._signature = None
+        self.rebuilds += 1
+
+    def invalidate(self) -> None:
+        """下次搜索前整体重建索引（数据库被整体替换时调用）。"""
+        with self._lock:
+            self._signature = None
+
+    def _load_sql(self, conn: sqlite3.Connection) -> str:
+        # 准备过的数据库直接读取 UTC 时间戳列，否则在 Python 中解析时间文本
+        if epoch_columns_available(conn):
+            times = "scheduled_departure_epoch, scheduled_arrival_epoch"
+        else:
+            times = "NULL, NULL"
+        return (
+            f"SELECT rowid, flight_id, flight_no, departure_airport, arrival_airport, "
+            f"scheduled_departure, scheduled_arrival, {times}, status FROM flights WHERE rowid > ?"
+        )
+
+    def _version(self, conn: sqlite3.Connection) -> Optional[tuple]:
+        # 触发器维护的 (inserted, modified)；没有准备过或触发器丢失（计数不再可信）时返回 None
+        placeholders = ", ".join("?" for _ in FLIGHTS_VERSION_TRIGGERS)
+        triggers = conn.execute(
+            f"SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})",
+            tuple(FLIGHTS_VERSION_TRIGGERS),
+        ).fetchone()[0]
+        if triggers != len(FLIGHTS_VERSION_TRIGGERS):
+            return None
+        return conn.execute("SELECT inserted, modified FROM flights_version WHERE id = 1").fetchone()
+
+    def _prefix_signature(self, conn: sqlite3.Connection) -> tuple:
+        # 一次聚合即可发现已加载行的增删、改期（包括整体平移）和取消
+        aggregates = "count(*), min(scheduled_departure), max(scheduled_departure)"
+        if epoch_columns_available(conn):
+            aggregates += ", total(scheduled_departure_epoch), total(scheduled_arrival_epoch)"
+        placeholders = ", ".join("?" for _ in EXCLUDED_STATUSES)
+        return conn.execute(
+            f"SELECT {aggregates}, total(status IN ({placeholders})) FROM flights WHERE rowid <= ?",
+            (*EXCLUDED_STATUSES, self._max_rowid),
+        ).fetchone()
+
+    def _add_rows(self, rows: list[tuple]) -> None:
+        for row in rows:
+            rowid, flight_id, flight_no, origin, destination, departure, arrival = row[:7]
+            dep_epoch, arr_epoch, status = row[7:]
+            self._max_rowid = max(self._max_rowid, rowid)
+            if status in EXCLUDED_STATUSES:
+                continue
+            if dep_epoch is None:
+                dep_epoch = timestamp_epoch(departure)
+            if arr_epoch is None:
+                arr_epoch = timestamp_epoch(arrival)
+            if dep_epoch is None or arr_epoch is None:
+                continue
+            leg = FlightLeg(
+                dep_epoch, flight_id, arr_epoch, flight_no, origin, destination, departure, arrival
+            )
+            insort(self._departures.setdefault(origin, []), leg)
+
+    def refresh(self, conn: sqlite3.Connection) -> None:
+        """
+        让索引与 flights 表保持一致：已加载的行没有变化时只加载新增的行，否则整体重建。
+
+        参数:
+            conn (sqlite3.Connection): 旅行数据库连接。
+        """
+        with self._lock:
+            version = self._version(conn)
+            if version is not None:
+                signature = ("version", *version)
+                if signature == self._signature:
+                    return
+                # 只有插入时增量加载；修改计数变化（或之前按聚合比较）时整体重建
+                if self._signature is None or self._signature[0] != "version" or self._signature[2] != version[1]:
+                    self._reset()
+            elif self._signature is None or self._prefix_signature(conn) != self._signature:
+                self._reset()
+            rows = conn.execute(self._load_sql(conn), (self._max_rowid,)).fetchall()
+            if version is not None:
+                self._add_rows(rows)
+                self._signature = signature
+            elif rows or self._signature is None:
+                self._add_rows(rows)
+                self._signature = self._prefix_signature(conn)
+
+    def departures(self, airport: str, earliest: float, latest: float) -> list[FlightLeg]:
+        """返回从 airport 出发、起飞时间在 [earliest, latest] 之间的航班（已按起飞时间排序）。"""
+        legs = self._departures.get(airport, [])
+        start = bisect_left(legs, earliest, key=lambda leg: leg.departure_epoch)
+        selected = []
+        for leg in legs[start:]:
+            if leg.departure_epoch > latest:
+                break
+            selected.append(leg)
+        return selected
+
+    def search(
+            self,
+            origin: str,
+            destination: str,
+            earliest_departure: float,
+            max_legs: int = 3,
+            min_connection: float = 45 * 60,
+            max_layover: float = 24 * 3600,
+            departure_window: float = 24 * 3600,
+            top_k: int = 5,
+    ) -> list[list[FlightLeg]]:
+        """
+        按到达时间从早到晚搜索前 top_k 条航线。
+
+        参数:
+            origin (str): 出发机场。
+            destination (str): 到达机场。
+            earliest_departure (float): 第一段航班最早的起飞时间（UTC 时间戳）。
+            max_legs (int): 最多乘坐的航段数。
+            min_connection (float): 最短中转时间（秒）。
+            max_layover (float): 最长中转等待时间（秒）。
+            departure_window (float): 第一段航班起飞时间的搜索范围（秒）。
+            top_k (int): 最多返回的航线数量。
+
+        返回:
+            list[list[FlightLeg]]: 航线列表，每条航线是按顺序乘坐的航班。
+        """
+        with self._lock:
+            results: list[list[FlightLeg]] = []
+            # 用相同段数到达同一机场、已经扩展过的路径的到达时间（出堆顺序即到达时间顺序）。
+            # 某个后续航班已能被 top_k 条更早到达的路径衔接时，更晚到达的路径经它得到的航线不可能进入前 k 名；
+            # 只能由更晚到达的路径衔接的航班（超出了更早路径的最长中转等待）仍然要扩展。
+            # 段数更少的路径剩余可用的航段更多，不能被段数更多的路径剪掉，因此按 (机场, 段数) 分别记录
+            expanded: dict[tuple[str, int], list[float]] = {}
+            heap: list[tuple[float, int, int, tuple[FlightLeg, ...]]] = []
+            sequence = 0
+            for leg in self.departures(origin, earliest_departure, earliest_departure + departure_window):
+                heap.append((leg.arrival_epoch, 1, sequence, (leg,)))
+                sequence += 1
+            heapq.heapify(heap)
+
+            while heap and len(results) < top_k:
+                arrival, legs, _, path = heapq.heappop(heap)
+                airport = path[-1].arrival_airport
+                if airport == destination:
+                    results.append(list(path))
+                    continue
+                if legs >= max_legs:
+                    continue
+                earlier = expanded.setdefault((airport, legs), [])
+                visited = {origin} | {leg.arrival_airport for leg in path}
+                for leg in self.departures(airport, arrival + min_connection, arrival + max_layover):
+                    if leg.arrival_airport in visited:
+                        continue
+                    # 能衔接这个航班的更早路径：到达时间在 [起飞 - 最长等待, 起飞 - 最短中转] 之间
+                    covered = (
+                        bisect_right(earlier, leg.departure_epoch - min_connection)
+                        - bisect_left(earlier, leg.departure_epoch - max_layover)
+                    )
+                    if covered >= top_k:
+                        continue
+                    heapq.heappush(heap, (leg.arrival_epoch, legs + 1, sequence, path + (leg,)))
+                    sequence += 1
+                earlier.append(arrival)
+            return results
+
+
+# 进程内共享的航线索引
+route_index = FlightRouteIndex()
+on_database_reset(route_index.invalidate)
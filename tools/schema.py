@@ -0,0 +1,61 @@
+"""
+旅行数据库各张原始表的结构，与随项目分发的 travel2.sqlite 一致。
+
+准备步骤（tools.provision）补充的列和表（时间戳列、capacity、reservations、passenger_itineraries 等）
+不在这里，由 provision_travel_db 在建表之后添加。
+"""
+import sqlite3
+
+# 表名 -> ((列名, 类型), ...)，列的顺序即 travel2.sqlite 中的顺序
+TRAVEL_TABLES: dict[str, tuple[tuple[str, str], ...]] = {
+    "aircrafts_data": (("aircraft_code", "TEXT"), ("model", "TEXT"), ("range", "INTEGER")),
+    "airports_data": (
+        ("airport_code", "TEXT"), ("airport_name", "TEXT"), ("city", "TEXT"),
+        ("coordinates", "TEXT"), ("timezone", "TEXT"),
+    ),
+    "boarding_passes": (
+        ("ticket_no", "TEXT"), ("flight_id", "INTEGER"), ("boarding_no", "INTEGER"), ("seat_no", "TEXT"),
+    ),
+    "bookings": (("book_ref", "TEXT"), ("book_date", "TIMESTAMP"), ("total_amount", "INTEGER")),
+    "flights": (
+        ("flight_id", "INTEGER"), ("flight_no", "TEXT"), ("scheduled_departure", "TIMESTAMP"),
+        ("scheduled_arrival", "TIMESTAMP"), ("departure_airport", "TEXT"), ("arrival_airport", "TEXT"),
+        ("status", "TEXT"), ("aircraft_code", "TEXT"), ("actual_departure", "TIMESTAMP"),
+        ("actual_arrival", "TIMESTAMP"),
+    ),
+    "seats": (("aircraft_code", "TEXT"), ("seat_no", "TEXT"), ("fare_conditions", "TEXT")),
+    "ticket_flights": (
+        ("ticket_no", "TEXT"), ("flight_id", "INTEGER"), ("fare_conditions", "TEXT"), ("amount", "REAL"),
+    ),
+    "tickets": (("ticket_no", "TEXT"), ("book_ref", "TEXT"), ("passenger_id", "TEXT")),
+    "car_rentals": (
+        ("id", "INTEGER"), ("name", "TEXT"), ("location", "TEXT"), ("price_tier", "TEXT"),
+        ("start_date", "TEXT"), ("end_date", "TEXT"), ("booked", "INTEGER"),
+    ),
+    "hotels": (
+        ("id", "INTEGER"), ("name", "TEXT"), ("location", "TEXT"), ("price_tier", "TEXT"),
+        ("checkin_date", "TEXT"), ("checkout_date", "TEXT"), ("booked", "INTEGER"),
+    ),
+    "trip_recommendations": (
+        ("id", "INTEGER"), ("name", "TEXT"), ("location", "TEXT"), ("keywords", "TEXT"),
+        ("details", "TEXT"), ("booked", "INTEGER"),
+    ),
+}
+
+
+def table_columns(table: str) -> tuple[str, ...]:
+    """返回原始表的列名。"""
+    return tuple(column for column, _ in TRAVEL_TABLES[table])
+
+
+def create_travel_tables(conn: sqlite3.Connection, tables: tuple[str, ...] = ()) -> None:
+    """
+    创建还不存在的原始表（不提交事务）。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+        tables (tuple[str, ...]): 要创建的表，默认为全部原始表。
+    """
+    for table in tables or tuple(TRAVEL_TABLES):
+        columns = ", ".join(f"{column} {column_type}" for column, column_type in TRAVEL_TABLES[table])
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
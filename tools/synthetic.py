@@ -0,0 +1,343 @@
+"""
+生成与 travel2.sqlite 结构相同、规模可调的合成旅行数据库，用于压测。
+
+随项目分发的样例数据库很小，LIKE 扫描、多表连接和不分页的结果集在这个规模下看不出代价。
+generate_travel_db 按 DatasetSpec 给出的机场、航班、乘客、酒店、租车和旅行推荐数量生成数据，
+同样的规模和随机种子总是生成完全相同的数据库；每张表使用独立的随机数序列，只调整酒店数量时
+航班和机票数据保持不变。
+
+- 机场先取地名表（tools/gazetteer.json）中的真实机场和城市，不够时补充合成的机场代码和城市；
+  酒店、租车和旅行推荐位于这些城市中，可以按机场代码搜索；
+- 航班分布在 anchor 前后 days 天内，anchor 之前起飞的航班已到达并带有实际起降时间；
+- 每个乘客有 1~2 张机票，每张机票 1~3 个航段；座位取自机型的座位表，同一航班的座位不重复，
+  舱位与 seats 表一致，每个航段都有登机牌。
+
+生成的时间以 anchor 为准，--rebase 会像 update_dates 一样把时间平移到当前时间附近。
+
+用法:
+    python -m tools.synthetic /tmp/travel_x100.sqlite --scale 100 [--seed 7] [--rebase]
+    python -m tools.synthetic /tmp/flights.sqlite --flights 1000000 --passengers 500000
+"""
+import argparse
+import itertools
+import random
+import sqlite3
+import string
+from contextlib import closing
+from dataclasses import dataclass, fields, replace
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+from tools.gazetteer import default_gazetteer
+from tools.init_db import rebase_dates
+from tools.provision import provision_travel_db
+from tools.schema import TRAVEL_TABLES, create_travel_tables
+
+# 默认的时间基准，生成结果不依赖于执行时间
+DEFAULT_ANCHOR = datetime(2024, 4, 20, tzinfo=timezone.utc)
+
+_NULL_TIMESTAMP = "\\N"
+
+# 机型代码 -> (型号, 航程, ((舱位, 排数), ...), 每排座位字母)
+AIRCRAFTS = {
+    "773": ("Boeing 777-300", 11100, (("Business", 5), ("Comfort", 4), ("Economy", 40)), "ACDEFGHK"),
+    "763": ("Boeing 767-300", 7900, (("Business", 5), ("Economy", 30)), "ABCDEFGH"),
+    "SU9": ("Sukhoi Superjet-100", 3000, (("Business", 3), ("Economy", 20)), "ACDEF"),
+    "320": ("Airbus A320-200", 5700, (("Business", 5), ("Economy", 20)), "ABCDEF"),
+    "321": ("Airbus A321-200", 5600, (("Business", 7), ("Economy", 22)), "ABCDEF"),
+    "319": ("Airbus A319-100", 6700, (("Business", 5), ("Economy", 17)), "ABCDEF"),
+    "733": ("Boeing 737-300", 4200, (("Business", 3), ("Economy", 20)), "ABCDEF"),
+    "CN1": ("Cessna 208 Caravan", 1200, (("Economy", 6),), "AB"),
+    "CR2": ("Bombardier CRJ-200", 2700, (("Economy", 13),), "ABCD"),
+}
+
+# 舱位 -> 票价范围
+FARES = {"Economy": (3000, 20000), "Comfort": (15000, 45000), "Business": (30000, 100000)}
+
+HOTEL_BRANDS = ("Hilton", "Marriott", "Hyatt Regency", "Radisson Blu", "Best Western", "Holiday Inn")
+HOTEL_TIERS = ("Midscale", "Upper Midscale", "Upscale", "Upper Upscale", "Luxury")
+CAR_COMPANIES = ("Europcar", "Avis", "Hertz", "Sixt", "Enterprise", "Budget")
+CAR_TIERS = ("Economy", "Midsize", "Premium", "Luxury")
+TRIP_KINDS = ("Old Town", "Museum", "Cathedral", "Lake Cruise", "Food Market", "Castle")
+TRIP_KEYWORDS = (
+    "history", "art", "museum", "architecture", "food", "nature", "lake", "shopping", "landmark",
+    "bridge", "castle", "wine", "hiking", "music",
+)
+TIMEZONES = ("Europe/Zurich", "Europe/Paris", "Europe/London", "Asia/Shanghai", "America/New_York")
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """合成数据库的规模。"""
+
+    airports: int = 100
+    flights: int = 10000
+    passengers: int = 10000
+    hotels: int = 10
+    car_rentals: int = 10
+    trip_recommendations: int = 10
+    days: int = 60
+
+    def scaled(self, factor: float) -> "DatasetSpec":
+        """把各表的数量乘以 factor（时间跨度 days 不变，机场数不超过三字母代码的上限）。"""
+        counts = {
+            field.name: max(1, round(getattr(self, field.name) * factor))
+            for field in fields(self)
+            if field.name != "days"
+        }
+        counts["airports"] = min(max(counts["airports"], 2), 26 ** 3)
+        return replace(self, **counts)
+
+
+def passenger_id(index: int) -> str:
+    """第 index 个合成乘客的乘客 ID，格式与样例数据相同。"""
+    return f"{index // 1000000:04d} {index % 1000000:06d}"
+
+
+def _timestamp(value: datetime) -> str:
+    return value.isoformat(sep=" ", timespec="microseconds")
+
+
+def _rng(seed: int, table: str) -> random.Random:
+    # 每张表独立的随机数序列
+    return random.Random(f"{seed}:{table}")
+
+
+def _seat_map(aircraft_code: str) -> list[tuple[str, str]]:
+    _, _, cabins, letters = AIRCRAFTS[aircraft_code]
+    seats, row = [], 1
+    for fare_conditions, rows in cabins:
+        for _ in range(rows):
+            seats.extend((f"{row}{letter}", fare_conditions) for letter in letters)
+            row += 1
+    return seats
+
+
+def _airports(spec: DatasetSpec, rng: random.Random) -> list[tuple]:
+    rows: list[tuple] = []
+    for place in sorted(default_gazetteer().places, key=lambda place: place.name):
+        for code in place.airports:
+            rows.append((code, f"{place.name} {code}", place.name))
+    rows = rows[:spec.airports]
+    used = {row[0] for row in rows}
+    codes = ("".join(letters) for letters in itertools.product(string.ascii_uppercase, repeat=3))
+    synthetic = (code for code in codes if code not in used)
+    for index in range(len(rows), spec.airports):
+        code = next(synthetic)
+        rows.append((code, f"{code} International", f"City {index:05d}"))
+    return [
+        (
+            code, name, city,
+            f"({rng.uniform(-180, 180):.4f},{rng.uniform(-60, 70):.4f})",
+            rng.choice(TIMEZONES),
+        )
+        for code, name, city in rows
+    ]
+
+
+def _flights(spec: DatasetSpec, airports: list[str], anchor: datetime, rng: random.Random) -> Iterable[tuple]:
+    window = spec.days * 24 * 60
+    first_departure = anchor - timedelta(minutes=window // 2)
+    aircraft_codes = sorted(AIRCRAFTS)
+    for flight_id in range(1, spec.flights + 1):
+        departure_airport, arrival_airport = rng.sample(airports, 2)
+        departure = first_departure + timedelta(minutes=rng.randrange(window) // 5 * 5)
+        arrival = departure + timedelta(minutes=rng.randrange(50, 600, 5))
+        if departure < anchor:
+            delay = timedelta(minutes=rng.randrange(0, 40))
+            status, actual = "Arrived", (_timestamp(departure + delay), _timestamp(arrival + delay))
+        else:
+            status, actual = "Scheduled", (_NULL_TIMESTAMP, _NULL_TIMESTAMP)
+        yield (
+            flight_id, f"PG{flight_id:04d}", _timestamp(departure), _timestamp(arrival),
+            departure_airport, arrival_airport, status, rng.choice(aircraft_codes), *actual,
+        )
+
+
+def _insert(conn: sqlite3.Connection, table: str, rows: Iterable[tuple], chunk_size: int) -> int:
+    placeholders = ", ".join("?" for _ in TRAVEL_TABLES[table])
+    rows = iter(rows)
+    count = 0
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", chunk)
+        count += len(chunk)
+    return count
+
+
+def _bookings(
+        conn: sqlite3.Connection,
+        spec: DatasetSpec,
+        flight_aircraft: list[str],
+        anchor: datetime,
+        rng: random.Random,
+        chunk_size: int,
+) -> dict[str, int]:
+    seat_maps = {code: _seat_map(code) for code in AIRCRAFTS}
+    # 每个航班已经分配出去的座位数，下一个乘客取座位表中的下一个座位
+    occupied = [0] * len(flight_aircraft)
+    # 还有空座的航班，只从这里抽样；航班坐满后移出，不会生成没有航段、总价为 0 的机票
+    open_flights = [index for index, code in enumerate(flight_aircraft) if seat_maps[code]]
+    counts = dict.fromkeys(("bookings", "tickets", "ticket_flights", "boarding_passes"), 0)
+    rows: dict[str, list[tuple]] = {table: [] for table in counts}
+    ticket_index = 0
+
+    def flush() -> None:
+        for table, table_rows in rows.items():
+            counts[table] += _insert(conn, table, table_rows, chunk_size)
+            table_rows.clear()
+
+    for index in range(spec.passengers):
+        for _ in range(rng.randint(1, 2)):
+            if not open_flights:
+                break
+            ticket_index += 1
+            ticket_no, book_ref = f"{ticket_index:013d}", f"{ticket_index:06X}"
+            total = 0
+            positions = rng.sample(range(len(open_flights)), min(rng.randint(1, 3), len(open_flights)))
+            for position in positions:
+                flight_index = open_flights[position]
+                seats = seat_maps[flight_aircraft[flight_index]]
+                seat_no, fare_conditions = seats[occupied[flight_index]]
+                occupied[flight_index] += 1
+                amount = rng.randrange(*FARES[fare_conditions], 100)
+                total += amount
+                flight_id = flight_index + 1
+                rows["ticket_flights"].append((ticket_no, flight_id, fare_conditions, float(amount)))
+                rows["boarding_passes"].append((ticket_no, flight_id, occupied[flight_index], seat_no))
+            # 从后往前移除坐满的航班，交换删除不会影响还没处理的位置
+            for position in sorted(positions, reverse=True):
+                flight_index = open_flights[position]
+                if occupied[flight_index] >= len(seat_maps[flight_aircraft[flight_index]]):
+                    open_flights[position] = open_flights[-1]
+                    open_flights.pop()
+            book_date = anchor - timedelta(days=rng.randrange(1, spec.days + 30), minutes=rng.randrange(1440))
+            rows["bookings"].append((book_ref, _timestamp(book_date), total))
+            rows["tickets"].append((ticket_no, book_ref, passenger_id(index)))
+        if len(rows["ticket_flights"]) >= chunk_size:
+            flush()
+    flush()
+    return counts
+
+
+def _catalog(
+        spec: DatasetSpec, table: str, cities: list[str], anchor: datetime, rng: random.Random
+) -> Iterable[tuple]:
+    for item_id in range(1, getattr(spec, table) + 1):
+        city = rng.choice(cities)
+        start = anchor + timedelta(days=rng.randrange(-spec.days // 2, spec.days // 2))
+        end = start + timedelta(days=rng.randint(1, 10))
+        dates = (start.date().isoformat(), end.date().isoformat())
+        if table == "hotels":
+            yield item_id, f"{rng.choice(HOTEL_BRANDS)} {city}", city, rng.choice(HOTEL_TIERS), *dates, 0
+        elif table == "car_rentals":
+            yield item_id, rng.choice(CAR_COMPANIES), city, rng.choice(CAR_TIERS), *dates, 0
+        else:
+            kind = rng.choice(TRIP_KINDS)
+            keywords = ", ".join(rng.sample(TRIP_KEYWORDS, 3))
+            yield item_id, f"{city} {kind}", city, keywords, f"Visit the {kind.lower()} of {city}.", 0
+
+
+def generate_travel_db(
+        path: str | Path,
+        spec: DatasetSpec = DatasetSpec(),
+        seed: int = 7,
+        anchor: datetime = DEFAULT_ANCHOR,
+        chunk_size: int = 50000,
+        provision: bool = True,
+) -> dict[str, int]:
+    """
+    生成一个合成旅行数据库。
+
+    参数:
+        path (str | Path): 数据库文件路径，文件必须还不存在。
+        spec (DatasetSpec): 各表的规模。
+        seed (int): 随机种子。
+        anchor (datetime): 时间基准，之前起飞的航班为已到达。
+        chunk_size (int): 每次 executemany 写入的行数。
+        provision (bool): 生成后执行 provision_travel_db（索引、全文索引、物化行程等）。
+
+    返回:
+        dict[str, int]: 表名 -> 行数。
+    """
+    path = Path(path)
+    if path.exists():
+        raise ValueError(f"{path} 已经存在，合成数据库只写入新文件")
+    counts: dict[str, int] = {}
+    with closing(sqlite3.connect(path)) as conn:
+        # 新文件可以重新生成，写入时不需要持久化保证
+        conn.execute("PRAGMA journal_mode = off")
+        conn.execute("PRAGMA synchronous = off")
+        with conn:
+            create_travel_tables(conn)
+            counts["aircrafts_data"] = _insert(
+                conn, "aircrafts_data",
+                ((code, model, distance) for code, (model, distance, _, _) in AIRCRAFTS.items()),
+                chunk_size,
+            )
+            counts["seats"] = _insert(
+                conn, "seats",
+                ((code, seat_no, fare) for code in AIRCRAFTS for seat_no, fare in _seat_map(code)),
+                chunk_size,
+            )
+            airports = _airports(spec, _rng(seed, "airports_data"))
+            counts["airports_data"] = _insert(conn, "airports_data", airports, chunk_size)
+
+            codes = [row[0] for row in airports]
+            flight_rng = _rng(seed, "flights")
+            flight_aircraft: list[str] = []
+
+            def flights() -> Iterable[tuple]:
+                for row in _flights(spec, codes, anchor, flight_rng):
+                    flight_aircraft.append(row[7])
+                    yield row
+
+            counts["flights"] = _insert(conn, "flights", flights(), chunk_size)
+            counts.update(
+                _bookings(conn, spec, flight_aircraft, anchor, _rng(seed, "tickets"), chunk_size)
+            )
+            cities = sorted({row[2] for row in airports})
+            for table in ("hotels", "car_rentals", "trip_recommendations"):
+                rows = _catalog(spec, table, cities, anchor, _rng(seed, table))
+                counts[table] = _insert(conn, table, rows, chunk_size)
+        conn.execute("PRAGMA journal_mode = delete")
+        if provision:
+            provision_travel_db(conn)
+    return counts
+
+
+def rebase(path: str | Path, now: Optional[datetime] = None) -> float:
+    """把合成数据库的时间平移到 now（默认为当前时间）附近，返回平移的秒数。"""
+    with closing(sqlite3.connect(path)) as conn:
+        return rebase_dates(conn, now)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="生成规模可调的合成旅行数据库")
+    parser.add_argument("path", help="输出的数据库文件（必须还不存在）")
+    parser.add_argument("--scale", type=float, default=1.0, help="把默认规模乘以这个倍数")
+    parser.add_argument("--seed", type=int, default=7, help="随机种子")
+    for field in fields(DatasetSpec):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=int, help=f"覆盖 {field.name} 的数量")
+    parser.add_argument("--rebase", action="store_true", help="把时间平移到当前时间附近（同 update_dates）")
+    parser.add_argument("--no-provision", action="store_true", help="不执行 provision_travel_db")
+    args = parser.parse_args()
+
+    overrides = {
+        field.name: getattr(args, field.name)
+        for field in fields(DatasetSpec)
+        if getattr(args, field.name) is not None
+    }
+    spec = replace(DatasetSpec().scaled(args.scale), **overrides)
+    try:
+        counts = generate_travel_db(args.path, spec, args.seed, provision=not args.no_provision)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.rebase:
+        rebase(args.path)
+    for table, count in counts.items():
+        print(f"{table}: {count}")
+
+
+if __name__ == "__main__":
+    main()
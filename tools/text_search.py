@@ -0,0 +1,112 @@
+"""
+基于 SQLite FTS5 的酒店、租车和旅行推荐全文检索。
+
+每个目录表都有一张外部内容（external content）FTS5 影子表，由触发器保持同步。
+LIKE '%x%' 需要扫描整张表，而 MATCH 只访问命中的行，查询耗时取决于命中数量而不是目录大小。
+"""
+import re
+import sqlite3
+from typing import Optional
+
+# 表名 -> 参与全文检索的列
+FTS_TABLES = {
+    "hotels": ("name", "location"),
+    "car_rentals": ("name", "location"),
+    "trip_recommendations": ("name", "location", "keywords"),
+}
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_table(table: str) -> str:
+    """返回目录表对应的 FTS5 影子表名。"""
+    return f"{table}_fts"
+
+
+def fts_available(conn: sqlite3.Connection, table: str) -> bool:
+    """判断数据库中是否已经为该表建好了 FTS5 影子表（见 tools.provision.ensure_fts）。"""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table(table),)
+    ).fetchone()
+    return row is not None
+
+
+def _terms(text: str) -> list[str]:
+    # 每个词按前缀匹配，并用双引号转义，避免用户输入被解析成 FTS5 语法
+    return ['"' + token.replace('"', '""') + '"*' for token in _TOKEN_PATTERN.findall(text)]
+
+
+def build_match_expression(
+        all_of: dict[str, Optional[str]],
+        any_of: Optional[dict[str, list[str]]] = None,
+) -> Optional[str]:
+    """
+    构造 FTS5 MATCH 表达式。
+
+    参数:
+        all_of (dict[str, Optional[str]]): 列名 -> 文本，该列必须包含文本中的所有词。
+        any_of (Optional[dict[str, list[str]]]): 列名 -> 候选文本列表，该列包含其中任意一个即可。
+
+    返回:
+        Optional[str]: MATCH 表达式；没有任何可检索的词，或某个条件无法表达为检索词（例如只有标点）时
+        返回 None，以免静默丢掉这个条件。
+    """
+    clauses = []
+    for column, text in all_of.items():
+        if not text:
+            continue
+        terms = _terms(text)
+        if not terms:
+            return None
+        clauses.append(f"{column} : ({' AND '.join(terms)})")
+    for column, candidates in (any_of or {}).items():
+        alternatives = []
+        for candidate in candidates:
+            terms = _terms(candidate)
+            if terms:
+                alternatives.append(f"({' AND '.join(terms)})")
+        if not alternatives:
+            if any(candidate.strip() for candidate in candidates):
+                return None
+            continue
+        clauses.append(f"{column} : ({' OR '.join(alternatives)})")
+    if not clauses:
+        return None
+    return " AND ".join(clauses)
+
+
+def fts_search_query(
+        conn: sqlite3.Connection,
+        table: str,
+        all_of: dict[str, Optional[str]],
+        any_of: Optional[dict[str, list[str]]] = None,
+        conditions: Optional[list[tuple[str, list]]] = None,
+) -> Optional[tuple[str, list]]:
+    """
+    生成按相关度（bm25）排序的全文检索 SQL。
+
+    参数:
+        conn (sqlite3.Connection): 旅行数据库连接。
+        table (str): 目录表名，必须是 FTS_TABLES 中的表。
+        all_of (dict[str, Optional[str]]): 见 build_match_expression。
+        any_of (Optional[dict[str, list[str]]]): 见 build_match_expression。
+        conditions (Optional[list[tuple[str, list]]]): 额外的 (WHERE 条件, 参数)，条件中目录表的别名为 t。
+
+    返回:
+        Optional[tuple[str, list]]: (SQL, 参数)；FTS5 表不存在或没有可检索的词时返回 None，
+        调用方应回退到 LIKE 查询。
+    """
+    expression = build_match_expression(all_of, any_of)
+    if expression is None or not fts_available(conn, table):
+        return None
+    shadow = fts_table(table)
+    where = f"{shadow} MATCH ?"
+    params = [expression]
+    for condition, condition_params in conditions or []:
+        where += f" AND {condition}"
+        params.extend(condition_params)
+    query = (
+        f"SELECT t.* FROM {shadow} JOIN {table} t ON t.id = {shadow}.rowid "
+        f"WHERE {where} ORDER BY {shadow}.rank"
+    )
+    return query, params
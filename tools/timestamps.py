@@ -0,0 +1,103 @@
+"""
+旅行数据库中时间文本与 UTC 时间戳之间的转换。
+
+航班时间以文本（"%Y-%m-%d %H:%M:%S.%f%z"）保存，带有各自的时区偏移，按字符串比较在跨时区时并不正确。
+准备数据库时会为这些列补充 UTC 秒级时间戳列（见 EPOCH_COLUMNS），工具用它们做范围过滤和时间计算；
+之后插入的行和被修改的时间文本由触发器（见 epoch_triggers）重算时间戳。
+"""
+import sqlite3
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional, Union
+
+# 原始数据中表示空值的占位符
+NULL_TIMESTAMP = "\\N"
+
+# 表名 -> {时间文本列: UTC 时间戳列}
+EPOCH_COLUMNS = {
+    "flights": {
+        "scheduled_departure": "scheduled_departure_epoch",
+        "scheduled_arrival": "scheduled_arrival_epoch",
+    },
+}
+
+
+def epoch_sql(value: str) -> str:
+    """
+    返回计算时间文本 UTC 时间戳（整数秒）的纯 SQL 表达式，供触发器使用（触发器所在的连接不一定注册了
+    timestamp_epoch）。SQLite 的时区后缀需要 ±HH:MM，"+03" 这样只有小时的偏移先补全分钟；空值占位符得到 NULL。
+
+    参数:
+        value (str): 时间文本的 SQL 表达式，例如 "new.scheduled_departure"。
+    """
+    normalized = f"CASE WHEN substr({value}, -3, 1) IN ('+', '-') THEN {value} || ':00' ELSE {value} END"
+    return f"CAST(strftime('%s', {normalized}) AS INTEGER)"
+
+
+def epoch_triggers(table: str) -> dict[str, str]:
+    """
+    返回在插入行或修改时间文本后重算该表 UTC 时间戳列（EPOCH_COLUMNS）的触发器：触发器名 -> 定义。
+    """
+    columns = EPOCH_COLUMNS[table]
+    assignments = ", ".join(
+        f"{epoch_column} = {epoch_sql(f'new.{column}')}" for column, epoch_column in columns.items()
+    )
+    refresh = f"UPDATE {table} SET {assignments} WHERE rowid = new.rowid;"
+    return {
+        f"{table}_epoch_ai": f"AFTER INSERT ON {table} BEGIN {refresh} END",
+        f"{table}_epoch_au": f"AFTER UPDATE OF {', '.join(columns)} ON {table} BEGIN {refresh} END",
+    }
+
+
+def parse_timestamp(value: str) -> datetime:
+    """解析数据库中的时间文本；不带时区的时间按 UTC 处理。"""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def timestamp_epoch(value: Optional[str]) -> Optional[float]:
+    """时间文本对应的 UTC 时间戳（秒），空值返回 None。"""
+    if value is None or value == NULL_TIMESTAMP:
+        return None
+    return parse_timestamp(value).timestamp()
+
+
+def shift_timestamp(value: Optional[str], seconds: float) -> Optional[str]:
+    """把时间文本平移 seconds 秒，保留原有的时区偏移；空值原样返回。"""
+    if value is None or value == NULL_TIMESTAMP:
+        return value
+    shifted = parse_timestamp(value) + timedelta(seconds=seconds)
+    return shifted.isoformat(sep=" ", timespec="microseconds")
+
+
+def to_epoch(value: Union[date, datetime, str]) -> int:
+    """
+    把工具参数中的时间转换为 UTC 时间戳（秒）。
+
+    参数:
+        value (Union[date, datetime, str]): 日期按当天 0 点（UTC）处理，不带时区的时间按 UTC 处理。
+
+    返回:
+        int: UTC 时间戳。
+    """
+    if isinstance(value, str):
+        value = parse_timestamp(value)
+    elif not isinstance(value, datetime):
+        value = datetime.combine(value, time.min, timezone.utc)
+    elif value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def register_timestamp_functions(conn: sqlite3.Connection) -> None:
+    """在连接上注册 timestamp_epoch(text) 和 shift_timestamp(text, seconds) 两个 SQL 函数。"""
+    conn.create_function("timestamp_epoch", 1, timestamp_epoch, deterministic=True)
+    conn.create_function("shift_timestamp", 2, shift_timestamp, deterministic=True)
+
+
+def epoch_columns_available(conn: sqlite3.Connection, table: str = "flights") -> bool:
+    """判断表中是否已经有 UTC 时间戳列（见 tools.provision.ensure_epoch_columns）。"""
+    epoch_column = next(iter(EPOCH_COLUMNS[table].values()))
+    row = conn.execute(
+        "SELECT 1 FROM pragma_table_info(?) WHERE name = ?", (table, epoch_column)
+    ).fetchone()
+    return row is not None
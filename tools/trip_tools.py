@@ -1,17 +1,25 @@
-from sqlite3 import connect, Cursor
-from typing import Optional, List
+from typing import List, Optional
 
 from langchain_core.tools import tool
 
-from tools import db
+from tools import booking, get_read_connection
+from tools.async_tools import async_variant
+from tools.backend import replica_backend, search_catalog
+from tools.cache import cached_tool
+from tools.catalog_search import catalog_page
 from tools.location_trans import transform_location
+from tools.text_search import fts_search_query
 
+@async_variant
 @tool
+@cached_tool("trip_recommendations", fold_case=True)
 def search_trip_recommendations(
         location: Optional[str] = None,
         name: Optional[str] = None,
         keywords: Optional[str] = None,
-) -> List[dict]:
+        limit: int = 20,
+        sort_by: Optional[str] = None,
+) -> dict:
     """
     根据位置、名称和关键词搜索旅行推荐。
 
@@ -19,13 +27,23 @@ def search_trip_recommendations(
         location (Optional[str]): 旅行推荐的位置。默认为None。
         name (Optional[str]): 旅行推荐的名称。默认为None。
         keywords (Optional[str]): 关联到旅行推荐的关键词。默认为None。
+        limit (int): 最多返回的旅行推荐数量，默认为20。
+        sort_by (Optional[str]): 排序字段，可选 name、location，前缀 - 表示倒序。默认按相关度排序。
 
     返回:
-        list[dict]: 包含匹配搜索条件的旅行推荐字典列表。
+        dict: results 为匹配的旅行推荐列表；truncated 为 True 时表示还有更多结果，
+        summary 中给出匹配总数和按位置的分布，可据此收窄搜索条件。
     """
-    conn = connect(db)
-    cursor = conn.cursor()
     location = transform_location(location)
+    keyword_list = keywords.split(",") if keywords else []
+    backend = replica_backend()
+    if backend is not None:
+        # 服务端副本上没有全文索引，按不区分大小写的子串匹配
+        return search_catalog(
+            backend, "trip_recommendations", limit, sort_by,
+            location=location, name=name, keywords=keyword_list,
+        )
+
     query = "SELECT * FROM trip_recommendations WHERE 1=1"
     params = []
 
@@ -35,22 +53,27 @@ def search_trip_recommendations(
     if name:
         query += " AND name LIKE ?"
         params.append(f"%{name}%")
-    if keywords:
-        keyword_list = keywords.split(",")
+    if keyword_list:
         keyword_conditions = " OR ".join(["keywords LIKE ?" for _ in keyword_list])
         query += f" AND ({keyword_conditions})"
         params.extend([f"%{keyword.strip()}%" for keyword in keyword_list])
 
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-
-    conn.close()
+    with get_read_connection() as conn:
+        # 优先走全文索引（按相关度排序），关键词之间是“或”的关系；没有 FTS5 影子表时回退到 LIKE 查询
+        fts_query = fts_search_query(
+            conn,
+            "trip_recommendations",
+            {"location": location, "name": name},
+            {"keywords": keyword_list},
+        )
+        if fts_query:
+            query, params = fts_query
+        page = catalog_page(conn, "trip_recommendations", query, params, limit, sort_by)
 
-    return [
-        dict(zip([column[0] for column in cursor.description], row)) for row in results
-    ]
+    return page
 
 
+@async_variant
 @tool
 def book_excursion(recommendation_id: int) -> str:
     """
@@ -62,22 +85,10 @@ def book_excursion(recommendation_id: int) -> str:
     返回:
         str: 表明旅行推荐是否成功预订的消息。
     """
-    conn = connect(db)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "UPDATE trip_recommendations SET booked = 1 WHERE id = ?", (recommendation_id,)
-    )
-    conn.commit()
-
-    if cursor.rowcount > 0:
-        conn.close()
-        return f"旅行推荐  {recommendation_id} 成功预定."
-    else:
-        conn.close()
-        return f"未找到与 ID 相关的旅行推荐信息。 {recommendation_id}."
+    return booking.book_item("trip_recommendations", recommendation_id).message
 
 
+@async_variant
 @tool
 def update_excursion(recommendation_id: int, details: str) -> str:
     """
@@ -90,23 +101,10 @@ def update_excursion(recommendation_id: int, details: str) -> str:
     返回:
         str: 表明旅行推荐是否成功更新的消息。
     """
-    conn = connect(db)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "UPDATE trip_recommendations SET details = ? WHERE id = ?",
-        (details, recommendation_id),
-    )
-    conn.commit()
-
-    if cursor.rowcount > 0:
-        conn.close()
-        return f"旅行推荐 {recommendation_id} 成功更新。"
-    else:
-        conn.close()
-        return f"未找到ID为 {recommendation_id} 的旅行推荐。"
+    return booking.update_item("trip_recommendations", recommendation_id, details=details).message
 
 
+@async_variant
 @tool
 def cancel_excursion(recommendation_id: int) -> str:
     """
@@ -118,18 +116,35 @@ def cancel_excursion(recommendation_id: int) -> str:
     返回:
         str: 表明旅行推荐是否成功取消的消息。
     """
-    conn = connect(db)
-    cursor = conn.cursor()
-
-    # 将booked字段设置为0来表示取消预订
-    cursor.execute(
-        "UPDATE trip_recommendations SET booked = 0 WHERE id = ?", (recommendation_id,)
-    )
-    conn.commit()
-
-    if cursor.rowcount > 0:
-        conn.close()
-        return f"旅行推荐 {recommendation_id} 成功取消。"
-    else:
-        conn.close()
-        return f"未找到ID为 {recommendation_id} 的旅行推荐。"
+    return booking.cancel_item("trip_recommendations", recommendation_id).message
+
+
+@async_variant
+@tool
+def book_excursions(recommendation_ids: List[int], all_or_nothing: bool = False) -> List[dict]:
+    """
+    在一次确认中预订多个旅行推荐，全部预订在同一个事务中完成。
+
+    参数:
+        recommendation_ids (List[int]): 要预订的旅行推荐的ID列表。
+        all_or_nothing (bool): 为 True 时任意一项失败则全部不预订。默认为False。
+
+    返回:
+        List[dict]: 每项旅行推荐的 {"id", "status", "message"}，status 为 ok、conflict、not_found 或 rolled_back。
+    """
+    return booking.apply_to_items("book", "trip_recommendations", recommendation_ids, all_or_nothing=all_or_nothing)
+
+
+@async_variant
+@tool
+def cancel_excursions(recommendation_ids: List[int]) -> List[dict]:
+    """
+    在一次确认中取消多个旅行推荐，全部取消在同一个事务中完成。
+
+    参数:
+        recommendation_ids (List[int]): 要取消的旅行推荐的ID列表。
+
+    返回:
+        List[dict]: 每项旅行推荐的 {"id", "status", "message"}，status 为 ok 或 not_found。
+    """
+    return booking.apply_to_items("cancel", "trip_recommendations", recommendation_ids)